@@ -3,11 +3,18 @@ from .models import (
     Component,
     Product,
     BOMItem,
+    SubAssemblyItem,
     ProductionOrder,
     ProductionLog,
     Printer,
+    PrinterDowntime,
+    OperatorShift,
+    MaterialChangeover,
     PrintTask,
     WorkOrder,
+    Schedule,
+    ScheduledAssignment,
+    ScheduleJob,
 )
 
 @admin.register(Component)
@@ -19,11 +26,16 @@ class BOMInline(admin.TabularInline):
     model = BOMItem
     extra = 0
 
+class SubAssemblyInline(admin.TabularInline):
+    model = SubAssemblyItem
+    fk_name = "parent"
+    extra = 0
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('code','name','qty_on_hand')
     search_fields = ('code','name')
-    inlines = [BOMInline]
+    inlines = [BOMInline, SubAssemblyInline]
 
 @admin.register(ProductionOrder)
 class ProductionOrderAdmin(admin.ModelAdmin):
@@ -36,9 +48,32 @@ class ProductionLogAdmin(admin.ModelAdmin):
     list_filter = ('component',)
 
 
+class PrinterDowntimeInline(admin.TabularInline):
+    model = PrinterDowntime
+    extra = 0
+
+
+class MaterialChangeoverInline(admin.TabularInline):
+    model = MaterialChangeover
+    extra = 0
+
+
 @admin.register(Printer)
 class PrinterAdmin(admin.ModelAdmin):
-    list_display = ("name", "is_active", "speed_factor", "tags")
+    list_display = ("name", "is_active", "speed_factor", "tags", "material_change_min")
+    inlines = [PrinterDowntimeInline, MaterialChangeoverInline]
+
+
+@admin.register(OperatorShift)
+class OperatorShiftAdmin(admin.ModelAdmin):
+    list_display = ("weekday", "start_time", "end_time")
+    list_filter = ("weekday",)
+
+
+@admin.register(MaterialChangeover)
+class MaterialChangeoverAdmin(admin.ModelAdmin):
+    list_display = ("from_material", "to_material", "minutes", "printer")
+    list_filter = ("printer",)
 
 
 @admin.register(PrintTask)
@@ -50,3 +85,24 @@ class PrintTaskAdmin(admin.ModelAdmin):
 @admin.register(WorkOrder)
 class WorkOrderAdmin(admin.ModelAdmin):
     list_display = ("id", "product", "quantity", "due_date", "priority")
+
+
+class ScheduledAssignmentInline(admin.TabularInline):
+    model = ScheduledAssignment
+    extra = 0
+    readonly_fields = ("printer", "component", "workorder", "quantity", "starts_at", "ends_at")
+    fields = readonly_fields
+
+
+@admin.register(Schedule)
+class ScheduleAdmin(admin.ModelAdmin):
+    list_display = ("id", "mode", "plan_start", "makespan_min", "unassigned_count", "version", "created_at")
+    list_filter = ("mode",)
+    inlines = [ScheduledAssignmentInline]
+
+
+@admin.register(ScheduleJob)
+class ScheduleJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "status", "schedule", "created_at", "finished_at")
+    list_filter = ("status",)
+    readonly_fields = ("params", "schedule", "result", "error", "finished_at")
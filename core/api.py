@@ -1,6 +1,19 @@
-from django.http import JsonResponse
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import chain
+from typing import List, Optional
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views import View
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from .bom import bom_lines
 from .models import (
     Printer,
     WorkOrder,
@@ -9,12 +22,30 @@ from .models import (
     Component,
     ProductionOrder,
     ProductionLog,
+    Schedule,
+    ScheduledAssignment,
+    ScheduleJob,
 )
 from .scheduling import (
     load_printers_active,
+    load_open_workorders,
     expand_workorder_to_tasks,
-    schedule_tasks,
+    consolidate_workorders_to_tasks,
+    expand_workorders_to_tasks,
+    printer_to_dto,
+    schedule_fingerprint,
+    ConsolidationStats,
+    POLICIES,
+    POLICY_MAKESPAN,
+    weighted_tardiness,
+    workorder_to_dto,
 )
+from .availability import load_calendar
+from .changeover import load_setup_matrix
+from .mrp import net_requirements
+from .print_tasks import calculate_orders_times
+from .solver import SolveRequest, SolveResult, solve
+from . import events, schedule_cache, schedule_jobs, schedule_state
 
 # tentativa de usar DRF se disponível
 try:
@@ -35,8 +66,29 @@ except Exception:  # pragma: no cover
         return JsonResponse(data, status=status, safe=False)
 
 
-class PrinterListAPIView(APIView):
-    def get(self, request):
+class AsyncAPIView(View):
+    """Base das views de leitura mais chamadas (polling das telas e tablets).
+
+    Os handlers são `async` e usam o ORM assíncrono: sob ASGI (`mfgsite.asgi`)
+    a requisição espera o banco sem ocupar uma thread; sob WSGI o Django as
+    executa normalmente. O DRF não roda views assíncronas, então estas
+    respondem com `JsonResponse` mesmo quando ele está instalado.
+    """
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False)
+
+
+def _body_json(request):
+    try:
+        return json.loads(request.body.decode() or "{}")
+    except Exception:
+        return {}
+
+
+class PrinterListAPIView(AsyncAPIView):
+    async def get(self, request):
         data = [
             {
                 "id": p.id,
@@ -45,9 +97,9 @@ class PrinterListAPIView(APIView):
                 "speed_factor": p.speed_factor,
                 "tags": p.tags,
             }
-            for p in Printer.objects.all()
+            async for p in Printer.objects.all()
         ]
-        return Response(data)
+        return _json(data)
 
 
 class PrinterToggleAPIView(APIView):
@@ -55,9 +107,345 @@ class PrinterToggleAPIView(APIView):
         printer = get_object_or_404(Printer, pk=pk)
         printer.is_active = not printer.is_active
         printer.save()
+        schedule_state.printer_toggled(printer_to_dto(printer), printer.is_active)
         return Response({"id": printer.id, "is_active": printer.is_active})
 
 
+def _printer_names(printers):
+    return {p.id: p.name for p in printers}
+
+
+def _assignment_rows(assignments, names, plan_start=None):
+    """Atribuições do plano, uma a uma; com `plan_start`, inclui também os horários reais."""
+    for a in assignments:
+        row = {
+            "printer_id": a.printer_id,
+            "printer_name": names[a.printer_id],
+            "workorder_id": a.task.workorder_id,
+            "merged_workorder_ids": list(a.task.merged_workorder_ids),
+            "component_id": a.task.component_id,
+            "component_name": a.task.component_name,
+            "material": a.task.material,
+            "quantity": a.task.quantity,
+            "start": a.start,
+            "end": a.end,
+            "duration": a.end - a.start,
+        }
+        if plan_start is not None:
+            row["starts_at"] = (plan_start + timedelta(minutes=a.start)).isoformat()
+            row["ends_at"] = (plan_start + timedelta(minutes=a.end)).isoformat()
+        yield row
+
+
+def _assignments_payload(assignments, names, plan_start=None):
+    return list(_assignment_rows(assignments, names, plan_start))
+
+
+def _unassigned_rows(unassigned):
+    for t in unassigned:
+        yield {
+            "workorder_id": t.workorder_id,
+            "component_id": t.component_id,
+            "component_name": t.component_name,
+            "quantity": t.quantity,
+            "time_min": t.time_min,
+        }
+
+
+def _unassigned_payload(unassigned):
+    return list(_unassigned_rows(unassigned))
+
+
+NDJSON = "application/x-ndjson"
+# linhas por pedaço enviado no modo streaming
+STREAM_CHUNK_ROWS = 200
+
+
+def _wants_stream(request, data):
+    return bool(data.get("stream")) or NDJSON in request.headers.get("Accept", "")
+
+
+def _ndjson(item) -> str:
+    return json.dumps(item, cls=DjangoJSONEncoder) + "\n"
+
+
+def _ndjson_chunks(resp):
+    """Corpo NDJSON depois do cabeçalho, em pedaços de `STREAM_CHUNK_ROWS` linhas."""
+    lines = chain(
+        ({"type": "assignment", **row} for row in resp["assignments"]),
+        ({"type": "unassigned", **row} for row in resp["unassigned"]),
+        [{"type": "end"}],
+    )
+    rows = []
+    for item in lines:
+        rows.append(_ndjson(item))
+        if len(rows) >= STREAM_CHUNK_ROWS:
+            yield "".join(rows)
+            rows = []
+    if rows:
+        yield "".join(rows)
+
+
+def _is_asgi(request) -> bool:
+    # o Request do DRF embrulha o HttpRequest original
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+async def _aiter(chunks):
+    """Itera `chunks` (síncrono) em uma thread, pedaço a pedaço.
+
+    Sob ASGI o Django consome um iterador síncrono inteiro antes de enviar
+    a resposta; com o assíncrono cada pedaço sai assim que fica pronto.
+    """
+    chunks = iter(chunks)
+    done = object()
+    while True:
+        chunk = await sync_to_async(next)(chunks, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+def _stream_plan(request, head, chunks):
+    """Plano em NDJSON: linha `plan` (tudo menos as listas), uma linha por
+    atribuição e por prato sem impressora e, por fim, `end`.
+
+    O cabeçalho sai antes de qualquer atribuição, então o Gantt já pode ser
+    dimensionado; as linhas seguintes são serializadas conforme o cliente lê.
+    """
+    def body():
+        yield _ndjson({"type": "plan", **head})
+        yield from chunks
+
+    content = _aiter(body()) if _is_asgi(request) else body()
+    return StreamingHttpResponse(content, content_type=NDJSON)
+
+
+def _workorder_plans_payload(plans):
+    return [
+        {
+            "workorder_id": wp.workorder_id,
+            "priority": wp.priority,
+            "due_date": wp.due_date.isoformat() if wp.due_date else None,
+            "plates": wp.plates,
+            "completion_min": wp.completion,
+            "completion_hhmm": minutes_to_hhmm(wp.completion),
+            "lateness_min": wp.lateness,
+            "is_late": wp.lateness is not None and wp.lateness > 0,
+        }
+        for wp in plans
+    ]
+
+
+def _optimization_payload(stats):
+    return {
+        "makespan_before_min": stats.makespan_before,
+        "makespan_after_min": stats.makespan_after,
+        "lower_bound_min": stats.lower_bound,
+        "gap_percent": stats.gap_percent,
+        "moves": stats.moves,
+        "swaps": stats.swaps,
+        "elapsed_ms": stats.elapsed_ms,
+    }
+
+
+def _changeover_payload(stats):
+    return {
+        "changes_before": stats.changes_before,
+        "changes_after": stats.changes_after,
+        "changes_saved": stats.changes_saved,
+        "minutes_before": stats.minutes_before,
+        "minutes_after": stats.minutes_after,
+        "minutes_saved": stats.minutes_saved,
+    }
+
+
+def _schedule_params(data):
+    """Parâmetros da requisição que mudam o resultado (chave do cache)."""
+    return {
+        "mode": data.get("mode") or "single",
+        "workorder_id": str(data.get("workorder_id") or ""),
+        "policy": data.get("policy") or POLICY_MAKESPAN,
+        "consolidate": bool(data.get("consolidate")),
+        "net": bool(data.get("net")),
+        "optimize_ms": _optimize_budget_ms(data),
+        "persist": bool(data.get("persist")),
+        "changeover_baseline": bool(data.get("changeover_baseline")),
+    }
+
+
+def _optimize_budget_ms(data):
+    """Orçamento de otimização em ms (`optimize_ms`); 0 desliga a busca local."""
+    try:
+        return max(0.0, float(data.get("optimize_ms") or 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@dataclass
+class _Plan:
+    """Entradas de um escalonamento lidas do banco, mais o que a resposta precisa."""
+
+    request: SolveRequest
+    workorders: List[WorkOrder]
+    consolidation: Optional[ConsolidationStats] = None
+    net: bool = False
+    # `optimize_ms` pedido mas não executado: {"requested_ms", "reason"}
+    optimize_skipped: Optional[dict] = None
+    # grava o plano e o torna o corrente; sem isso é só uma simulação
+    persist: bool = False
+
+
+def _policy_error(data):
+    policy = data.get("policy") or POLICY_MAKESPAN
+    if data.get("mode") == "batch" and policy not in POLICIES:
+        return Response({"error": f"policy deve ser uma de: {', '.join(POLICIES)}"}, status=400)
+    return None
+
+
+def _optimize_skip_reason(calendar, setups) -> Optional[str]:
+    """Por que a busca local não pode rodar com estas entradas (None se pode)."""
+    blockers = []
+    if calendar is not None:
+        blockers.append("bloqueios/turnos")
+    if setups is not None:
+        blockers.append("trocas de material")
+    if not blockers:
+        return None
+    return f"otimização ignora {' e '.join(blockers)}; plano sem busca local"
+
+
+def _load_plan(data) -> _Plan:
+    """Carrega ordens, impressoras, calendário e trocas (levanta Http404 sem a ordem).
+
+    Com `mode: "batch"` planeja todas as ordens abertas juntas, nas impressoras
+    compartilhadas; `policy` escolhe a sequência das ordens: makespan (padrão),
+    edd, wspt ou wt (atraso ponderado). Com `persist: true` o plano é gravado
+    e passa a ser o corrente (fila das impressoras, ajustes incrementais).
+    `changeover_baseline: true` inclui as trocas economizadas em relação ao
+    plano que ignora materiais, ao custo de escalonar duas vezes.
+    """
+    if data.get("mode") != "batch":
+        workorders = [get_object_or_404(WorkOrder, pk=data.get("workorder_id"))]
+    else:
+        workorders = load_open_workorders()
+    printers = load_printers_active()
+    plan_start = timezone.now()
+    calendar = load_calendar(plan_start, [p.id for p in printers])
+    setups = load_setup_matrix([p.id for p in printers])
+    budget = _optimize_budget_ms(data)
+    skipped = _optimize_skip_reason(calendar, setups) if budget else None
+    if skipped is not None:
+        # a busca local reposiciona pratos sem olhar o calendário nem as trocas de material
+        skipped = {"requested_ms": budget, "reason": skipped}
+        budget = 0.0
+    request = SolveRequest(
+        printers,
+        plan_start,
+        [workorder_to_dto(wo) for wo in workorders],
+        {},
+        calendar=calendar,
+        setups=setups,
+        optimize_ms=budget,
+        changeover_baseline=bool(data.get("changeover_baseline")),
+    )
+    if data.get("mode") != "batch":
+        (workorder,) = workorders
+        request.tasks_by_order = {workorder.id: expand_workorder_to_tasks(workorder)}
+        return _Plan(request, workorders, optimize_skipped=skipped, persist=bool(data.get("persist")))
+    request.mode = "batch"
+    request.policy = data.get("policy") or POLICY_MAKESPAN
+    consolidation = None
+    # "net": só o que falta depois de alocar o estoque de componentes (MRP)
+    net = bool(data.get("net"))
+    demand = net_requirements(workorders=workorders).for_workorders() if net else None
+    if data.get("consolidate"):
+        request.tasks_by_order, consolidation = consolidate_workorders_to_tasks(workorders, demand)
+    else:
+        request.tasks_by_order = expand_workorders_to_tasks(workorders, demand)
+    return _Plan(request, workorders, consolidation, net, skipped, bool(data.get("persist")))
+
+
+def _commit_plan(plan: _Plan, result: SolveResult, workorders):
+    """Grava o plano como o corrente; devolve (schedule_id, versão)."""
+    req = plan.request
+    state = schedule_state.ScheduleState(
+        req.printers,
+        result.assignments,
+        result.unassigned,
+        req.plan_start,
+        workorders,
+        mode=req.mode,
+        calendar=req.calendar,
+        setups=req.setups,
+    )
+    tasks = [t for wo in workorders for t in req.tasks_by_order[wo.id]]
+    signatures = {
+        "optimize_ms": req.optimize_ms,
+        "calendar": req.calendar.signature() if req.calendar else None,
+        "setups": req.setups.signature() if req.setups else None,
+    }
+    if req.mode == "batch":
+        params = dict(
+            mode="batch", consolidate=bool(plan.consolidation), net=plan.net, policy=req.policy, **signatures
+        )
+    else:
+        params = dict(workorder_id=workorders[0].id, **signatures)
+    schedule = schedule_state.save(state, schedule_fingerprint(tasks, req.printers, **params))
+    schedule_state.publish(state)
+    return schedule.id, state.version
+
+
+def _finish_plan(plan: _Plan, result: SolveResult):
+    """Monta a resposta e, com `persist`, grava o plano; devolve (resposta, schedule, versão).
+
+    Uma simulação não grava nada (schedule e versão None): o plano corrente e
+    as filas das impressoras só mudam quando o plano é confirmado.
+    """
+    req = plan.request
+    by_id = {wo.id: wo for wo in plan.workorders}
+    workorders = [by_id[i] for i in result.workorder_ids]
+    schedule_id = version = None
+    if plan.persist:
+        schedule_id, version = _commit_plan(plan, result, workorders)
+    resp = {
+        "schedule_id": schedule_id,
+        "persisted": plan.persist,
+        "plan_start": req.plan_start.isoformat(),
+        "assignments": _assignment_rows(result.assignments, _printer_names(req.printers), req.plan_start),
+        "unassigned": _unassigned_rows(result.unassigned),
+        "makespan_min": result.makespan,
+        "makespan_hhmm": minutes_to_hhmm(result.makespan),
+        "printer_times": result.printer_times,
+    }
+    if req.mode == "batch":
+        resp = {
+            "mode": "batch",
+            **resp,
+            "workorders": _workorder_plans_payload(result.plans),
+            "net": plan.net,
+            "policy": req.policy,
+            "weighted_tardiness_min": weighted_tardiness(req.workorders, result.plans),
+        }
+    if result.optimization is not None:
+        resp["optimization"] = _optimization_payload(result.optimization)
+    if plan.optimize_skipped is not None:
+        resp["optimize_skipped"] = plan.optimize_skipped
+    if plan.consolidation is not None:
+        c = plan.consolidation
+        resp["consolidation"] = {
+            "plates_before": c.plates_before,
+            "plates_after": c.plates_after,
+            "plates_saved": c.plates_saved,
+            "minutes_before": c.minutes_before,
+            "minutes_after": c.minutes_after,
+            "minutes_saved": c.minutes_saved,
+        }
+    if result.changeover is not None:
+        resp["changeover"] = _changeover_payload(result.changeover)
+    return resp, schedule_id, version
+
+
 class ScheduleAPIView(APIView):
     def post(self, request):
         data = getattr(request, 'data', None)
@@ -67,41 +455,157 @@ class ScheduleAPIView(APIView):
                 data = json.loads(request.body.decode() or '{}')
             except Exception:
                 data = {}
-        workorder_id = data.get("workorder_id")
-        workorder = get_object_or_404(WorkOrder, pk=workorder_id)
-        tasks = expand_workorder_to_tasks(workorder)
-        printers = load_printers_active()
-        assignments, unassigned, makespan, printer_times = schedule_tasks(tasks, printers)
+        stream = _wants_stream(request, data)
+        # mesma simulação sem nada alterado: devolve o resultado guardado
+        cache_key = schedule_cache.key_for({**_schedule_params(data), "stream": stream})
+        cached = schedule_cache.lookup(cache_key)
+        if cached is not None:
+            if stream:
+                return _stream_plan(request, {**cached["head"], "cached": True}, cached["chunks"])
+            return Response({**cached, "cached": True})
+        error = _policy_error(data)
+        if error is not None:
+            return error
+        plan = _load_plan(data)
+        resp, schedule_id, version = _finish_plan(plan, solve(plan.request))
+        return self._respond(request, resp, cache_key, schedule_id, version, stream)
+
+    def _respond(self, request, resp, cache_key, schedule_id, version, stream):
+        """Resposta JSON completa ou, com `stream`, NDJSON gerado sob demanda.
+
+        No streaming o cache guarda os pedaços já serializados quando o envio
+        termina; uma conexão interrompida não grava nada.
+        """
+        resp["cached"] = False
+        if stream:
+            head = {k: v for k, v in resp.items() if k not in ("assignments", "unassigned")}
+
+            def chunks():
+                sent = []
+                for chunk in _ndjson_chunks(resp):
+                    sent.append(chunk)
+                    yield chunk
+                schedule_cache.store(cache_key, {"head": head, "chunks": sent}, schedule_id, version)
+
+            return _stream_plan(request, head, chunks())
+        resp["assignments"] = list(resp["assignments"])
+        resp["unassigned"] = list(resp["unassigned"])
+        schedule_cache.store(cache_key, resp, schedule_id, version)
+        return Response(resp)
+
+
+def _job_payload(job):
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "schedule_id": job.schedule_id,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+        "status_url": reverse("api-schedule-job", args=[job.id]),
+        "result_url": reverse("api-schedule-job-result", args=[job.id]),
+    }
+
+
+class ScheduleJobListAPIView(APIView):
+    """Submete um escalonamento para rodar em outro processo (ver `core.schedule_jobs`).
+
+    Aceita o mesmo corpo de /api/schedule/ e responde 202 com o job; o
+    resultado fica em `result_url` quando `status` for "done".
+    """
+
+    def post(self, request):
+        data = getattr(request, "data", None)
+        if data is None:
+            data = _body_json(request)
+        error = _policy_error(data)
+        if error is not None:
+            return error
+        cache_key = schedule_cache.key_for({**_schedule_params(data), "stream": False})
+        plan = _load_plan(data)
+
+        def finish(result):
+            resp, schedule_id, version = _finish_plan(plan, result)
+            resp["assignments"] = list(resp["assignments"])
+            resp["unassigned"] = list(resp["unassigned"])
+            resp["cached"] = False
+            schedule_cache.store(cache_key, resp, schedule_id, version)
+            return resp, schedule_id
+
+        job = schedule_jobs.submit(plan.request, finish, data)
+        return Response(_job_payload(job), status=202)
+
+
+class ScheduleJobAPIView(APIView):
+    def get(self, request, pk):
+        return Response(_job_payload(get_object_or_404(ScheduleJob, pk=pk)))
+
+
+class ScheduleJobResultAPIView(APIView):
+    """Resposta do escalonamento; 202 enquanto na fila, 409 se falhou."""
+
+    def get(self, request, pk):
+        job = get_object_or_404(ScheduleJob, pk=pk)
+        if job.status == "done":
+            return Response(job.result)
+        return Response(_job_payload(job), status=202 if job.status == "queued" else 409)
+
+
+class CurrentScheduleAPIView(APIView):
+    """Plano corrente, mantido incrementalmente; leitura sem reescalonar."""
+
+    def get(self, request):
+        state = schedule_state.current()
+        if state is None:
+            return Response({"error": "Nenhum plano calculado"}, status=404)
+        makespan = state.makespan
         resp = {
-            "assignments": [
-                {
-                    "printer_id": a.printer_id,
-                    "printer_name": next(p.name for p in printers if p.id == a.printer_id),
-                    "component_id": a.task.component_id,
-                    "component_name": a.task.component_name,
-                    "quantity": a.task.quantity,
-                    "start": a.start,
-                    "end": a.end,
-                    "duration": a.end - a.start,
-                }
-                for a in assignments
-            ],
-            "unassigned": [
-                {
-                    "component_id": t.component_id,
-                    "component_name": t.component_name,
-                    "quantity": t.quantity,
-                    "time_min": t.time_min,
-                }
-                for t in unassigned
-            ],
+            "mode": state.mode,
+            "schedule_id": state.schedule_id,
+            "version": state.version,
+            "plan_start": state.plan_start.isoformat(),
+            "assignments": _assignments_payload(state.assignments, state.names, state.plan_start),
+            "unassigned": _unassigned_payload(state.unassigned),
+            "workorders": _workorder_plans_payload(state.workorder_plans()),
             "makespan_min": makespan,
             "makespan_hhmm": minutes_to_hhmm(makespan),
-            "printer_times": printer_times,
+            "printer_times": state.printer_times,
         }
         return Response(resp)
 
 
+class PrinterNextAssignmentsAPIView(APIView):
+    """Próximos pratos de uma impressora no plano corrente (o último confirmado)."""
+
+    def get(self, request, pk):
+        printer = get_object_or_404(Printer, pk=pk)
+        schedule = Schedule.objects.only("id").first()
+        if schedule is None:
+            return Response({"error": "Nenhum plano calculado"}, status=404)
+        try:
+            limit = max(1, min(100, int(request.GET.get("limit", 5))))
+        except ValueError:
+            limit = 5
+        rows = (
+            ScheduledAssignment.objects.filter(
+                schedule=schedule, printer=printer, component__isnull=False, ends_at__gt=timezone.now()
+            )
+            .order_by("starts_at")[:limit]
+        )
+        data = [
+            {
+                "component_id": r.component_id,
+                "component_name": r.component_name,
+                "workorder_id": r.workorder_id,
+                "quantity": r.quantity,
+                "starts_at": r.starts_at.isoformat(),
+                "ends_at": r.ends_at.isoformat(),
+            }
+            for r in rows
+        ]
+        return Response({"schedule_id": schedule.id, "printer_id": printer.id, "next": data})
+
+
 class WorkOrderTasksPreviewAPIView(APIView):
     def get(self, request, pk):
         workorder = get_object_or_404(WorkOrder, pk=pk)
@@ -118,9 +622,11 @@ class WorkOrderTasksPreviewAPIView(APIView):
         return Response(data)
 
 
-class ProductComponentsAPIView(APIView):
-    def get(self, request, pk):
-        product = get_object_or_404(Product, pk=pk)
+class ProductComponentsAPIView(AsyncAPIView):
+    async def get(self, request, pk):
+        product = await aget_object_or_404(Product, pk=pk)
+        # a explosão do BOM usa o ORM síncrono (no máximo duas consultas)
+        lines = await sync_to_async(bom_lines)([product])
         data = [
             {
                 "id": item.component.id,
@@ -129,30 +635,73 @@ class ProductComponentsAPIView(APIView):
                 "print_time_min": item.component.print_time_min,
                 "total_required": item.quantity,
             }
-            for item in product.bom_items.select_related("component")
+            for item in lines[product.pk]
         ]
-        return Response(data)
+        return _json(data)
 
 
-class PrintTimeAPIView(APIView):
-    def post(self, request):
-        data = getattr(request, "data", None)
-        if data is None:
-            try:
-                import json
-                data = json.loads(request.body.decode() or "{}")
-            except Exception:
-                data = {}
+class PrintTimeAPIView(AsyncAPIView):
+    async def post(self, request):
+        data = _body_json(request)
         component_id = data.get("component_id")
         quantity = int(data.get("quantity", 0))
-        component = get_object_or_404(Component, pk=component_id)
+        component = await aget_object_or_404(Component, pk=component_id)
         total_minutes = component.print_time_min * quantity
-        return Response({
+        return _json({
             "time_min": total_minutes,
             "time_hhmm": minutes_to_hhmm(total_minutes),
         })
 
 
+def _orders_progress_payload(orders):
+    data = []
+    for result in calculate_orders_times(orders):
+        order = result.order
+        data.append(
+            {
+                "order_id": order.id,
+                "product_code": order.product.code,
+                "status": order.status,
+                "remaining_time_h": result.total_h,
+                "error": result.error,
+                "components": [
+                    {
+                        "component_id": c.component.id,
+                        "code": c.component.code,
+                        "required": c.required_qty,
+                        "done": c.done_qty,
+                        "remaining": c.remaining_qty,
+                        "capacity": c.capacity,
+                        "remaining_time_h": c.remaining_time_h,
+                    }
+                    for c in result.components
+                ],
+            }
+        )
+    return data
+
+
+class OrdersProgressAPIView(AsyncAPIView):
+    """Progresso e tempo restante de várias ordens em número fixo de consultas.
+
+    `?ids=1,2,3` seleciona as ordens; sem `ids`, usa todas as ordens abertas.
+    """
+
+    async def get(self, request):
+        raw_ids = request.GET.get("ids", "")
+        qs = ProductionOrder.objects.select_related("product").order_by("id")
+        if raw_ids:
+            try:
+                ids = [int(v) for v in raw_ids.split(",") if v.strip()]
+            except ValueError:
+                return _json({"error": "ids inválidos"}, status=400)
+            qs = qs.filter(pk__in=ids)
+        else:
+            qs = qs.filter(status="open")
+        # cálculo em lote (consultas fixas) no executor de threads do asgiref
+        return _json(await sync_to_async(_orders_progress_payload)(qs))
+
+
 class LogPrintAPIView(APIView):
     def post(self, request):
         data = getattr(request, "data", None)
@@ -167,13 +716,54 @@ class LogPrintAPIView(APIView):
         quantity = int(data.get("quantity", 0))
         order = get_object_or_404(ProductionOrder, pk=order_id)
         component = get_object_or_404(Component, pk=component_id)
-        remaining = order.required_for_component(component) - order.printed_for_component(component)
-        if quantity <= 0 or quantity > remaining:
-            return Response({"error": "Quantidade inválida"}, status=400)
-        log = ProductionLog.objects.create(order=order, component=component, quantity=quantity)
-        try:
-            component.qty_on_hand = max(0, component.qty_on_hand - quantity)
-            component.save()
-        except Exception:
-            pass
+        # o contador OrderComponentProgress é somado (expressão F) pelo sinal de
+        # ProductionLog, na mesma transação do registro e da baixa de estoque
+        with transaction.atomic():
+            remaining = order.required_for_component(component) - order.printed_for_component(component)
+            if quantity <= 0 or quantity > remaining:
+                return Response({"error": "Quantidade inválida"}, status=400)
+            log = ProductionLog.objects.create(order=order, component=component, quantity=quantity)
+            try:
+                component.qty_on_hand = max(0, component.qty_on_hand - quantity)
+                component.save(update_fields=["qty_on_hand", "updated_at"])
+            except Exception:
+                pass
+        schedule_state.print_logged(component.id, quantity)
         return Response({"id": log.id})
+
+
+class NetRequirementsAPIView(APIView):
+    """Necessidades líquidas por componente e por ordem depois de alocar o estoque."""
+
+    def get(self, request):
+        result = net_requirements()
+        names = {line.component.id: line.component.name for line in result.lines}
+        components = [
+            {"component_id": cid, "component_name": names[cid], **row}
+            for cid, row in sorted(result.by_component().items())
+        ]
+        orders = [
+            {
+                "kind": line.kind,
+                "order_id": line.order_id,
+                "component_id": line.component.id,
+                "gross": line.gross,
+                "allocated": line.allocated,
+                "net": line.net,
+            }
+            for line in result.lines
+        ]
+        return Response({"components": components, "orders": orders})
+
+
+class EventsAPIView(APIView):
+    """Feed SSE de progresso, impressoras e plano (ver `core.events`)."""
+
+    def get(self, request):
+        last_id = request.headers.get("Last-Event-ID") or request.GET.get("last_id")
+        # sob ASGI o stream assíncrono não prende uma thread por cliente
+        source = events.astream if _is_asgi(request) else events.stream
+        response = StreamingHttpResponse(source(last_id), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
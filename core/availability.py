@@ -0,0 +1,147 @@
+"""Calendários de disponibilidade: manutenção das impressoras e turnos de operador.
+
+Os tempos do plano são minutos a partir de `plan_start`. Cada impressora tem
+um conjunto de janelas bloqueadas (`PrinterDowntime`) e a fazenda tem as
+janelas com operador presente (`OperatorShift`, semanal). Um prato só pode
+começar dentro de um turno (alguém precisa retirar o anterior e iniciar o
+próximo), pode seguir imprimindo depois que o turno acaba, mas não pode
+sobrepor uma janela bloqueada da impressora.
+
+As janelas ficam em listas ordenadas de intervalos disjuntos e são
+consultadas com `bisect`, de modo que pular um bloqueio custa O(log n) em vez
+de avançar minuto a minuto.
+"""
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.utils import timezone
+
+from .models import OperatorShift, PrinterDowntime
+
+# até onde os turnos semanais são expandidos a partir do início do plano
+HORIZON_DAYS = 90
+
+
+class IntervalSet:
+    """Intervalos [início, fim) ordenados e sem sobreposição (sobrepostos são unidos)."""
+
+    def __init__(self, intervals: Iterable[Tuple[float, float]] = ()):
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+        for start, end in sorted(intervals):
+            if end <= start:
+                continue
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self):
+        return iter(zip(self.starts, self.ends))
+
+    def next_gap(self, t: float, duration: float) -> float:
+        """Primeiro instante >= t em que [instante, instante + duration) não toca nenhum intervalo."""
+        i = bisect_right(self.ends, t)
+        while i < len(self.starts) and self.starts[i] < t + duration:
+            t = max(t, self.ends[i])
+            i += 1
+        return t
+
+    def next_inside(self, t: float) -> Optional[float]:
+        """Primeiro instante >= t dentro de algum intervalo; None se não houver."""
+        i = bisect_right(self.ends, t)
+        if i == len(self.starts):
+            return None
+        return max(t, self.starts[i])
+
+
+class Calendar:
+    """Bloqueios por impressora e turnos de operador, em minutos desde o início do plano.
+
+    `shifts=None` significa operador sempre disponível.
+    """
+
+    def __init__(self, downtime: Optional[Dict[int, IntervalSet]] = None, shifts: Optional[IntervalSet] = None):
+        self.downtime: Dict[int, IntervalSet] = downtime or {}
+        self.shifts = shifts
+
+    def signature(self) -> list:
+        """Representação serializável (para o fingerprint do plano)."""
+        return [
+            sorted((pid, list(intervals)) for pid, intervals in self.downtime.items()),
+            list(self.shifts) if self.shifts is not None else None,
+        ]
+
+    @property
+    def empty(self) -> bool:
+        return self.shifts is None and not any(self.downtime.values())
+
+    def earliest_start(self, printer_id: int, t: float, duration: float) -> Optional[float]:
+        """Primeiro início >= t com operador presente e sem bloqueio durante o prato.
+
+        None quando não há mais turno dentro do horizonte.
+        """
+        blocked = self.downtime.get(printer_id)
+        while True:
+            if self.shifts is not None:
+                t = self.shifts.next_inside(t)
+                if t is None:
+                    return None
+            if blocked is None:
+                return t
+            free = blocked.next_gap(t, duration)
+            if free == t:
+                return t
+            t = free
+
+
+def _minutes(moment: datetime, plan_start: datetime) -> float:
+    return (moment - plan_start).total_seconds() / 60.0
+
+
+def shift_windows(shifts, plan_start: datetime, horizon_days: int = HORIZON_DAYS) -> IntervalSet:
+    """Expande os turnos semanais em intervalos (min) de `plan_start` até o horizonte."""
+    tz = timezone.get_current_timezone()
+    local_start = timezone.localtime(plan_start, tz) if timezone.is_aware(plan_start) else plan_start
+    first_day = local_start.date() - timedelta(days=1)  # turno noturno iniciado na véspera
+    windows = []
+    for offset in range(horizon_days + 2):
+        day = first_day + timedelta(days=offset)
+        for shift in shifts:
+            if shift.weekday != day.weekday():
+                continue
+            begin = datetime.combine(day, shift.start_time)
+            end_day = day if shift.end_time > shift.start_time else day + timedelta(days=1)
+            end = datetime.combine(end_day, shift.end_time)
+            if timezone.is_aware(plan_start):
+                begin = timezone.make_aware(begin, tz)
+                end = timezone.make_aware(end, tz)
+            windows.append((_minutes(begin, plan_start), _minutes(end, plan_start)))
+    return IntervalSet(windows)
+
+
+def load_calendar(
+    plan_start: datetime,
+    printer_ids: Optional[Iterable[int]] = None,
+    horizon_days: int = HORIZON_DAYS,
+) -> Optional[Calendar]:
+    """Calendário do plano lido do banco (duas consultas); None se não houver restrições."""
+    downtime_qs = PrinterDowntime.objects.filter(ends_at__gt=plan_start)
+    if printer_ids is not None:
+        downtime_qs = downtime_qs.filter(printer_id__in=list(printer_ids))
+    blocked: Dict[int, List[Tuple[float, float]]] = {}
+    for printer_id, starts_at, ends_at in downtime_qs.values_list("printer_id", "starts_at", "ends_at"):
+        blocked.setdefault(printer_id, []).append(
+            (_minutes(starts_at, plan_start), _minutes(ends_at, plan_start))
+        )
+    shifts = list(OperatorShift.objects.all())
+    calendar = Calendar(
+        {pid: IntervalSet(intervals) for pid, intervals in blocked.items()},
+        shift_windows(shifts, plan_start, horizon_days) if shifts else None,
+    )
+    return None if calendar.empty else calendar
@@ -0,0 +1,123 @@
+"""Benchmarks de latência e número de consultas dos caminhos críticos."""
+from statistics import median
+from typing import Callable, Dict, List
+import json
+import time
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import schedule_cache
+from .models import ProductionOrder, WorkOrder
+from .print_tasks import calculate_orders_times
+
+
+def _measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    timings: List[float] = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000.0)
+        queries = len(ctx)
+    return {
+        "median_ms": median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        "queries": queries,
+    }
+
+
+def _get(client: Client, url: str):
+    def run():
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+    return run
+
+
+def _post_json(client: Client, url: str, payload: dict, cold: bool = False):
+    """POST JSON; com `cold`, invalida o cache de /api/schedule/ antes de cada execução."""
+    def run():
+        if cold:
+            schedule_cache.bump()
+        response = client.post(url, data=payload, content_type="application/json")
+        assert response.status_code == 200, (url, response.status_code)
+    return run
+
+
+def run_benchmarks(repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """Mede as páginas e APIs críticas no banco atual.
+
+    Cada entrada traz mediana/mínimo/máximo em ms e o número de consultas SQL
+    da última execução. /api/schedule/ aparece frio (cache invalidado antes de
+    cada execução) e `_warm` (repetição servida do cache).
+    """
+    client = Client()
+    results: Dict[str, Dict[str, float]] = {}
+    cases = {
+        "dashboard": _get(client, reverse("dashboard")),
+        "producao": _get(client, reverse("producao")),
+        "estoque_produtos_list": _get(client, reverse("estoque-produtos")),
+        "estoque_componentes_list": _get(client, reverse("estoque-componentes")),
+        "api_orders_progress": _get(client, reverse("api-orders-progress")),
+    }
+    workorder = WorkOrder.objects.first()
+    if workorder is not None:
+        # sem sufixo: cache invalidado, escalona a cada execução; _warm: resposta do cache
+        for name, payload in (("single", {"workorder_id": workorder.id}), ("batch", {"mode": "batch"})):
+            url = reverse("api-schedule")
+            cases[f"api_schedule_{name}"] = _post_json(client, url, payload, cold=True)
+            cases[f"api_schedule_{name}_warm"] = _post_json(client, url, payload)
+    orders = list(ProductionOrder.objects.filter(status="open").select_related("product")[:200])
+    cases["calculate_order_times"] = lambda: calculate_orders_times(orders)
+    for name, fn in cases.items():
+        results[name] = _measure(fn, repeat)
+    return results
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> List[str]:
+    """Linhas de texto com a variação de cada caso em relação a um resultado anterior."""
+    lines = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None:
+            lines.append(f"{name}: new")
+            continue
+        delta = now["median_ms"] - before["median_ms"]
+        pct = (delta / before["median_ms"] * 100.0) if before["median_ms"] else 0.0
+        lines.append(
+            f"{name}: {before['median_ms']:.1f} -> {now['median_ms']:.1f} ms ({pct:+.0f}%), "
+            f"queries {before['queries']} -> {now['queries']}"
+        )
+    return lines
+
+
+def parse_budgets(values: List[str]) -> Dict[str, float]:
+    """`caso=ms` (opção --budget) em {caso: ms}."""
+    budgets = {}
+    for value in values:
+        name, sep, ms = value.partition("=")
+        if not sep:
+            raise ValueError(f"budget must be NAME=MS: {value!r}")
+        budgets[name.strip()] = float(ms)
+    return budgets
+
+
+def over_budget(results: Dict[str, Dict[str, float]], budgets: Dict[str, float]) -> List[str]:
+    """Casos cuja mediana passou do limite em ms (ou que não foram medidos)."""
+    lines = []
+    for name, limit in budgets.items():
+        result = results.get(name)
+        if result is None:
+            lines.append(f"{name}: not measured")
+        elif result["median_ms"] > limit:
+            lines.append(f"{name}: {result['median_ms']:.1f} ms > {limit:.1f} ms")
+    return lines
+
+
+def dump(payload: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, indent=2, sort_keys=True)
@@ -0,0 +1,141 @@
+"""BOM multinível: explosão de produtos com submontagens em componentes.
+
+Um produto pode conter componentes (`BOMItem`) e outros produtos
+(`SubAssemblyItem`). `explode` achata a árvore em um vetor
+(componente, quantidade por unidade), visitando cada produto uma única vez e
+rejeitando ciclos. O vetor fica memoizado em `Product.rollup_bom` (mantido
+por `core.rollups`), e `bom_lines` o lê sem percorrer a árvore de novo.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set, Tuple
+
+from django.core.exceptions import ValidationError
+
+from .models import BOMItem, Component, Product, SubAssemblyItem
+
+
+class BOMCycleError(ValidationError):
+    """O BOM contém (ou passaria a conter) um produto que inclui a si mesmo."""
+
+
+@dataclass(frozen=True)
+class BOMLine:
+    """Linha do BOM explodido; expõe os mesmos atributos usados de `BOMItem`."""
+
+    product_id: int
+    component: Component
+    quantity: int
+
+    @property
+    def component_id(self) -> int:
+        return self.component.id
+
+
+def _structure(product_ids: Iterable[int]):
+    """Linhas diretas dos produtos e de todos os descendentes (duas consultas por nível)."""
+    components: Dict[int, List[Tuple[int, int]]] = {}
+    children: Dict[int, List[Tuple[int, int]]] = {}
+    frontier = set(product_ids)
+    while frontier:
+        for pid in frontier:
+            components[pid] = []
+            children[pid] = []
+        items = (
+            BOMItem.objects.filter(product_id__in=frontier)
+            .order_by("id")
+            .values_list("product_id", "component_id", "quantity")
+        )
+        for pid, component_id, qty in items:
+            components[pid].append((component_id, qty))
+        subs = (
+            SubAssemblyItem.objects.filter(parent_id__in=frontier)
+            .order_by("id")
+            .values_list("parent_id", "child_id", "quantity")
+        )
+        found = set()
+        for parent_id, child_id, qty in subs:
+            children[parent_id].append((child_id, qty))
+            found.add(child_id)
+        frontier = found - children.keys()
+    return components, children
+
+
+def explode(product_ids: Iterable[int]) -> Dict[int, List[Tuple[int, int]]]:
+    """Vetor [(componente, qtd por unidade)] de cada produto, somando as submontagens.
+
+    Cada produto da árvore é explodido uma vez e reaproveitado por todos os
+    pais que o usam. Levanta `BOMCycleError` se encontrar um ciclo.
+    """
+    product_ids = list(product_ids)
+    components, children = _structure(product_ids)
+    memo: Dict[int, Dict[int, int]] = {}
+    visiting: Set[int] = set()
+
+    def visit(pid: int) -> Dict[int, int]:
+        if pid in memo:
+            return memo[pid]
+        if pid in visiting:
+            raise BOMCycleError(f"Ciclo no BOM envolvendo o produto {pid}.")
+        visiting.add(pid)
+        vector: Dict[int, int] = {}
+        for component_id, qty in components[pid]:
+            vector[component_id] = vector.get(component_id, 0) + qty
+        for child_id, qty in children[pid]:
+            for component_id, child_qty in visit(child_id).items():
+                vector[component_id] = vector.get(component_id, 0) + child_qty * qty
+        visiting.discard(pid)
+        memo[pid] = vector
+        return vector
+
+    return {pid: list(visit(pid).items()) for pid in product_ids}
+
+
+def ancestors(product_ids: Iterable[int]) -> Set[int]:
+    """Os produtos informados e todos os que os usam, direta ou indiretamente."""
+    seen = set(product_ids)
+    frontier = set(seen)
+    while frontier:
+        parents = set(
+            SubAssemblyItem.objects.filter(child_id__in=frontier).values_list("parent_id", flat=True)
+        )
+        frontier = parents - seen
+        seen |= frontier
+    return seen
+
+
+def creates_cycle(parent_id: int, child_id: int) -> bool:
+    """True se usar `child_id` dentro de `parent_id` fecharia um ciclo."""
+    return child_id in ancestors([parent_id])
+
+
+def bom_lines(products: Iterable) -> Dict[int, List[BOMLine]]:
+    """Linhas explodidas (memo de `Product.rollup_bom`) com os componentes carregados.
+
+    Aceita instâncias de `Product` (usa o vetor já carregado) ou ids; são no
+    máximo duas consultas, qualquer que seja a profundidade da árvore.
+    """
+    vectors: Dict[int, list] = {}
+    ids = set()
+    for p in products:
+        if isinstance(p, Product):
+            vectors[p.pk] = p.rollup_bom
+        else:
+            ids.add(p)
+    ids -= vectors.keys()
+    if ids:
+        vectors.update(Product.objects.filter(pk__in=ids).order_by().values_list("id", "rollup_bom"))
+    component_ids = {component_id for vector in vectors.values() for component_id, _ in vector}
+    comps = Component.objects.in_bulk(component_ids) if component_ids else {}
+    return {
+        pid: [
+            BOMLine(pid, comps[component_id], qty)
+            for component_id, qty in vector
+            if component_id in comps
+        ]
+        for pid, vector in vectors.items()
+    }
+
+
+def products_of(rows: Iterable) -> list:
+    """Produto de cada ordem: a instância se já carregada (select_related), senão o id."""
+    return [row.product if type(row).product.is_cached(row) else row.product_id for row in rows]
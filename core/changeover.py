@@ -0,0 +1,117 @@
+"""Tempos de troca de material (setup dependente da sequência).
+
+Quando dois pratos seguidos de uma impressora usam materiais diferentes, há
+purga do bico e uma visita do operador antes do próximo prato. O tempo vem,
+nesta ordem, de `MaterialChangeover` da própria impressora, de
+`MaterialChangeover` geral (sem impressora) e de `Printer.material_change_min`.
+Pratos sem material informado não provocam troca.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import MaterialChangeover, Printer
+
+
+@dataclass
+class ChangeoverStats:
+    """Trocas de material do plano, comparadas (se calculado) com o plano que ignora materiais."""
+
+    changes_before: Optional[int]
+    minutes_before: Optional[float]
+    changes_after: int
+    minutes_after: float
+
+    @property
+    def changes_saved(self) -> Optional[int]:
+        if self.changes_before is None:
+            return None
+        return self.changes_before - self.changes_after
+
+    @property
+    def minutes_saved(self) -> Optional[float]:
+        if self.minutes_before is None:
+            return None
+        return self.minutes_before - self.minutes_after
+
+
+class SetupMatrix:
+    """Minutos de troca por impressora e par de materiais."""
+
+    def __init__(
+        self,
+        defaults: Optional[Dict[int, float]] = None,
+        pairs: Optional[Dict[Tuple[Optional[int], str, str], float]] = None,
+    ):
+        self.defaults: Dict[int, float] = defaults or {}
+        self.pairs: Dict[Tuple[Optional[int], str, str], float] = pairs or {}
+
+    def minutes(self, printer_id: int, previous: str, material: str) -> float:
+        if not previous or not material or previous == material:
+            return 0.0
+        value = self.pairs.get((printer_id, previous, material))
+        if value is None:
+            value = self.pairs.get((None, previous, material))
+        if value is None:
+            value = self.defaults.get(printer_id, 0.0)
+        return value
+
+    def signature(self) -> list:
+        """Representação serializável (para o fingerprint do plano)."""
+        return [
+            sorted(self.defaults.items()),
+            sorted(
+                ([pid if pid is not None else 0, a, b], m) for (pid, a, b), m in self.pairs.items()
+            ),
+        ]
+
+    @property
+    def empty(self) -> bool:
+        return not any(self.defaults.values()) and not any(self.pairs.values())
+
+
+def load_setup_matrix(printer_ids: Optional[Iterable[int]] = None) -> Optional[SetupMatrix]:
+    """Tempos de troca lidos do banco (duas consultas); None se todos forem zero."""
+    printers = Printer.objects.all()
+    changeovers = MaterialChangeover.objects.all()
+    if printer_ids is not None:
+        printer_ids = list(printer_ids)
+        printers = printers.filter(id__in=printer_ids)
+        changeovers = changeovers.filter(printer_id__in=printer_ids) | changeovers.filter(
+            printer__isnull=True
+        )
+    matrix = SetupMatrix(
+        {pid: float(m) for pid, m in printers.values_list("id", "material_change_min") if m},
+        {
+            (pid, a, b): float(m)
+            for pid, a, b, m in changeovers.values_list(
+                "printer_id", "from_material", "to_material", "minutes"
+            )
+        },
+    )
+    return None if matrix.empty else matrix
+
+
+def count_changeovers(assignments, setups: SetupMatrix) -> Tuple[int, float]:
+    """(trocas, minutos de troca) das filas do plano, percorridas em ordem de início."""
+    queues: Dict[int, List] = {}
+    for a in sorted(assignments, key=lambda a: a.start):
+        queues.setdefault(a.printer_id, []).append(a)
+    changes = 0
+    minutes = 0.0
+    for printer_id, queue in queues.items():
+        previous = ""
+        for a in queue:
+            if a.task.material and previous and a.task.material != previous:
+                changes += 1
+                minutes += setups.minutes(printer_id, previous, a.task.material)
+            previous = a.task.material or previous
+    return changes, minutes
+
+
+def changeover_stats(baseline, assignments, setups: SetupMatrix) -> ChangeoverStats:
+    """Trocas de `assignments`; com `baseline` (None = não calculado), também as dele."""
+    changes_before = minutes_before = None
+    if baseline is not None:
+        changes_before, minutes_before = count_changeovers(baseline, setups)
+    changes_after, minutes_after = count_changeovers(assignments, setups)
+    return ChangeoverStats(changes_before, minutes_before, changes_after, minutes_after)
@@ -0,0 +1,196 @@
+"""Feed de eventos ao vivo da fazenda (Server-Sent Events em /api/events/).
+
+Pub/sub em processo: quem altera o estado publica um evento e cada cliente
+conectado tem uma fila própria, de modo que um registro de impressão vira
+uma linha de poucos bytes para cada tablet em vez de um recarregamento
+completo do painel. Tipos de evento:
+
+- `progress`: contadores de uma ordem depois de um registro de impressão;
+- `printer`: impressora ativada ou desativada;
+- `schedule`: plano corrente gravado ou ajustado;
+- `resync`: o cliente perdeu eventos e deve recarregar o estado.
+
+Os eventos saem só depois do commit da transação que os causou. Cada um tem
+um id crescente; ao reconectar, o navegador envia `Last-Event-ID` e recebe o
+que perdeu, se ainda estiver no histórico (senão, um `resync`).
+
+Sob ASGI (`mfgsite.asgi`) cada cliente é uma corrotina esperando sua fila;
+sob WSGI o stream funciona, mas ocupa uma thread por cliente. Como o pub/sub
+é em memória, só alcança clientes do mesmo processo.
+"""
+import asyncio
+import itertools
+import json
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional, Set, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+# eventos guardados para reenvio na reconexão
+HISTORY_SIZE = 256
+# eventos pendentes por cliente; um cliente mais lento que isso recebe `resync`
+QUEUE_SIZE = 512
+# intervalo (s) do comentário que mantém a conexão aberta em proxies
+KEEPALIVE_S = 15
+# espera (ms) sugerida ao navegador antes de reconectar
+RETRY_MS = 3000
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    kind: str
+    data: dict
+
+    def encode(self) -> str:
+        payload = json.dumps(self.data, cls=DjangoJSONEncoder)
+        return f"id: {self.id}\nevent: {self.kind}\ndata: {payload}\n\n"
+
+
+class Subscriber:
+    """Fila de um cliente: asyncio com `loop` (ASGI), bloqueante sem (WSGI)."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE) if loop is not None else queue.Queue(QUEUE_SIZE)
+        self.lagged = False
+
+    def deliver(self, event: Event) -> None:
+        if self.loop is None:
+            self._put(event)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:  # loop já encerrado: o cliente saiu
+            pass
+
+    def _put(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except (asyncio.QueueFull, queue.Full):
+            self.lagged = True
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscriber] = set()
+        self._history: Deque[Event] = deque(maxlen=HISTORY_SIZE)
+        self._ids = itertools.count(1)
+        self._last_id = 0
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, kind: str, data: dict) -> Event:
+        with self._lock:
+            self._last_id = next(self._ids)
+            event = Event(self._last_id, kind, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.deliver(event)
+        return event
+
+    def subscribe(
+        self, last_id: Optional[int] = None, loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> Tuple[Subscriber, List[Event]]:
+        """Registra um cliente; devolve também os eventos que ele perdeu desde `last_id`."""
+        subscriber = Subscriber(loop)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            backlog = self._backlog(last_id)
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _backlog(self, last_id: Optional[int]) -> List[Event]:
+        if last_id is None or last_id == self._last_id:
+            return []
+        oldest = self._history[0].id if self._history else self._last_id + 1
+        # id de outro processo/reinício ou eventos já fora do histórico
+        if last_id > self._last_id or last_id < oldest - 1:
+            return [Event(self._last_id, "resync", {})]
+        return [e for e in self._history if e.id > last_id]
+
+
+broker = Broker()
+
+
+def publish_on_commit(kind: str, build: Callable[[], Optional[dict]]) -> None:
+    """Publica `build()` depois do commit corrente; nada é montado sem clientes."""
+    if not broker.has_subscribers():
+        return
+
+    def send():
+        data = build()
+        if data is not None:
+            broker.publish(kind, data)
+
+    transaction.on_commit(send)
+
+
+def _parse_last_id(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _resync(subscriber: Subscriber) -> Optional[str]:
+    if not subscriber.lagged:
+        return None
+    subscriber.lagged = False
+    return Event(broker.last_id, "resync", {}).encode()
+
+
+def stream(last_id=None):
+    """Stream SSE para WSGI: bloqueia a thread esperando os eventos do cliente."""
+    subscriber, backlog = broker.subscribe(_parse_last_id(last_id))
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        for event in backlog:
+            yield event.encode()
+        while True:
+            try:
+                event = subscriber.queue.get(timeout=KEEPALIVE_S)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            resync = _resync(subscriber)
+            if resync:
+                yield resync
+            yield event.encode()
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+async def astream(last_id=None):
+    """Stream SSE para ASGI: uma corrotina por cliente, sem ocupar threads."""
+    subscriber, backlog = broker.subscribe(_parse_last_id(last_id), asyncio.get_running_loop())
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        for event in backlog:
+            yield event.encode()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            resync = _resync(subscriber)
+            if resync:
+                yield resync
+            yield event.encode()
+    finally:
+        broker.unsubscribe(subscriber)
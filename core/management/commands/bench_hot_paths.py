@@ -0,0 +1,100 @@
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.benchmarks import compare, dump, over_budget, parse_budgets, run_benchmarks
+from core.synthetic import FarmScale, generate_farm
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+class Command(BaseCommand):
+    help = "Benchmark latency and query counts of the hot views and API endpoints on a synthetic farm"
+
+    def add_arguments(self, parser):
+        defaults = FarmScale()
+        parser.add_argument("--printers", type=int, default=defaults.printers)
+        parser.add_argument("--components", type=int, default=defaults.components)
+        parser.add_argument("--products", type=int, default=defaults.products)
+        parser.add_argument("--bom-lines", type=int, default=defaults.bom_lines)
+        parser.add_argument("--bom-depth", type=int, default=defaults.bom_depth)
+        parser.add_argument("--orders", type=int, default=defaults.orders)
+        parser.add_argument("--workorders", type=int, default=defaults.workorders)
+        parser.add_argument("--logs", type=int, default=defaults.logs)
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per case (median is reported)")
+        parser.add_argument("--output", help="Write results as JSON to this file")
+        parser.add_argument("--compare", help="Previous JSON result to compare against")
+        parser.add_argument(
+            "--budget",
+            action="append",
+            default=[],
+            metavar="NAME=MS",
+            help="Fail if a case's median exceeds MS (repeatable), e.g. api_schedule_batch=1000",
+        )
+        parser.add_argument(
+            "--current-db",
+            action="store_true",
+            help="Benchmark the configured database as is, without seeding (schedule runs are previews and are not stored)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            budgets = parse_budgets(options["budget"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        scale = FarmScale(
+            printers=options["printers"],
+            components=options["components"],
+            products=options["products"],
+            bom_lines=options["bom_lines"],
+            bom_depth=options["bom_depth"],
+            orders=options["orders"],
+            workorders=options["workorders"],
+            logs=options["logs"],
+            seed=options["seed"],
+        )
+        if options["current_db"]:
+            created = None
+            results = run_benchmarks(options["repeat"])
+        else:
+            # banco descartável, como o do test runner
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                created = generate_farm(scale)
+                results = run_benchmarks(options["repeat"])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        payload = {
+            "commit": _git_commit(),
+            "scale": None if options["current_db"] else scale.as_dict(),
+            "created": created,
+            "results": results,
+        }
+        for name, r in results.items():
+            self.stdout.write(f"{name:28s} {r['median_ms']:9.1f} ms  {r['queries']:5d} queries")
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as fh:
+                baseline = json.load(fh)
+            for line in compare(results, baseline.get("results", {})):
+                self.stdout.write(line)
+        if options["output"]:
+            dump(payload, options["output"])
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+        failures = over_budget(results, budgets)
+        if failures:
+            raise CommandError("Over budget: " + "; ".join(failures))
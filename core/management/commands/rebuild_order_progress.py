@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.progress import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-order/per-component progress counters from BOM and production logs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drift; exit with an error if any counter is wrong",
+        )
+
+    def handle(self, *args, **options):
+        check = options["check"]
+        drift = rebuild_counters(fix=not check)
+        for order_id, component_id, stored, expected in drift:
+            self.stdout.write(
+                f"order {order_id} / component {component_id}: stored {stored}, expected {expected}"
+            )
+        if check and drift:
+            raise CommandError(f"{len(drift)} counter(s) out of sync.")
+        if check:
+            self.stdout.write(self.style.SUCCESS("Counters in sync."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(drift)} counter(s) fixed."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute materialized product BOM rollups (cost, print minutes, plates, materials)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drift; exit with an error if any rollup is wrong",
+        )
+
+    def handle(self, *args, **options):
+        check = options["check"]
+        drift = rebuild_rollups(fix=not check)
+        for product_id, stored, expected in drift:
+            self.stdout.write(f"product {product_id}: stored {stored}, expected {expected}")
+        if check and drift:
+            raise CommandError(f"{len(drift)} product rollup(s) out of sync.")
+        if check:
+            self.stdout.write(self.style.SUCCESS("Rollups in sync."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(drift)} product rollup(s) fixed."))
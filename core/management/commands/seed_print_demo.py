@@ -1,3 +1,5 @@
+import time
+
 from django.core.management.base import BaseCommand
 from core.models import (
     Printer,
@@ -6,12 +8,54 @@ from core.models import (
     BOMItem,
     WorkOrder,
 )
+from core.synthetic import FarmScale, generate_farm
+
+SCALE_OPTIONS = ("printers", "components", "products", "bom_lines", "bom_depth", "orders", "logs")
 
 
 class Command(BaseCommand):
-    help = "Seed demo data for 3D print scheduling"
+    help = "Seed demo data for 3D print scheduling (pass scale options for a synthetic farm)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--printers", type=int, help="Synthetic printers to create")
+        parser.add_argument("--components", type=int, help="Synthetic components to create")
+        parser.add_argument("--products", type=int, help="Synthetic products to create")
+        parser.add_argument("--bom-lines", type=int, help="Component lines per synthetic product")
+        parser.add_argument(
+            "--bom-depth", type=int, help="BOM levels; above 1, products use the level below as subassemblies"
+        )
+        parser.add_argument("--orders", type=int, help="Production orders (and 1/10 as many work orders)")
+        parser.add_argument("--logs", type=int, help="ProductionLog rows to create")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for reproducible data")
+        parser.add_argument("--prefix", default="SYN", help="Code prefix for synthetic rows")
 
     def handle(self, *args, **options):
+        if any(options[name] is not None for name in SCALE_OPTIONS):
+            self._seed_synthetic(options)
+        else:
+            self._seed_demo()
+
+    def _seed_synthetic(self, options):
+        defaults = FarmScale()
+        orders = options["orders"] if options["orders"] is not None else defaults.orders
+        scale = FarmScale(
+            printers=options["printers"] if options["printers"] is not None else defaults.printers,
+            components=options["components"] if options["components"] is not None else defaults.components,
+            products=options["products"] if options["products"] is not None else defaults.products,
+            bom_lines=options["bom_lines"] if options["bom_lines"] is not None else defaults.bom_lines,
+            bom_depth=options["bom_depth"] if options["bom_depth"] is not None else defaults.bom_depth,
+            orders=orders,
+            workorders=max(1, orders // 10) if orders else 0,
+            logs=options["logs"] if options["logs"] is not None else defaults.logs,
+            seed=options["seed"],
+        )
+        started = time.perf_counter()
+        created = generate_farm(scale, prefix=options["prefix"])
+        elapsed = time.perf_counter() - started
+        summary = ", ".join(f"{count} {name}" for name, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f"Synthetic farm created in {elapsed:.1f}s: {summary}."))
+
+    def _seed_demo(self):
         p1, _ = Printer.objects.get_or_create(
             name="Bambu P1S",
             defaults={"speed_factor": 1.0, "tags": "bambu,pla"},
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_printtask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Schedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('single', 'Ordem única'), ('batch', 'Todas as ordens')], default='single', max_length=12)),
+                ('plan_start', models.DateTimeField(default=django.utils.timezone.now)),
+                ('makespan_min', models.FloatField(default=0)),
+                ('unassigned_count', models.PositiveIntegerField(default=0)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('input_hash', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('workorders', models.ManyToManyField(blank=True, related_name='schedules', to='core.workorder')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScheduledAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('merged_workorder_ids', models.JSONField(blank=True, default=list)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('time_min', models.PositiveIntegerField(default=0)),
+                ('start_min', models.FloatField()),
+                ('end_min', models.FloatField()),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('component', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='core.component')),
+                ('printer', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='scheduled_assignments', to='core.printer')),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='core.schedule')),
+                ('workorder', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.workorder')),
+            ],
+            options={
+                'ordering': ['starts_at', 'printer_id'],
+                'indexes': [models.Index(fields=['schedule', 'printer', 'starts_at'], name='sched_assign_printer_start'), models.Index(fields=['schedule', 'starts_at'], name='sched_assign_start')],
+            },
+        ),
+    ]
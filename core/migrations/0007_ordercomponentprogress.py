@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    BOMItem = apps.get_model("core", "BOMItem")
+    ProductionLog = apps.get_model("core", "ProductionLog")
+    ProductionOrder = apps.get_model("core", "ProductionOrder")
+    OrderComponentProgress = apps.get_model("core", "OrderComponentProgress")
+
+    rows = {}
+    orders_by_product = {}
+    for order in ProductionOrder.objects.all():
+        orders_by_product.setdefault(order.product_id, []).append(order)
+    for item in BOMItem.objects.all():
+        for order in orders_by_product.get(item.product_id, []):
+            rows[(order.id, item.component_id)] = [item.quantity * order.quantity, 0]
+    totals = ProductionLog.objects.values("order_id", "component_id").annotate(total=models.Sum("quantity"))
+    for row in totals:
+        key = (row["order_id"], row["component_id"])
+        rows.setdefault(key, [0, 0])[1] = row["total"]
+    OrderComponentProgress.objects.bulk_create(
+        [
+            OrderComponentProgress(order_id=o, component_id=c, required=req, printed=printed)
+            for (o, c), (req, printed) in rows.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_schedule_scheduledassignment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderComponentProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('required', models.PositiveIntegerField(default=0)),
+                ('printed', models.PositiveIntegerField(default=0)),
+                ('component', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_progress', to='core.component')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='component_progress', to='core.productionorder')),
+            ],
+            options={
+                'unique_together': {('order', 'component')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
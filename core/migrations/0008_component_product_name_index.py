@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_ordercomponentprogress'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='component',
+            name='name',
+            field=models.CharField(db_index=True, max_length=120, verbose_name='Nome'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='name',
+            field=models.CharField(db_index=True, max_length=120, verbose_name='Nome'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:54
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    BOMItem = apps.get_model("core", "BOMItem")
+    Product = apps.get_model("core", "Product")
+
+    products = {p.id: p for p in Product.objects.all()}
+    materials = {pid: set() for pid in products}
+    for p in products.values():
+        p.rollup_cost = Decimal("0")
+        p.rollup_print_min = 0
+        p.rollup_plates = []
+    for item in BOMItem.objects.select_related("component").order_by("id"):
+        p = products[item.product_id]
+        comp = item.component
+        p.rollup_cost += comp.unit_cost * item.quantity
+        p.rollup_print_min += comp.print_time_min * item.quantity
+        p.rollup_plates.append([item.quantity, comp.batch_size])
+        if comp.material:
+            materials[p.id].add(comp.material)
+    for pid, p in products.items():
+        p.rollup_materials = ", ".join(sorted(materials[pid]))
+    Product.objects.bulk_update(
+        products.values(),
+        ["rollup_cost", "rollup_print_min", "rollup_materials", "rollup_plates"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_component_product_name_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rollup_cost',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Custo do BOM (R$)'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rollup_materials',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Materiais'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rollup_plates',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rollup_print_min',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tempo de impressão por unidade (min)'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-17 15:56
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollup_bom(apps, schema_editor):
+    BOMItem = apps.get_model("core", "BOMItem")
+    Product = apps.get_model("core", "Product")
+
+    vectors = {}
+    for product_id, component_id, qty in BOMItem.objects.order_by("id").values_list(
+        "product_id", "component_id", "quantity"
+    ):
+        vectors.setdefault(product_id, []).append([component_id, qty])
+    products = list(Product.objects.filter(pk__in=vectors))
+    for p in products:
+        p.rollup_bom = vectors[p.pk]
+    Product.objects.bulk_update(products, ["rollup_bom"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_product_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rollup_bom',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.CreateModel(
+            name='SubAssemblyItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Qtd por produto')),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='used_in', to='core.product')),
+                ('parent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subassembly_items', to='core.product')),
+            ],
+            options={
+                'unique_together': {('parent', 'child')},
+            },
+        ),
+        migrations.RunPython(backfill_rollup_bom, migrations.RunPython.noop),
+    ]
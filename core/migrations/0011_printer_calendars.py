@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-17 16:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_subassemblyitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperatorShift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Segunda'), (1, 'Terça'), (2, 'Quarta'), (3, 'Quinta'), (4, 'Sexta'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Dia da semana')),
+                ('start_time', models.TimeField(verbose_name='Início')),
+                ('end_time', models.TimeField(verbose_name='Fim')),
+            ],
+            options={
+                'ordering': ['weekday', 'start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PrinterDowntime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField(verbose_name='Início')),
+                ('ends_at', models.DateTimeField(verbose_name='Fim')),
+                ('reason', models.CharField(blank=True, max_length=120, verbose_name='Motivo')),
+                ('printer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='downtimes', to='core.printer')),
+            ],
+            options={
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['printer', 'ends_at'], name='downtime_printer_end')],
+            },
+        ),
+    ]
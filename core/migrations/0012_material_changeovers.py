@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 16:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_printer_calendars'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printer',
+            name='material_change_min',
+            field=models.PositiveIntegerField(default=0, verbose_name='Troca de material (min)'),
+        ),
+        migrations.CreateModel(
+            name='MaterialChangeover',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_material', models.CharField(max_length=60, verbose_name='De')),
+                ('to_material', models.CharField(max_length=60, verbose_name='Para')),
+                ('minutes', models.PositiveIntegerField(verbose_name='Minutos')),
+                ('printer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='changeovers', to='core.printer')),
+            ],
+            options={
+                'ordering': ['from_material', 'to_material'],
+                'constraints': [models.UniqueConstraint(fields=('printer', 'from_material', 'to_material'), name='uniq_changeover_pair')],
+            },
+        ),
+    ]
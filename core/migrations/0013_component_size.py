@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_material_changeovers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='component',
+            name='size_x',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Largura (mm)'),
+        ),
+        migrations.AddField(
+            model_name='component',
+            name='size_y',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Profundidade (mm)'),
+        ),
+        migrations.AddField(
+            model_name='component',
+            name='size_z',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Altura (mm)'),
+        ),
+    ]
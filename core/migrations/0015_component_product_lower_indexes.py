@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:17
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_schedule_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='component',
+            name='name',
+            field=models.CharField(max_length=120, verbose_name='Nome'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='name',
+            field=models.CharField(max_length=120, verbose_name='Nome'),
+        ),
+        migrations.AddIndex(
+            model_name='component',
+            index=models.Index(django.db.models.functions.text.Lower('code'), name='component_code_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='component',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='component_name_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.text.Lower('code'), name='product_code_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='product_name_lower'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_component_product_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='unassigned',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-17 17:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_names(apps, schema_editor):
+    ScheduledAssignment = apps.get_model("core", "ScheduledAssignment")
+    Printer = apps.get_model("core", "Printer")
+    Component = apps.get_model("core", "Component")
+    ScheduledAssignment.objects.update(
+        printer_name=Subquery(Printer.objects.filter(pk=OuterRef("printer_id")).values("name")[:1]),
+        component_name=Subquery(Component.objects.filter(pk=OuterRef("component_id")).values("name")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_schedule_unassigned'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduledassignment',
+            name='component_name',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='scheduledassignment',
+            name='printer_name',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AlterField(
+            model_name='scheduledassignment',
+            name='component',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.component'),
+        ),
+        migrations.AlterField(
+            model_name='scheduledassignment',
+            name='printer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduled_assignments', to='core.printer'),
+        ),
+        migrations.RunPython(backfill_names, migrations.RunPython.noop),
+    ]
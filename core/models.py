@@ -1,8 +1,12 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from datetime import timedelta
+from typing import List, Optional, Tuple
+import math
 
 # ======== Helpers ========
 def minutes_to_hhmm(total_minutes: int) -> str:
@@ -27,6 +31,10 @@ class Component(models.Model):
     per_plate_time_min = models.PositiveIntegerField("Tempo por prato (min)", default=0)
     batch_size = models.PositiveIntegerField("Qtd por prato", default=1)
     tags_required = models.CharField("Tags requeridas", max_length=120, blank=True)
+    # caixa envolvente da peça no prato (mm); vazio = cabe em qualquer impressora
+    size_x = models.PositiveIntegerField("Largura (mm)", null=True, blank=True)
+    size_y = models.PositiveIntegerField("Profundidade (mm)", null=True, blank=True)
+    size_z = models.PositiveIntegerField("Altura (mm)", null=True, blank=True)
 
     qty_on_hand = models.PositiveIntegerField("Qtd em estoque", default=0)
 
@@ -35,47 +43,103 @@ class Component(models.Model):
 
     class Meta:
         ordering = ["code"]
+        # busca por prefixo sem diferenciar maiúsculas (ver views._search)
+        indexes = [
+            models.Index(Lower("code"), name="component_code_lower"),
+            models.Index(Lower("name"), name="component_name_lower"),
+        ]
 
     def __str__(self):
         mat = f" ({self.material})" if self.material else ""
         return f"{self.code} - {self.name}{mat}"
 
+    # campos que entram nos totais materializados dos produtos (core.rollups)
+    ROLLUP_FIELDS = ("material", "unit_cost", "print_time_min", "batch_size")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # valores lidos, para a gravação saber se os totais dos produtos mudam
+        instance._loaded = dict(zip(field_names, values))
+        return instance
+
+    def rollup_inputs_changed(self, update_fields=None) -> bool:
+        """Se a última gravação alterou algum campo de `ROLLUP_FIELDS`.
+
+        Sem os valores lidos do banco (instância criada em memória), assume que sim.
+        """
+        if update_fields is not None and not set(update_fields) & set(self.ROLLUP_FIELDS):
+            return False
+        loaded = getattr(self, "_loaded", None)
+        if loaded is None:
+            return True
+        changed = any(f not in loaded or loaded[f] != getattr(self, f) for f in self.ROLLUP_FIELDS)
+        loaded.update({f: getattr(self, f) for f in self.ROLLUP_FIELDS})
+        return changed
+
     @property
     def print_time_hhmm(self):
         return minutes_to_hhmm(self.print_time_min)
 
+    @property
+    def size(self) -> Optional[Tuple[int, int, int]]:
+        """(x, y, z) em mm, com 0 nos eixos não informados; None sem nenhuma medida."""
+        dims = (self.size_x, self.size_y, self.size_z)
+        if not any(dims):
+            return None
+        return tuple(d or 0 for d in dims)
+
 class Product(models.Model):
     code = models.CharField("Código", max_length=32, unique=True)
     name = models.CharField("Nome", max_length=120)
     description = models.TextField("Descrição", blank=True)
     qty_on_hand = models.PositiveIntegerField("Qtd em estoque", default=0)
 
+    # totais do BOM materializados (mantidos por core.rollups via sinais)
+    rollup_cost = models.DecimalField("Custo do BOM (R$)", max_digits=12, decimal_places=2, default=0, editable=False)
+    rollup_print_min = models.PositiveIntegerField("Tempo de impressão por unidade (min)", default=0, editable=False)
+    rollup_materials = models.CharField("Materiais", max_length=255, blank=True, editable=False)
+    # [[qtd por produto, qtd por prato], ...] de cada linha do BOM
+    rollup_plates = models.JSONField(default=list, blank=True, editable=False)
+    # BOM explodido (submontagens incluídas): [[componente, qtd por unidade], ...]
+    rollup_bom = models.JSONField(default=list, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["code"]
+        indexes = [
+            models.Index(Lower("code"), name="product_code_lower"),
+            models.Index(Lower("name"), name="product_name_lower"),
+        ]
 
     def __str__(self):
         return f"{self.code} - {self.name}"
 
     def bom_required_minutes(self, quantity: int) -> int:
         # minutos totais para imprimir todos componentes deste produto * quantidade
-        total = 0
-        for item in self.bom_items.all():
-            total += (item.component.print_time_min * item.quantity * quantity)
-        return total
+        return self.rollup_print_min * quantity
 
     def estimated_build_hours(self, quantity: int) -> str:
         return minutes_to_hhmm(self.bom_required_minutes(quantity))
 
+    def plates_for(self, quantity: int) -> int:
+        """Número de pratos para imprimir `quantity` unidades do produto."""
+        total = 0
+        for per_unit, batch in self.rollup_plates:
+            pieces = per_unit * quantity
+            total += math.ceil(pieces / batch) if batch > 0 else pieces
+        return total
+
+    @property
+    def materials(self) -> List[str]:
+        return [m for m in self.rollup_materials.split(", ") if m]
+
     @property
     def total_cost(self) -> float:
         """Custo total somando os componentes do produto."""
-        total = 0.0
-        for item in self.bom_items.select_related("component"):
-            total += float(item.component.unit_cost) * item.quantity
-        return total
+        return float(self.rollup_cost)
 
 class BOMItem(models.Model):
     product = models.ForeignKey(Product, related_name="bom_items", on_delete=models.CASCADE)
@@ -92,6 +156,33 @@ class BOMItem(models.Model):
     def line_minutes(self):
         return self.component.print_time_min * self.quantity
 
+
+class SubAssemblyItem(models.Model):
+    """Produto usado como submontagem de outro (BOM multinível)."""
+
+    parent = models.ForeignKey(Product, related_name="subassembly_items", on_delete=models.CASCADE)
+    child = models.ForeignKey(Product, related_name="used_in", on_delete=models.PROTECT)
+    quantity = models.PositiveIntegerField("Qtd por produto", default=1, validators=[MinValueValidator(1)])
+
+    class Meta:
+        unique_together = ("parent", "child")
+
+    def __str__(self):
+        return f"{self.parent.code} -> {self.child.code} x{self.quantity}"
+
+    def clean(self):
+        from .bom import creates_cycle
+
+        if self.parent_id and self.child_id and creates_cycle(self.parent_id, self.child_id):
+            raise ValidationError({"child": "Submontagem criaria um ciclo no BOM."})
+
+    def save(self, *args, **kwargs):
+        from .bom import BOMCycleError, creates_cycle
+
+        if creates_cycle(self.parent_id, self.child_id):
+            raise BOMCycleError("Submontagem criaria um ciclo no BOM.")
+        super().save(*args, **kwargs)
+
 # ======== Produção ========
 class ProductionOrder(models.Model):
     STATUS_CHOICES = [
@@ -112,40 +203,44 @@ class ProductionOrder(models.Model):
     def __str__(self):
         return f"OP #{self.id} - {self.product.code} x{self.quantity} ({self.get_status_display()})"
 
+    def _counters(self, component: 'Component') -> Tuple[int, int]:
+        """(requerido, impresso) lidos do contador mantido em OrderComponentProgress."""
+        row = (
+            self.component_progress.filter(component=component)
+            .values_list("required", "printed")
+            .first()
+        )
+        if row is not None:
+            return row
+        # sem contador (dados antigos ou carga em massa): calcula a partir do BOM/logs
+        from .progress import printed_counts
+
+        per_unit = dict(self.product.rollup_bom).get(component.id, 0)
+        key = (self.id, component.id)
+        return per_unit * self.quantity, printed_counts([key])[key]
+
     def required_for_component(self, component: 'Component') -> int:
-        try:
-            bom = self.product.bom_items.get(component=component)
-        except BOMItem.DoesNotExist:
-            return 0
-        return bom.quantity * self.quantity
+        return self._counters(component)[0]
 
     def printed_for_component(self, component: 'Component') -> int:
-        agg = self.logs.filter(component=component).aggregate(models.Sum("quantity"))
-        return agg["quantity__sum"] or 0
+        return self._counters(component)[1]
 
     def progress_for_component(self, component: 'Component') -> float:
-        req = self.required_for_component(component)
+        req, printed = self._counters(component)
         if req <= 0:
             return 100.0
-        printed = self.printed_for_component(component)
         return min(100.0, (printed / req) * 100.0)
 
     def time_remaining_minutes_for_component(self, component: 'Component') -> int:
-        req = self.required_for_component(component)
-        printed = self.printed_for_component(component)
+        req, printed = self._counters(component)
         rem = max(0, req - printed)
         return rem * component.print_time_min
 
     def time_remaining_minutes(self) -> int:
         """Tempo restante agregado (minutos) para concluir a ordem."""
-        items = list(self.product.bom_items.select_related("component"))
-        if not items:
-            return 0
-        times = [
-            self.time_remaining_minutes_for_component(item.component)
-            for item in items
-        ]
-        return max(times) if times else 0
+        from .progress import progress_for_orders
+
+        return progress_for_orders([self])[0].time_remaining_min
 
     @property
     def time_remaining_hhmm(self) -> str:
@@ -154,14 +249,9 @@ class ProductionOrder(models.Model):
     @property
     def progress_percent(self) -> float:
         # média ponderada por quantidade requerida de cada componente
-        items = list(self.product.bom_items.all())
-        if not items:
-            return 100.0
-        total_req = sum(self.required_for_component(i.component) for i in items)
-        if total_req == 0:
-            return 100.0
-        total_printed = sum(self.printed_for_component(i.component) for i in items)
-        return min(100.0, (total_printed / total_req) * 100.0)
+        from .progress import progress_for_orders
+
+        return progress_for_orders([self])[0].progress_percent
 
 class ProductionLog(models.Model):
     order = models.ForeignKey(ProductionOrder, related_name="logs", on_delete=models.CASCADE)
@@ -179,6 +269,24 @@ class ProductionLog(models.Model):
         return minutes_to_hhmm(self.spent_minutes)
 
 
+class OrderComponentProgress(models.Model):
+    """Contador desnormalizado de progresso por ordem e componente.
+
+    Mantido pelos sinais de ProductionLog, ProductionOrder e BOMItem; pode ser
+    reconstruído com `manage.py rebuild_order_progress`.
+    """
+    order = models.ForeignKey(ProductionOrder, related_name="component_progress", on_delete=models.CASCADE)
+    component = models.ForeignKey(Component, related_name="order_progress", on_delete=models.CASCADE)
+    required = models.PositiveIntegerField(default=0)
+    printed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("order", "component")
+
+    def __str__(self):
+        return f"OP #{self.order_id} / {self.component_id}: {self.printed}/{self.required}"
+
+
 # ======== Impressoras e Ordens de Trabalho ========
 class Printer(models.Model):
     name = models.CharField(max_length=120)
@@ -188,10 +296,91 @@ class Printer(models.Model):
     volume_x = models.PositiveIntegerField(null=True, blank=True)
     volume_y = models.PositiveIntegerField(null=True, blank=True)
     volume_z = models.PositiveIntegerField(null=True, blank=True)
+    # purga/troca de filamento quando o prato seguinte usa outro material
+    material_change_min = models.PositiveIntegerField("Troca de material (min)", default=0)
 
     def __str__(self):
         return self.name
 
+    @property
+    def volume(self) -> Optional[Tuple[Optional[int], Optional[int], Optional[int]]]:
+        """Volume de impressão (x, y, z) em mm; eixos vazios não limitam."""
+        dims = (self.volume_x, self.volume_y, self.volume_z)
+        return dims if any(dims) else None
+
+
+class PrinterDowntime(models.Model):
+    """Janela em que a impressora não pode imprimir (manutenção, reserva...)."""
+
+    printer = models.ForeignKey(Printer, related_name="downtimes", on_delete=models.CASCADE)
+    starts_at = models.DateTimeField("Início")
+    ends_at = models.DateTimeField("Fim")
+    reason = models.CharField("Motivo", max_length=120, blank=True)
+
+    class Meta:
+        ordering = ["starts_at"]
+        indexes = [models.Index(fields=["printer", "ends_at"], name="downtime_printer_end")]
+
+    def __str__(self):
+        return f"{self.printer} {self.starts_at:%d/%m %H:%M}–{self.ends_at:%d/%m %H:%M}"
+
+    def clean(self):
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError("O fim deve ser depois do início.")
+
+
+class OperatorShift(models.Model):
+    """Turno semanal com operador presente para trocar pratos.
+
+    Sem nenhum turno cadastrado, considera-se operador disponível o tempo
+    todo. Turnos com fim antes do início atravessam a meia-noite.
+    """
+
+    WEEKDAYS = [
+        (0, "Segunda"),
+        (1, "Terça"),
+        (2, "Quarta"),
+        (3, "Quinta"),
+        (4, "Sexta"),
+        (5, "Sábado"),
+        (6, "Domingo"),
+    ]
+    weekday = models.PositiveSmallIntegerField("Dia da semana", choices=WEEKDAYS)
+    start_time = models.TimeField("Início")
+    end_time = models.TimeField("Fim")
+
+    class Meta:
+        ordering = ["weekday", "start_time"]
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} {self.start_time:%H:%M}–{self.end_time:%H:%M}"
+
+
+class MaterialChangeover(models.Model):
+    """Tempo de troca entre dois materiais, sobrepondo `Printer.material_change_min`.
+
+    Sem impressora, vale para todas as que não têm uma linha própria.
+    """
+
+    printer = models.ForeignKey(
+        Printer, related_name="changeovers", on_delete=models.CASCADE, null=True, blank=True
+    )
+    from_material = models.CharField("De", max_length=60)
+    to_material = models.CharField("Para", max_length=60)
+    minutes = models.PositiveIntegerField("Minutos")
+
+    class Meta:
+        ordering = ["from_material", "to_material"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["printer", "from_material", "to_material"], name="uniq_changeover_pair"
+            )
+        ]
+
+    def __str__(self):
+        where = f" ({self.printer})" if self.printer_id else ""
+        return f"{self.from_material} → {self.to_material}: {self.minutes} min{where}"
+
 
 class PrintTask(models.Model):
     order = models.ForeignKey(
@@ -251,3 +440,83 @@ class WorkOrder(models.Model):
 
     def __str__(self):
         return f"WO #{self.id} - {self.product.code} x{self.quantity}"
+
+
+# ======== Planos de impressão ========
+class Schedule(models.Model):
+    MODE_CHOICES = [
+        ("single", "Ordem única"),
+        ("batch", "Todas as ordens"),
+    ]
+    mode = models.CharField(max_length=12, choices=MODE_CHOICES, default="single")
+    plan_start = models.DateTimeField(default=timezone.now)
+    makespan_min = models.FloatField(default=0)
+    unassigned_count = models.PositiveIntegerField(default=0)
+    # pratos sem impressora compatível: [{component_id, workorder_id, merged_workorder_ids, quantity, time_min}, ...]
+    unassigned = models.JSONField(default=list, blank=True)
+    # incrementado a cada ajuste incremental do plano
+    version = models.PositiveIntegerField(default=1)
+    input_hash = models.CharField(max_length=64, db_index=True, blank=True)
+    workorders = models.ManyToManyField(WorkOrder, blank=True, related_name="schedules")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+
+    def __str__(self):
+        return f"Plano #{self.id} ({self.get_mode_display()}) - {minutes_to_hhmm(self.makespan_min)}"
+
+
+class ScheduledAssignment(models.Model):
+    schedule = models.ForeignKey(Schedule, related_name="assignments", on_delete=models.CASCADE)
+    # planos gravados não impedem excluir impressoras e componentes; os nomes ficam
+    printer = models.ForeignKey(
+        Printer, null=True, blank=True, related_name="scheduled_assignments", on_delete=models.SET_NULL
+    )
+    printer_name = models.CharField(max_length=120, blank=True)
+    component = models.ForeignKey(Component, null=True, blank=True, on_delete=models.SET_NULL)
+    component_name = models.CharField(max_length=120, blank=True)
+    workorder = models.ForeignKey(WorkOrder, null=True, blank=True, on_delete=models.SET_NULL)
+    merged_workorder_ids = models.JSONField(default=list, blank=True)
+    quantity = models.PositiveIntegerField(default=1)
+    time_min = models.PositiveIntegerField(default=0)
+    start_min = models.FloatField()
+    end_min = models.FloatField()
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["starts_at", "printer_id"]
+        indexes = [
+            models.Index(fields=["schedule", "printer", "starts_at"], name="sched_assign_printer_start"),
+            models.Index(fields=["schedule", "starts_at"], name="sched_assign_start"),
+        ]
+
+    def __str__(self):
+        return f"{self.printer_name} - {self.component_name} x{self.quantity} @ {self.starts_at:%d/%m %H:%M}"
+
+
+class ScheduleJob(models.Model):
+    """Escalonamento rodando em segundo plano (ver `core.schedule_jobs`)."""
+
+    STATUS_CHOICES = [
+        ("queued", "Na fila"),
+        ("done", "Concluído"),
+        ("failed", "Falhou"),
+    ]
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    # corpo recebido, como em /api/schedule/
+    params = models.JSONField(default=dict, blank=True)
+    schedule = models.ForeignKey(Schedule, null=True, blank=True, on_delete=models.SET_NULL, related_name="jobs")
+    # resposta completa de /api/schedule/ quando concluído
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+
+    def __str__(self):
+        return f"Job #{self.id} ({self.get_status_display()})"
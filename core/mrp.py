@@ -0,0 +1,132 @@
+"""Necessidades líquidas (MRP): desconta o estoque de componentes da demanda aberta.
+
+A demanda bruta vem das ordens de produção abertas (o que falta imprimir,
+segundo os contadores de progresso) e das ordens de trabalho (BOM explodido
+x quantidade). O `qty_on_hand` de cada componente é alocado às ordens por
+prioridade e prazo; o que sobra sem estoque é a necessidade líquida, a única
+parte que precisa virar prato.
+"""
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .bom import bom_lines, products_of
+from .models import Component, OrderComponentProgress, ProductionOrder, WorkOrder
+from .scheduling import load_open_workorders
+
+PRODUCTION = "production"
+WORK = "work"
+# ordens de produção não têm prioridade própria: entram com a padrão de WorkOrder
+PRODUCTION_PRIORITY = 1
+
+
+@dataclass
+class DemandLine:
+    kind: str
+    order_id: int
+    component: Component
+    gross: int
+    allocated: int = 0
+
+    @property
+    def net(self) -> int:
+        return self.gross - self.allocated
+
+
+@dataclass
+class NetRequirements:
+    lines: List[DemandLine]
+    on_hand: Dict[int, int]
+    left: Dict[int, int]
+
+    def for_workorders(self) -> Dict[int, List[Tuple[Component, int]]]:
+        """Linhas líquidas por ordem de trabalho, no formato aceito pela expansão em pratos."""
+        result: Dict[int, List[Tuple[Component, int]]] = {}
+        for line in self.lines:
+            if line.kind == WORK and line.net > 0:
+                result.setdefault(line.order_id, []).append((line.component, line.net))
+        return result
+
+    def for_production_orders(self) -> Dict[int, Dict[int, int]]:
+        """{ordem: {componente: qtd líquida}} das ordens de produção."""
+        result: Dict[int, Dict[int, int]] = {}
+        for line in self.lines:
+            if line.kind == PRODUCTION:
+                result.setdefault(line.order_id, {})[line.component.id] = line.net
+        return result
+
+    def by_component(self) -> Dict[int, Dict[str, int]]:
+        totals: Dict[int, Dict[str, int]] = {}
+        for line in self.lines:
+            row = totals.setdefault(
+                line.component.id, {"gross": 0, "allocated": 0, "net": 0}
+            )
+            row["gross"] += line.gross
+            row["allocated"] += line.allocated
+            row["net"] += line.net
+        for component_id, row in totals.items():
+            row["on_hand"] = self.on_hand.get(component_id, 0)
+            row["left"] = self.left.get(component_id, 0)
+        return totals
+
+
+def _sort_key(kind: str, order) -> tuple:
+    priority = order.priority if kind == WORK else PRODUCTION_PRIORITY
+    return (
+        -priority,
+        order.due_date is None,
+        order.due_date or date.max,
+        order.created_at,
+        kind != PRODUCTION,
+        order.id,
+    )
+
+
+def net_requirements(
+    production_orders: Optional[Iterable[ProductionOrder]] = None,
+    workorders: Optional[Iterable[WorkOrder]] = None,
+) -> NetRequirements:
+    """Aloca o estoque às ordens abertas e devolve a demanda líquida.
+
+    Sem argumentos, considera todas as ordens de produção abertas e todas as
+    ordens de trabalho. As ordens são atendidas por prioridade (maior
+    primeiro), depois prazo (sem prazo por último) e criação. Tudo é lido em
+    consultas fixas (ordens, BOM explodido com componentes e contadores),
+    independentemente do número de ordens.
+    """
+    if production_orders is None:
+        production_orders = ProductionOrder.objects.filter(status="open").select_related("product")
+    if workorders is None:
+        workorders = load_open_workorders()
+    production_orders = list(production_orders)
+    workorders = list(workorders)
+    lines_by_product = bom_lines(products_of(production_orders) + products_of(workorders))
+
+    printed: Dict[Tuple[int, int], int] = {}
+    if production_orders:
+        printed = {
+            (order_id, component_id): value
+            for order_id, component_id, value in OrderComponentProgress.objects.filter(
+                order_id__in=[o.id for o in production_orders]
+            ).values_list("order_id", "component_id", "printed")
+        }
+
+    sequence = [(PRODUCTION, o) for o in production_orders] + [(WORK, wo) for wo in workorders]
+    sequence.sort(key=lambda item: _sort_key(*item))
+
+    on_hand: Dict[int, int] = {}
+    left: Dict[int, int] = {}
+    result: List[DemandLine] = []
+    for kind, order in sequence:
+        for bom in lines_by_product.get(order.product_id, []):
+            comp = bom.component
+            gross = bom.quantity * order.quantity
+            if kind == PRODUCTION:
+                gross = max(0, gross - printed.get((order.id, comp.id), 0))
+            if comp.id not in left:
+                on_hand[comp.id] = left[comp.id] = comp.qty_on_hand
+            line = DemandLine(kind, order.id, comp, gross)
+            line.allocated = min(gross, left[comp.id])
+            left[comp.id] -= line.allocated
+            result.append(line)
+    return NetRequirements(lines=result, on_hand=on_hand, left=left)
@@ -0,0 +1,164 @@
+from bisect import insort
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import time
+
+from .scheduling import AssignmentDTO, PrinterDTO, TaskDTO, compatibility_matrix, requirement_key
+
+EPS = 1e-9
+
+
+@dataclass
+class OptimizationStats:
+    makespan_before: float
+    makespan_after: float
+    lower_bound: float
+    moves: int
+    swaps: int
+    elapsed_ms: float
+
+    @property
+    def gap_percent(self) -> float:
+        if self.lower_bound <= 0:
+            return 0.0
+        return (self.makespan_after - self.lower_bound) / self.lower_bound * 100.0
+
+
+def makespan_lower_bound(
+    tasks: List[TaskDTO],
+    printers: List[PrinterDTO],
+    printer_times: Optional[Dict[int, float]] = None,
+) -> float:
+    """Limite inferior do makespan pela relaxação fracionária.
+
+    Para cada requisito R (tags e dimensões), todas as tarefas cujas
+    impressoras compatíveis estão contidas em P(R) precisam caber na
+    capacidade somada de P(R). Também nenhuma tarefa termina antes do seu
+    tempo na impressora compatível mais rápida.
+    """
+    offsets = printer_times or {}
+    matrix = compatibility_matrix(printers)
+    index: Dict[tuple, Tuple[int, ...]] = {}
+    work: Dict[tuple, float] = {}
+    bound = 0.0
+    for task in tasks:
+        key = requirement_key(task)
+        compat = index[key] = matrix.indexes(task)
+        if not compat:
+            continue
+        work[key] = work.get(key, 0.0) + task.time_min
+        bound = max(
+            bound,
+            min(offsets.get(printers[i].id, 0.0) + task.time_min / printers[i].speed_factor for i in compat),
+        )
+    compat_sets = {key: frozenset(index[key]) for key in work}
+    for key, group in compat_sets.items():
+        total = sum(w for other, w in work.items() if compat_sets[other] <= group)
+        capacity = sum(printers[i].speed_factor for i in group)
+        already = sum(offsets.get(printers[i].id, 0.0) * printers[i].speed_factor for i in group)
+        bound = max(bound, (total + already) / capacity)
+    return bound
+
+
+def optimize_schedule(
+    assignments: List[AssignmentDTO],
+    printers: List[PrinterDTO],
+    time_budget_ms: float = 100.0,
+    printer_times: Optional[Dict[int, float]] = None,
+) -> Tuple[List[AssignmentDTO], Dict[int, float], OptimizationStats]:
+    """Melhora o makespan de um plano guloso por busca local (move/swap).
+
+    A cada passo a impressora crítica (maior carga) tenta entregar uma tarefa
+    para outra impressora compatível; não havendo movimento que reduza o par,
+    tenta trocar uma tarefa sua por uma menor de outra impressora. A ordem
+    relativa das tarefas em cada impressora segue o início original, para
+    preservar a sequência de prioridades. Para no ótimo local ou ao esgotar
+    `time_budget_ms`.
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget_ms / 1000.0
+    offsets = printer_times or {}
+    pos = {p.id: i for i, p in enumerate(printers)}
+    speeds = [p.speed_factor for p in printers]
+    tasks = [a.task for a in assignments]
+    matrix = compatibility_matrix(printers)
+
+    # fila de cada impressora: (início original, sequência, tarefa)
+    queues: List[List[Tuple[float, int, TaskDTO]]] = [[] for _ in printers]
+    for seq, a in enumerate(sorted(assignments, key=lambda a: a.start)):
+        queues[pos[a.printer_id]].append((a.start, seq, a.task))
+    loads = [
+        offsets.get(p.id, 0.0) + sum(t.time_min for _, _, t in queues[i]) / speeds[i]
+        for i, p in enumerate(printers)
+    ]
+    makespan_before = max(loads, default=0.0)
+    moves = swaps = 0
+
+    while time.perf_counter() < deadline:
+        crit = max(range(len(printers)), key=lambda i: loads[i], default=None)
+        if crit is None or not queues[crit]:
+            break
+        crit_load = loads[crit]
+        best = None  # (novo máximo do par, tipo, entrada, destino, entrada trocada)
+        for entry in sorted(queues[crit], key=lambda e: e[2].time_min, reverse=True):
+            task = entry[2]
+            w_crit = task.time_min / speeds[crit]
+            for q in matrix.indexes(task):
+                if q == crit:
+                    continue
+                new_max = max(crit_load - w_crit, loads[q] + task.time_min / speeds[q])
+                if new_max < crit_load - EPS and (best is None or new_max < best[0]):
+                    best = (new_max, "move", entry, q, None)
+        if best is None:
+            for entry in queues[crit]:
+                task = entry[2]
+                for q in matrix.indexes(task):
+                    if q == crit:
+                        continue
+                    for other in queues[q]:
+                        u = other[2]
+                        if u.time_min >= task.time_min or crit not in matrix.indexes(u):
+                            continue
+                        new_crit = crit_load + (u.time_min - task.time_min) / speeds[crit]
+                        new_q = loads[q] + (task.time_min - u.time_min) / speeds[q]
+                        new_max = max(new_crit, new_q)
+                        if new_max < crit_load - EPS and (best is None or new_max < best[0]):
+                            best = (new_max, "swap", entry, q, other)
+                if time.perf_counter() >= deadline:
+                    break
+        if best is None:
+            break
+        _, kind, entry, q, other = best
+        task = entry[2]
+        queues[crit].remove(entry)
+        loads[crit] -= task.time_min / speeds[crit]
+        insort(queues[q], entry)
+        loads[q] += task.time_min / speeds[q]
+        if kind == "swap":
+            queues[q].remove(other)
+            loads[q] -= other[2].time_min / speeds[q]
+            insort(queues[crit], other)
+            loads[crit] += other[2].time_min / speeds[crit]
+            swaps += 1
+        else:
+            moves += 1
+
+    result: List[AssignmentDTO] = []
+    final_times: Dict[int, float] = {}
+    for i, p in enumerate(printers):
+        t = offsets.get(p.id, 0.0)
+        for _, _, task in queues[i]:
+            end = t + task.time_min / speeds[i]
+            result.append(AssignmentDTO(p.id, task, t, end))
+            t = end
+        final_times[p.id] = t
+    result.sort(key=lambda a: (a.start, pos[a.printer_id]))
+    stats = OptimizationStats(
+        makespan_before=makespan_before,
+        makespan_after=max(final_times.values(), default=0.0),
+        lower_bound=makespan_lower_bound(tasks, printers, offsets),
+        moves=moves,
+        swaps=swaps,
+        elapsed_ms=(time.perf_counter() - started) * 1000.0,
+    )
+    return result, final_times, stats
@@ -1,7 +1,9 @@
 from dataclasses import dataclass
-from typing import List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 from django.core.exceptions import ValidationError
+from .bom import BOMLine, bom_lines, products_of
 from .models import ProductionOrder, Component, PrintTask
+from .progress import printed_counts
 
 
 @dataclass
@@ -22,49 +24,109 @@ class ComponentInfo:
     tasks: List[TaskInfo]
 
 
-def calculate_order_times(order: ProductionOrder) -> Tuple[List[ComponentInfo], float]:
-    """Calcula tempos agregados de impressão para uma ordem de produção."""
+@dataclass
+class OrderTimes:
+    order: ProductionOrder
+    components: List[ComponentInfo]
+    total_h: float
+    error: Optional[str] = None
+
+
+def _order_times(order, bom_items, printed, tasks_by_component) -> OrderTimes:
+    """Monta os ComponentInfo de uma ordem a partir de dados já carregados.
+
+    As quantidades de cada linha do BOM são levantadas em vetores paralelos e
+    o tempo restante é calculado em uma única passada sobre eles.
+    """
+    comps = [bom.component for bom in bom_items]
+    required = [bom.quantity * order.quantity for bom in bom_items]
+    done = [printed.get(c.id, 0) for c in comps]
+    t_piece = [(c.print_time_min or 0) / 60.0 for c in comps]
+    tasks = [tasks_by_component.get(c.id, []) for c in comps]
+    assigned = [sum(t.quantity for t in ts) for ts in tasks]
+    capacity = [sum((t.printer.speed_factor or 1.0) for t in ts) for ts in tasks]
+    remaining = [max(r - d, 0) for r, d in zip(required, done)]
+
+    error = None
     stats: List[ComponentInfo] = []
-    for bom in order.product.bom_items.select_related("component"):
-        comp = bom.component
-        required = order.required_for_component(comp)
-        t_piece = (comp.print_time_min or 0) / 60.0
-        done = order.printed_for_component(comp)
-        remaining_qty = max(required - done, 0)
-        tasks = list(
-            order.print_tasks.filter(component=comp, printer__is_active=True).select_related("printer")
-        )
-        assigned = sum(t.quantity for t in tasks)
-        capacity = sum((t.printer.speed_factor or 1.0) for t in tasks)
-        if assigned > required:
-            raise ValidationError(
-                f"A soma das quantidades das tarefas para o componente {comp.name} ({assigned}) excede a quantidade necessária ({required}). Ajuste as tarefas."
+    for i, comp in enumerate(comps):
+        if error is None and assigned[i] > required[i]:
+            error = (
+                f"A soma das quantidades das tarefas para o componente {comp.name} ({assigned[i]}) excede a quantidade necessária ({required[i]}). Ajuste as tarefas."
             )
-        task_infos: List[TaskInfo] = []
-        for t in tasks:
-            speed = t.printer.speed_factor or 1.0
-            task_time = (t.quantity * t_piece) / speed
-            task_infos.append(TaskInfo(t, task_time))
-        if remaining_qty > 0 and capacity > 0:
-            remaining_time = (remaining_qty * t_piece) / capacity
-        elif remaining_qty > 0:
+        if remaining[i] > 0 and capacity[i] > 0:
+            remaining_time = (remaining[i] * t_piece[i]) / capacity[i]
+        elif remaining[i] > 0:
             remaining_time = None
         else:
             remaining_time = 0.0
         stats.append(
             ComponentInfo(
                 component=comp,
-                t_piece_h=t_piece,
-                required_qty=required,
-                done_qty=done,
-                remaining_qty=remaining_qty,
-                capacity=capacity,
+                t_piece_h=t_piece[i],
+                required_qty=required[i],
+                done_qty=done[i],
+                remaining_qty=remaining[i],
+                capacity=capacity[i],
                 remaining_time_h=remaining_time,
-                tasks=task_infos,
+                tasks=[
+                    TaskInfo(t, (t.quantity * t_piece[i]) / (t.printer.speed_factor or 1.0))
+                    for t in tasks[i]
+                ],
             )
         )
     total = max(
         (s.remaining_time_h for s in stats if s.remaining_time_h is not None),
         default=0.0,
     )
-    return stats, total
+    return OrderTimes(order=order, components=stats, total_h=total, error=error)
+
+
+def calculate_orders_times(orders: Iterable[ProductionOrder]) -> List[OrderTimes]:
+    """Versão em lote de `calculate_order_times`.
+
+    Carrega as linhas do BOM explodido, os contadores de impressão e as
+    tarefas de todas as ordens em consultas fixas, qualquer que seja a
+    quantidade de ordens (mais uma, só se faltar algum contador).
+    Ordens com tarefas acima do requerido voltam com `error` preenchido em vez
+    de levantar exceção.
+    """
+    orders = list(orders)
+    if not orders:
+        return []
+    order_ids = [o.id for o in orders]
+
+    bom_by_product: Dict[int, List[BOMLine]] = bom_lines(products_of(orders))
+
+    # contadores, com soma dos registros para pares sem contador (como no painel)
+    printed: Dict[int, Dict[int, int]] = {}
+    counts = printed_counts(
+        (order.id, item.component_id) for order in orders for item in bom_by_product.get(order.product_id, [])
+    )
+    for (order_id, component_id), value in counts.items():
+        printed.setdefault(order_id, {})[component_id] = value
+
+    tasks: Dict[int, Dict[int, List[PrintTask]]] = {}
+    task_qs = PrintTask.objects.filter(
+        order_id__in=order_ids, printer__is_active=True
+    ).select_related("printer").order_by("id")
+    for t in task_qs:
+        tasks.setdefault(t.order_id, {}).setdefault(t.component_id, []).append(t)
+
+    return [
+        _order_times(
+            order,
+            bom_by_product.get(order.product_id, []),
+            printed.get(order.id, {}),
+            tasks.get(order.id, {}),
+        )
+        for order in orders
+    ]
+
+
+def calculate_order_times(order: ProductionOrder) -> Tuple[List[ComponentInfo], float]:
+    """Calcula tempos agregados de impressão para uma ordem de produção."""
+    result = calculate_orders_times([order])[0]
+    if result.error:
+        raise ValidationError(result.error)
+    return result.components, result.total_h
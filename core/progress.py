@@ -0,0 +1,276 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .bom import BOMLine, bom_lines, products_of
+from .models import (
+    Component,
+    OrderComponentProgress,
+    Product,
+    ProductionLog,
+    ProductionOrder,
+    minutes_to_hhmm,
+)
+
+
+@dataclass
+class ComponentProgress:
+    component: Component
+    required: int
+    printed: int
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.required - self.printed)
+
+    @property
+    def progress(self) -> float:
+        if self.required <= 0:
+            return 100.0
+        return min(100.0, (self.printed / self.required) * 100.0)
+
+    @property
+    def time_remaining_min(self) -> int:
+        return self.remaining * self.component.print_time_min
+
+
+@dataclass
+class OrderProgress:
+    order: ProductionOrder
+    rows: List[ComponentProgress] = field(default_factory=list)
+
+    @property
+    def total_required(self) -> int:
+        return sum(r.required for r in self.rows)
+
+    @property
+    def total_printed(self) -> int:
+        return sum(r.printed for r in self.rows)
+
+    @property
+    def progress_percent(self) -> float:
+        total_req = self.total_required
+        if total_req == 0:
+            return 100.0
+        return min(100.0, (self.total_printed / total_req) * 100.0)
+
+    @property
+    def time_remaining_min(self) -> int:
+        return max((r.time_remaining_min for r in self.rows), default=0)
+
+
+def printed_counts(pairs: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], int]:
+    """Impresso por (ordem, componente), lido dos contadores.
+
+    Pares sem contador (dados antigos ou carga em massa) são somados dos
+    registros de impressão, numa consulta a mais só quando faltar algum. É a
+    mesma regra de `ProductionOrder._counters`.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    printed: Dict[Tuple[int, int], int] = {
+        (order_id, component_id): value
+        for order_id, component_id, value in OrderComponentProgress.objects.filter(
+            order_id__in={order_id for order_id, _ in pairs}
+        ).values_list("order_id", "component_id", "printed")
+    }
+    missing = pairs - printed.keys()
+    if missing:
+        logs = _printed_from_logs({order_id for order_id, _ in missing})
+        printed.update({key: logs.get(key, 0) for key in missing})
+    return printed
+
+
+def progress_for_orders(orders: Iterable[ProductionOrder]) -> List[OrderProgress]:
+    """Progresso de várias ordens com número fixo de consultas.
+
+    As linhas do BOM explodido (com componente) de todos os produtos
+    envolvidos e os contadores de impressão por (ordem, componente) são lidos
+    em consultas fixas, independentemente de quantas ordens forem passadas
+    (ver `printed_counts` para ordens sem contador).
+    """
+    orders = list(orders)
+    if not orders:
+        return []
+    bom_by_product: Dict[int, List[BOMLine]] = bom_lines(products_of(orders))
+    printed = printed_counts(
+        (order.id, item.component_id) for order in orders for item in bom_by_product.get(order.product_id, [])
+    )
+
+    result: List[OrderProgress] = []
+    for order in orders:
+        progress = OrderProgress(order)
+        for item in bom_by_product.get(order.product_id, []):
+            progress.rows.append(
+                ComponentProgress(
+                    component=item.component,
+                    required=item.quantity * order.quantity,
+                    printed=printed.get((order.id, item.component_id), 0),
+                )
+            )
+        result.append(progress)
+    return result
+
+
+def progress_delta(order_id: int, component_id: int) -> Optional[dict]:
+    """Totais da ordem e a linha do componente, no formato do painel (evento `progress`).
+
+    None se a ordem não existe mais (ex.: excluída junto com os registros).
+    """
+    order = ProductionOrder.objects.select_related("product").filter(pk=order_id).first()
+    if order is None:
+        return None
+    (op,) = progress_for_orders([order])
+    row = next((r for r in op.rows if r.component.id == component_id), None)
+    return {
+        "order_id": order.id,
+        "status": order.status,
+        "total_required": op.total_required,
+        "total_printed": op.total_printed,
+        "progress_percent": op.progress_percent,
+        "time_remaining_hhmm": minutes_to_hhmm(op.time_remaining_min),
+        "component": None
+        if row is None
+        else {
+            "component_id": component_id,
+            "required": row.required,
+            "printed": row.printed,
+            "remaining": row.remaining,
+            "progress": row.progress,
+            "time_remaining_hhmm": minutes_to_hhmm(row.time_remaining_min),
+        },
+    }
+
+
+# ======== Manutenção de OrderComponentProgress ========
+def _printed_from_logs(order_ids=None) -> Dict[Tuple[int, int], int]:
+    qs = ProductionLog.objects.all()
+    if order_ids is not None:
+        qs = qs.filter(order_id__in=order_ids)
+    return {
+        (row["order_id"], row["component_id"]): row["total"]
+        for row in qs.values("order_id", "component_id").annotate(total=Sum("quantity"))
+    }
+
+
+def _required_from_bom(orders: List[ProductionOrder]) -> Dict[Tuple[int, int], int]:
+    required: Dict[Tuple[int, int], int] = {}
+    by_product: Dict[int, List[ProductionOrder]] = {}
+    for order in orders:
+        by_product.setdefault(order.product_id, []).append(order)
+    vectors = Product.objects.filter(pk__in=by_product.keys()).order_by().values_list("id", "rollup_bom")
+    for product_id, vector in vectors:
+        for component_id, qty in vector:
+            for order in by_product[product_id]:
+                required[(order.id, component_id)] = qty * order.quantity
+    return required
+
+
+def sync_required(orders: Iterable[ProductionOrder]) -> None:
+    """Alinha a coluna `required` dos contadores com o BOM atual das ordens.
+
+    Cria as linhas que faltam (com o impresso atual) e zera o requerido de
+    componentes que saíram do BOM.
+    """
+    orders = list(orders)
+    if not orders:
+        return
+    order_ids = [o.id for o in orders]
+    desired = _required_from_bom(orders)
+    with transaction.atomic():
+        existing = {
+            (row.order_id, row.component_id): row
+            for row in OrderComponentProgress.objects.filter(order_id__in=order_ids)
+        }
+        changed = []
+        for key, row in existing.items():
+            required = desired.get(key, 0)
+            if row.required != required:
+                row.required = required
+                changed.append(row)
+        missing = [key for key in desired if key not in existing]
+        printed = _printed_from_logs(order_ids) if missing else {}
+        OrderComponentProgress.objects.bulk_update(changed, ["required"])
+        OrderComponentProgress.objects.bulk_create(
+            [
+                OrderComponentProgress(
+                    order_id=order_id,
+                    component_id=component_id,
+                    required=desired[(order_id, component_id)],
+                    printed=printed.get((order_id, component_id), 0),
+                )
+                for order_id, component_id in missing
+            ]
+        )
+
+
+def record_print(order_id: int, component_id: int, quantity: int) -> None:
+    """Soma `quantity` ao contador com expressão F (atômico no banco)."""
+    updated = OrderComponentProgress.objects.filter(
+        order_id=order_id, component_id=component_id
+    ).update(printed=F("printed") + quantity)
+    if not updated:
+        recompute_printed(order_id, component_id)
+
+
+def recompute_printed(order_id: int, component_id: int, create: bool = True) -> None:
+    """Recalcula o contador de um par a partir dos logs (edição/exclusão de registros)."""
+    printed = (
+        ProductionLog.objects.filter(order_id=order_id, component_id=component_id)
+        .aggregate(total=Sum("quantity"))["total"]
+        or 0
+    )
+    updated = OrderComponentProgress.objects.filter(
+        order_id=order_id, component_id=component_id
+    ).update(printed=printed)
+    if not updated and create:
+        order = ProductionOrder.objects.get(pk=order_id)
+        required = _required_from_bom([order]).get((order_id, component_id), 0)
+        OrderComponentProgress.objects.get_or_create(
+            order_id=order_id,
+            component_id=component_id,
+            defaults={"required": required, "printed": printed},
+        )
+
+
+def rebuild_counters(fix: bool = True) -> List[Tuple[int, int, Tuple[int, int], Tuple[int, int]]]:
+    """Compara os contadores com BOM/logs e, se `fix`, corrige as divergências.
+
+    Retorna a lista de divergências como
+    (ordem, componente, (requerido, impresso) gravados, (requerido, impresso) corretos).
+    """
+    orders = list(ProductionOrder.objects.only("id", "product_id", "quantity"))
+    required = _required_from_bom(orders)
+    printed = _printed_from_logs()
+    existing = {
+        (row.order_id, row.component_id): row
+        for row in OrderComponentProgress.objects.all()
+    }
+    drift = []
+    to_update = []
+    to_create = []
+    for key in set(required) | set(printed) | set(existing):
+        expected = (required.get(key, 0), printed.get(key, 0))
+        row = existing.get(key)
+        stored = (row.required, row.printed) if row is not None else None
+        if stored == expected:
+            continue
+        drift.append((key[0], key[1], stored, expected))
+        if row is None:
+            to_create.append(
+                OrderComponentProgress(
+                    order_id=key[0], component_id=key[1], required=expected[0], printed=expected[1]
+                )
+            )
+        else:
+            row.required, row.printed = expected
+            to_update.append(row)
+    if fix and drift:
+        with transaction.atomic():
+            OrderComponentProgress.objects.bulk_update(to_update, ["required", "printed"], batch_size=1000)
+            OrderComponentProgress.objects.bulk_create(to_create, batch_size=1000)
+    drift.sort()
+    return drift
@@ -0,0 +1,129 @@
+"""Totais do BOM materializados em `Product` (custo, minutos, pratos, materiais).
+
+Listagens e estimativas leem os campos `rollup_*` do produto em vez de
+percorrer o BOM a cada acesso. Os totais partem do BOM explodido
+(`core.bom.explode`), então submontagens entram com seus componentes; o
+próprio vetor explodido fica em `rollup_bom`. Os sinais de `BOMItem`,
+`SubAssemblyItem` e `Component` chamam `refresh_products` para os produtos
+afetados e seus ancestrais; `rebuild_rollups` confere (e corrige) todos de
+uma vez.
+"""
+from dataclasses import astuple, dataclass, field
+from decimal import Decimal
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import transaction
+
+from .bom import ancestors, explode
+from .models import BOMItem, Component, Product
+
+FIELDS = ["rollup_cost", "rollup_print_min", "rollup_materials", "rollup_plates", "rollup_bom"]
+
+
+@dataclass
+class ProductRollup:
+    cost: Decimal = Decimal("0.00")
+    print_min: int = 0
+    materials: str = ""
+    plates: List[List[int]] = field(default_factory=list)
+    bom: List[List[int]] = field(default_factory=list)
+
+    @classmethod
+    def of(cls, product: Product) -> "ProductRollup":
+        return cls(
+            Decimal(product.rollup_cost).quantize(Decimal("0.01")),
+            product.rollup_print_min,
+            product.rollup_materials,
+            [list(line) for line in product.rollup_plates],
+            [list(line) for line in product.rollup_bom],
+        )
+
+    def apply(self, product: Product) -> None:
+        product.rollup_cost = self.cost
+        product.rollup_print_min = self.print_min
+        product.rollup_materials = self.materials
+        product.rollup_plates = self.plates
+        product.rollup_bom = self.bom
+
+
+def compute_rollups(product_ids: Iterable[int]) -> Dict[int, ProductRollup]:
+    """Totais dos produtos informados a partir do BOM explodido.
+
+    Lê a árvore uma vez por nível e os componentes em uma só consulta.
+    """
+    vectors = explode(product_ids)
+    component_ids = {component_id for vector in vectors.values() for component_id, _ in vector}
+    comps = Component.objects.in_bulk(component_ids) if component_ids else {}
+    result = {}
+    for pid, vector in vectors.items():
+        rollup = ProductRollup()
+        materials = set()
+        for component_id, qty in vector:
+            comp = comps[component_id]
+            rollup.cost += comp.unit_cost * qty
+            rollup.print_min += comp.print_time_min * qty
+            rollup.plates.append([qty, comp.batch_size])
+            rollup.bom.append([component_id, qty])
+            if comp.material:
+                materials.add(comp.material)
+        rollup.cost = Decimal(rollup.cost).quantize(Decimal("0.01"))
+        rollup.materials = ", ".join(sorted(materials))
+        result[pid] = rollup
+    return result
+
+
+def refresh_products(products: Iterable) -> None:
+    """Recalcula e grava os totais de produtos (instâncias ou ids).
+
+    Instâncias passadas também são atualizadas em memória.
+    """
+    instances = {}
+    ids = set()
+    for p in products:
+        if isinstance(p, Product):
+            instances.setdefault(p.pk, []).append(p)
+            ids.add(p.pk)
+        else:
+            ids.add(p)
+    ids.discard(None)
+    if not ids:
+        return
+    rollups = compute_rollups(ids)
+    rows = []
+    for pid, rollup in rollups.items():
+        row = Product(pk=pid)
+        rollup.apply(row)
+        rows.append(row)
+        for instance in instances.get(pid, []):
+            rollup.apply(instance)
+    Product.objects.bulk_update(rows, FIELDS, batch_size=500)
+
+
+def products_using_component(component_id: int) -> List[int]:
+    """Produtos que usam o componente, inclusive via submontagens."""
+    direct = BOMItem.objects.filter(component_id=component_id).values_list("product_id", flat=True)
+    return sorted(ancestors(set(direct)))
+
+
+def rebuild_rollups(fix: bool = True) -> List[Tuple[int, tuple, tuple]]:
+    """Compara os totais gravados com o BOM e, se `fix`, corrige as divergências.
+
+    Retorna a lista de divergências como (produto, gravado, correto).
+    """
+    products = list(Product.objects.only("id", *FIELDS))
+    expected = compute_rollups(p.id for p in products)
+    drift = []
+    to_update = []
+    for product in products:
+        stored = ProductRollup.of(product)
+        correct = expected[product.id]
+        if stored == correct:
+            continue
+        drift.append((product.id, astuple(stored), astuple(correct)))
+        correct.apply(product)
+        to_update.append(product)
+    if fix and to_update:
+        with transaction.atomic():
+            Product.objects.bulk_update(to_update, FIELDS, batch_size=500)
+    drift.sort()
+    return drift
@@ -0,0 +1,83 @@
+"""Cache das respostas de /api/schedule/.
+
+Repetir a mesma simulação sem que nada tenha mudado devolve a resposta já
+calculada, sem expandir o BOM nem escalonar de novo. A chave é o hash dos
+parâmetros da requisição mais uma *geração*: um contador no cache do Django
+incrementado (via sinais) sempre que um modelo que entra no plano é gravado
+ou excluído — ordens, produtos, BOM, componentes, impressoras e calendários.
+Assim nenhuma entrada antiga precisa ser procurada para invalidar.
+
+Uma simulação (sem `persist`) não grava plano e vale enquanto a geração não
+mudar. A resposta de um plano confirmado só é reaproveitada enquanto ele
+continua sendo o corrente, na mesma versão; se outro plano foi confirmado
+depois ou o plano foi ajustado (impressão registrada, impressora desligada),
+recalcula.
+
+Usa o backend de cache padrão (`CACHES`). Com vários processos, configure um
+backend compartilhado para que a geração valha para todos.
+"""
+import hashlib
+import json
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Schedule
+
+GENERATION_KEY = "schedule:generation"
+KEY_PREFIX = "schedule:result:"
+# validade máxima de uma resposta (s): o plano é relativo ao instante do cálculo
+DEFAULT_TTL = 300
+
+
+def _ttl() -> int:
+    return getattr(settings, "SCHEDULE_CACHE_TTL", DEFAULT_TTL)
+
+
+def _start() -> int:
+    # sem contador (cache novo ou despejado): recomeça de um valor ainda não usado
+    cache.add(GENERATION_KEY, time.time_ns(), None)
+    return cache.get(GENERATION_KEY)
+
+
+def generation() -> int:
+    value = cache.get(GENERATION_KEY)
+    return value if value is not None else _start()
+
+
+def bump() -> None:
+    """Invalida todas as respostas guardadas."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        _start()
+
+
+def key_for(params: dict) -> str:
+    """Chave dos `params` na geração atual.
+
+    Calcule antes de escalonar e use a mesma chave para gravar: se algo mudar
+    no meio do cálculo, o resultado fica na geração antiga e nunca é servido.
+    """
+    raw = json.dumps([params, generation()], sort_keys=True, default=str, separators=(",", ":"))
+    return KEY_PREFIX + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def lookup(key: str) -> Optional[dict]:
+    """Resposta guardada em `key`, se o plano dela (quando gravado) ainda é o corrente."""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if entry["schedule"] is None:
+        return entry["response"]
+    latest = Schedule.objects.values_list("id", "version").first()
+    if latest is None or tuple(latest) != tuple(entry["schedule"]):
+        return None
+    return entry["response"]
+
+
+def store(key: str, response: dict, schedule_id: Optional[int], version: Optional[int]) -> None:
+    schedule = (schedule_id, version) if schedule_id is not None else None
+    cache.set(key, {"schedule": schedule, "response": response}, _ttl())
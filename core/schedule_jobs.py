@@ -0,0 +1,106 @@
+"""Escalonamentos em segundo plano (/api/schedule/jobs/).
+
+O solver é CPU pura e segura o GIL: uma otimização de muitas ordens na
+thread da requisição trava as demais requisições do mesmo worker. Aqui a
+requisição só carrega as entradas do banco e grava um `ScheduleJob`; o
+`solver.solve` roda num `ProcessPoolExecutor`, recebendo e devolvendo DTOs
+por pickle, e usa os outros núcleos. O resultado volta a este processo, onde
+uma thread grava a resposta no job e, com `persist`, o plano (como
+/api/schedule/), fora da requisição.
+
+Os processos de trabalho são criados na primeira submissão (`spawn` seguido
+de `django.setup()`) e não acessam o banco. `SCHEDULE_JOB_WORKERS` define
+quantos; 0 executa o solver na própria requisição (testes, desenvolvimento).
+Jobs que estavam na fila quando o servidor parou não são retomados e ficam
+"queued"; basta submeter de novo.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, Tuple
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import ScheduleJob
+from .solver import SolveRequest, SolveResult, solve
+
+# monta a resposta de /api/schedule/ (gravando o plano com `persist`) e devolve (resposta, id do Schedule ou None)
+Finish = Callable[[SolveResult], Tuple[dict, Optional[int]]]
+
+_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+# uma thread grava os resultados, na ordem em que terminam
+_finisher: Optional[ThreadPoolExecutor] = None
+
+
+def _workers() -> int:
+    value = getattr(settings, "SCHEDULE_JOB_WORKERS", None)
+    if value is None:
+        # deixa um núcleo para as requisições
+        return max(1, (os.cpu_count() or 2) - 1)
+    return value
+
+
+def _pools() -> Tuple[ProcessPoolExecutor, ThreadPoolExecutor]:
+    global _executor, _finisher
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+            _finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="schedule-jobs")
+        return _executor, _finisher
+
+
+def shutdown(wait: bool = True) -> None:
+    """Encerra os processos de trabalho (recriados na próxima submissão)."""
+    global _executor, _finisher
+    with _lock:
+        executor, finisher = _executor, _finisher
+        _executor = _finisher = None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+        finisher.shutdown(wait=wait)
+
+
+def submit(request: SolveRequest, finish: Finish, params: dict) -> ScheduleJob:
+    job = ScheduleJob.objects.create(params=params)
+    if not _workers():
+        _complete(job, lambda: finish(solve(request)))
+        return job
+    executor, finisher = _pools()
+    try:
+        future = executor.submit(solve, request)
+    except BrokenProcessPool:
+        # um processo de trabalho morreu (ex.: falta de memória): recria o pool
+        shutdown(wait=False)
+        executor, finisher = _pools()
+        future = executor.submit(solve, request)
+    future.add_done_callback(lambda f: finisher.submit(_finished, job.pk, f, finish))
+    return job
+
+
+def _finished(job_id: int, future: Future, finish: Finish) -> None:
+    # thread própria: conexão própria, fechada ao terminar
+    try:
+        _complete(ScheduleJob.objects.get(pk=job_id), lambda: finish(future.result()))
+    finally:
+        connection.close()
+
+
+def _complete(job: ScheduleJob, run: Callable[[], Tuple[dict, Optional[int]]]) -> None:
+    try:
+        job.result, job.schedule_id = run()
+        job.status = "done"
+    except Exception as exc:
+        job.status = "failed"
+        job.error = f"{type(exc).__name__}: {exc}"
+    job.finished_at = timezone.now()
+    job.save()
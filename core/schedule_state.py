@@ -0,0 +1,460 @@
+"""Plano de impressão corrente, atualizado de forma incremental.
+
+O último plano confirmado em /api/schedule/ (`persist: true`) é gravado em
+`Schedule` / `ScheduledAssignment` e mantido também em memória; simulações
+não passam por aqui. Só os `SCHEDULE_HISTORY` planos mais recentes ficam no
+banco. Quando uma impressora muda
+de estado ou uma impressão é registrada, o plano é ajustado localmente e só
+as filas das impressoras afetadas são regravadas, sem refazer o
+escalonamento inteiro.
+"""
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Set
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import events
+from .availability import Calendar, load_calendar
+from .changeover import SetupMatrix, load_setup_matrix
+from .models import Component, Schedule, ScheduledAssignment, WorkOrder
+from .scheduling import (
+    AssignmentDTO,
+    PrinterDTO,
+    PrinterPool,
+    TaskDTO,
+    WorkOrderPlanDTO,
+    as_runs,
+    intern_tags,
+    load_printers_active,
+    place_runs,
+    summarize_workorders,
+)
+
+
+# planos gravados mantidos no banco (o corrente e os anteriores)
+DEFAULT_HISTORY = 3
+
+
+class ScheduleState:
+    def __init__(
+        self,
+        printers: List[PrinterDTO],
+        assignments: List[AssignmentDTO],
+        unassigned: List[TaskDTO],
+        plan_start: datetime,
+        workorders: Sequence[WorkOrder] = (),
+        mode: str = "single",
+        calendar: Optional[Calendar] = None,
+        setups: Optional[SetupMatrix] = None,
+    ):
+        self.active: Dict[int, PrinterDTO] = {p.id: p for p in printers}
+        self.names: Dict[int, str] = {p.id: p.name for p in printers}
+        self.queues: Dict[int, List[AssignmentDTO]] = {p.id: [] for p in printers}
+        for a in sorted(assignments, key=lambda a: a.start):
+            self.queues.setdefault(a.printer_id, []).append(a)
+        self.unassigned: List[TaskDTO] = list(unassigned)
+        self.plan_start = plan_start
+        self.workorders = list(workorders)
+        self.mode = mode
+        # bloqueios/turnos respeitados também nos ajustes incrementais
+        self.calendar = calendar
+        self.setups = setups
+        self.version = 1
+        self.schedule_id: Optional[int] = None
+        # impressoras cujas filas mudaram desde a última gravação
+        self.dirty: Set[int] = set()
+
+    # ---- leitura ----
+    @property
+    def assignments(self) -> List[AssignmentDTO]:
+        result = [a for queue in self.queues.values() for a in queue]
+        result.sort(key=lambda a: (a.start, a.printer_id))
+        return result
+
+    @property
+    def printer_times(self) -> Dict[int, float]:
+        return {pid: (queue[-1].end if queue else 0.0) for pid, queue in self.queues.items()}
+
+    @property
+    def makespan(self) -> float:
+        return max(self.printer_times.values(), default=0.0)
+
+    def workorder_plans(self) -> List[WorkOrderPlanDTO]:
+        return summarize_workorders(self.workorders, self.assignments, self.unassigned, self.plan_start)
+
+    def elapsed_min(self, now: Optional[datetime] = None) -> float:
+        now = now or timezone.now()
+        return max(0.0, (now - self.plan_start).total_seconds() / 60.0)
+
+    # ---- atualizações incrementais ----
+    def _pool(self, elapsed: float) -> PrinterPool:
+        printers = list(self.active.values())
+        times = {
+            p.id: max(elapsed, self.queues[p.id][-1].end if self.queues.get(p.id) else 0.0)
+            for p in printers
+        }
+        materials = {}
+        for p in printers:
+            for a in reversed(self.queues.get(p.id, [])):
+                if a.task.material:
+                    materials[p.id] = a.task.material
+                    break
+        return PrinterPool(printers, times, self.calendar, self.setups, materials)
+
+    def _place(self, tasks: List[TaskDTO], elapsed: float) -> List[TaskDTO]:
+        """Encaixa `tasks` no fim das filas ativas (LPT); devolve as que não couberam."""
+        placed, leftover = place_runs(as_runs(tasks), self._pool(elapsed))
+        for a in placed:
+            self.queues[a.printer_id].append(a)
+            self.dirty.add(a.printer_id)
+        return leftover
+
+    def _compact(self, printer_id: int, elapsed: float) -> None:
+        """Refaz os horários dos pratos ainda não iniciados da impressora."""
+        printer = self.active.get(printer_id)
+        queue = self.queues[printer_id]
+        if printer is None:
+            return
+        self.dirty.add(printer_id)
+        t = elapsed
+        material = ""
+        kept: List[AssignmentDTO] = []
+        for a in queue:
+            if a.start < elapsed:
+                t = max(t, a.end)
+                material = a.task.material or material
+                kept.append(a)
+                continue
+            duration = a.task.time_min / printer.speed_factor
+            start = t
+            if self.setups is not None:
+                start += self.setups.minutes(printer_id, material, a.task.material)
+            if self.calendar is not None:
+                start = self.calendar.earliest_start(printer_id, start, duration)
+            if start is None:
+                self.unassigned.append(a.task)
+                continue
+            kept.append(AssignmentDTO(printer_id, a.task, start, start + duration))
+            t = start + duration
+            material = a.task.material or material
+        self.queues[printer_id] = kept
+
+    def deactivate_printer(self, printer_id: int, now: Optional[datetime] = None) -> int:
+        """Redistribui só os pratos pendentes da impressora desativada.
+
+        Um estado recarregado depois da gravação da impressora já não a tem
+        entre as ativas, mas a fila dela ainda precisa ser redistribuída.
+        """
+        if printer_id not in self.active and not self.queues.get(printer_id):
+            return 0
+        elapsed = self.elapsed_min(now)
+        self.active.pop(printer_id, None)
+        queue = self.queues.get(printer_id, [])
+        pending = [a.task for a in queue if a.start >= elapsed]
+        self.queues[printer_id] = [a for a in queue if a.start < elapsed]
+        self.dirty.add(printer_id)
+        self.unassigned.extend(self._place(pending, elapsed))
+        self.version += 1
+        return len(pending)
+
+    def activate_printer(self, printer: PrinterDTO, now: Optional[datetime] = None) -> int:
+        """Inclui a impressora e tenta encaixar os pratos sem impressora compatível.
+
+        Também vale para uma impressora que já está entre as ativas (estado
+        recarregado do banco depois de ela ser ligada): os pratos esperando
+        ainda não foram encaixados.
+        """
+        if printer.id in self.active and not self.unassigned:
+            return 0
+        elapsed = self.elapsed_min(now)
+        self.active[printer.id] = printer
+        self.names[printer.id] = printer.name
+        self.queues.setdefault(printer.id, [])
+        waiting = self.unassigned
+        self.unassigned = self._place(waiting, elapsed)
+        self.version += 1
+        return len(waiting) - len(self.unassigned)
+
+    def consume(self, component_id: int, quantity: int, now: Optional[datetime] = None) -> int:
+        """Desconta peças já impressas dos pratos pendentes do componente.
+
+        O registro de impressão é de uma `ProductionOrder`, sem ligação com as
+        ordens de trabalho do plano: as peças valem para o componente, seja
+        qual for a ordem de trabalho. Os pratos do fim do plano são retirados
+        primeiro, depois os sem impressora; um prato parcialmente coberto só
+        tem a quantidade reduzida. Apenas as filas afetadas são
+        recompactadas. Retorna quantos pratos saíram do plano.
+        """
+        elapsed = self.elapsed_min(now)
+        remaining = quantity
+        removed = 0
+        touched = set()
+        # posições nas filas; as remoções só são aplicadas no fim
+        pending = [
+            (a.start, pid, pos)
+            for pid, queue in self.queues.items()
+            for pos, a in enumerate(queue)
+            if a.task.component_id == component_id and a.start >= elapsed
+        ]
+        pending.sort(reverse=True)
+        for _, pid, pos in pending:
+            if remaining <= 0:
+                break
+            queue = self.queues[pid]
+            a = queue[pos]
+            if a.task.quantity <= remaining:
+                remaining -= a.task.quantity
+                queue[pos] = None
+                removed += 1
+                touched.add(pid)
+            else:
+                queue[pos] = replace(a, task=replace(a.task, quantity=a.task.quantity - remaining))
+                remaining = 0
+                self.dirty.add(pid)
+        for pid in touched:
+            self.queues[pid] = [a for a in self.queues[pid] if a is not None]
+        if remaining > 0:
+            waiting = []
+            for task in self.unassigned:
+                if remaining <= 0 or task.component_id != component_id:
+                    waiting.append(task)
+                elif task.quantity <= remaining:
+                    remaining -= task.quantity
+                    removed += 1
+                else:
+                    waiting.append(replace(task, quantity=task.quantity - remaining))
+                    remaining = 0
+            self.unassigned = waiting
+        for pid in touched:
+            self._compact(pid, elapsed)
+        if remaining != quantity:
+            self.version += 1
+        return removed
+
+
+def _rows(schedule: Schedule, state: ScheduleState, printer_ids) -> List[ScheduledAssignment]:
+    rows = []
+    for pid in printer_ids:
+        for a in state.queues.get(pid, []):
+            rows.append(
+                ScheduledAssignment(
+                    schedule=schedule,
+                    printer_id=pid,
+                    printer_name=state.names.get(pid, ""),
+                    component_id=a.task.component_id,
+                    component_name=a.task.component_name,
+                    workorder_id=a.task.workorder_id,
+                    merged_workorder_ids=list(a.task.merged_workorder_ids),
+                    quantity=a.task.quantity,
+                    time_min=a.task.time_min,
+                    start_min=a.start,
+                    end_min=a.end,
+                    starts_at=state.plan_start + timedelta(minutes=a.start),
+                    ends_at=state.plan_start + timedelta(minutes=a.end),
+                )
+            )
+    return rows
+
+
+def _unassigned_rows(state: ScheduleState) -> List[dict]:
+    return [
+        {
+            "component_id": t.component_id,
+            "workorder_id": t.workorder_id,
+            "merged_workorder_ids": list(t.merged_workorder_ids),
+            "quantity": t.quantity,
+            "time_min": t.time_min,
+        }
+        for t in state.unassigned
+    ]
+
+
+def _publish(state: ScheduleState) -> None:
+    # aviso de nova versão: as telas abertas recarregam o plano corrente
+    data = {
+        "schedule_id": state.schedule_id,
+        "version": state.version,
+        "mode": state.mode,
+        "makespan_min": state.makespan,
+        "unassigned_count": len(state.unassigned),
+    }
+    events.publish_on_commit("schedule", lambda: data)
+
+
+def _prune() -> None:
+    keep = max(1, getattr(settings, "SCHEDULE_HISTORY", DEFAULT_HISTORY))
+    old = list(Schedule.objects.values_list("id", flat=True)[keep:])
+    if old:
+        Schedule.objects.filter(pk__in=old).delete()
+
+
+def save(state: ScheduleState, input_hash: str = "") -> Schedule:
+    """Grava o plano completo em uma transação, com `bulk_create`, e descarta os antigos."""
+    with transaction.atomic():
+        schedule = Schedule.objects.create(
+            mode=state.mode,
+            plan_start=state.plan_start,
+            makespan_min=state.makespan,
+            unassigned_count=len(state.unassigned),
+            unassigned=_unassigned_rows(state),
+            version=state.version,
+            input_hash=input_hash,
+        )
+        schedule.workorders.set(state.workorders)
+        ScheduledAssignment.objects.bulk_create(_rows(schedule, state, state.queues), batch_size=500)
+        _prune()
+        state.schedule_id = schedule.id
+        _publish(state)
+    state.dirty.clear()
+    return schedule
+
+
+def save_changes(state: ScheduleState) -> bool:
+    """Regrava só as filas alteradas. Retorna False se o plano não existe mais."""
+    with transaction.atomic():
+        updated = Schedule.objects.filter(pk=state.schedule_id).update(
+            makespan_min=state.makespan,
+            unassigned_count=len(state.unassigned),
+            unassigned=_unassigned_rows(state),
+            version=state.version,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            return False
+        schedule = Schedule(pk=state.schedule_id)
+        ScheduledAssignment.objects.filter(schedule=schedule, printer_id__in=state.dirty).delete()
+        ScheduledAssignment.objects.bulk_create(_rows(schedule, state, state.dirty), batch_size=500)
+        _publish(state)
+    state.dirty.clear()
+    return True
+
+
+def load(schedule: Schedule) -> ScheduleState:
+    """Reconstrói o estado a partir do plano gravado, inclusive os pratos sem impressora.
+
+    Pratos de componentes excluídos saem do plano; os ainda não iniciados de
+    uma impressora excluída voltam a esperar impressora.
+    """
+    rows = [r for r in schedule.assignments.select_related("component") if r.component_id is not None]
+    waiting = schedule.unassigned or []
+    components = {r.component_id: r.component for r in rows}
+    missing = {u["component_id"] for u in waiting} - components.keys()
+    components.update(Component.objects.in_bulk(missing))
+    # pratos iguais voltam a compartilhar a mesma tarefa, como na expansão
+    tasks: Dict[tuple, TaskDTO] = {}
+
+    def task(component_id, workorder_id, merged_workorder_ids, quantity, time_min) -> TaskDTO:
+        key = (component_id, workorder_id, tuple(merged_workorder_ids), quantity, time_min)
+        found = tasks.get(key)
+        if found is None:
+            component = components[component_id]
+            found = tasks[key] = TaskDTO(
+                component_id=component_id,
+                component_name=component.name,
+                quantity=quantity,
+                time_min=time_min,
+                tags_required=intern_tags(component.tags_required),
+                workorder_id=workorder_id,
+                merged_workorder_ids=key[2],
+                material=component.material,
+                size=component.size,
+            )
+        return found
+
+    elapsed = max(0.0, (timezone.now() - schedule.plan_start).total_seconds() / 60.0)
+    assignments = []
+    # componente excluído depois do cálculo: o prato sai do plano
+    unassigned = [task(**u) for u in waiting if u["component_id"] in components]
+    for r in rows:
+        t = task(r.component_id, r.workorder_id, r.merged_workorder_ids, r.quantity, r.time_min)
+        if r.printer_id is not None:
+            assignments.append(AssignmentDTO(r.printer_id, t, r.start_min, r.end_min))
+        elif r.start_min >= elapsed:
+            unassigned.append(t)
+    state = ScheduleState(
+        load_printers_active(),
+        assignments,
+        unassigned,
+        schedule.plan_start,
+        list(schedule.workorders.all()),
+        mode=schedule.mode,
+        calendar=load_calendar(schedule.plan_start),
+        setups=load_setup_matrix(),
+    )
+    state.names.update({r.printer_id: r.printer_name for r in rows if r.printer_id is not None})
+    state.version = schedule.version
+    state.schedule_id = schedule.id
+    return state
+
+
+_lock = threading.Lock()
+_current: Optional[ScheduleState] = None
+
+
+def publish(state: Optional[ScheduleState]) -> None:
+    global _current
+    with _lock:
+        _current = state
+
+
+def _fresh() -> Optional[ScheduleState]:
+    """Estado do plano mais recente; recarrega se outro processo o alterou."""
+    global _current
+    latest = Schedule.objects.values_list("id", "version").first()
+    if latest is None:
+        _current = None
+    elif _current is None or (_current.schedule_id, _current.version) != latest:
+        _current = load(Schedule.objects.get(pk=latest[0]))
+    return _current
+
+
+def current() -> Optional[ScheduleState]:
+    with _lock:
+        return _fresh()
+
+
+def clear() -> None:
+    publish(None)
+
+
+def reload_current() -> None:
+    """Força todos os processos a recarregar o plano corrente do banco.
+
+    Usado quando uma impressora ou componente do plano é excluído: as linhas
+    gravadas perdem a referência (SET_NULL) e o estado em memória não vale mais.
+    """
+    global _current
+    with _lock:
+        latest = Schedule.objects.values_list("id", flat=True).first()
+        if latest is not None:
+            Schedule.objects.filter(pk=latest).update(version=F("version") + 1, updated_at=timezone.now())
+        _current = None
+
+
+def printer_toggled(printer: PrinterDTO, is_active: bool) -> None:
+    with _lock:
+        state = _fresh()
+        if state is None:
+            return
+        if is_active:
+            state.activate_printer(printer)
+        else:
+            state.deactivate_printer(printer.id)
+        if state.dirty:
+            save_changes(state)
+
+
+def print_logged(component_id: int, quantity: int) -> None:
+    """Desconta do plano corrente peças registradas (ver `ScheduleState.consume`)."""
+    with _lock:
+        state = _fresh()
+        if state is None:
+            return
+        state.consume(component_id, quantity)
+        if state.dirty:
+            save_changes(state)
@@ -1,7 +1,18 @@
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Set, Tuple, Dict
+from functools import lru_cache
+from datetime import date, datetime, time, timedelta
+from typing import FrozenSet, Iterable, List, Optional, Set, Tuple, Dict
+import hashlib
+import heapq
+import json
 import math
-from .models import Printer, WorkOrder, minutes_to_hhmm
+import threading
+from django.utils import timezone
+from .availability import Calendar
+from .changeover import SetupMatrix
+from .bom import BOMLine, bom_lines, products_of
+from .models import Printer, WorkOrder
 
 
 # ======== DTOs ========
@@ -11,15 +22,42 @@ class PrinterDTO:
     name: str
     speed_factor: float
     tags: Set[str]
+    # (x, y, z) em mm; None ou eixo None = sem limite
+    volume: Optional[Tuple[Optional[int], Optional[int], Optional[int]]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskDTO:
+    """Um prato. Pratos idênticos de uma mesma expansão compartilham a instância."""
+
     component_id: int
     component_name: str
     quantity: int
     time_min: int
     tags_required: Set[str]
+    workorder_id: Optional[int] = None
+    # outras ordens que compartilham este prato (consolidação)
+    merged_workorder_ids: Tuple[int, ...] = ()
+    material: str = ""
+    # caixa envolvente (x, y, z) em mm; None = cabe em qualquer impressora
+    size: Optional[Tuple[int, int, int]] = None
+
+    @property
+    def workorder_ids(self) -> Tuple[int, ...]:
+        if self.workorder_id is None:
+            return self.merged_workorder_ids
+        return (self.workorder_id,) + self.merged_workorder_ids
+
+
+@dataclass(slots=True)
+class PlateRun:
+    """`count` pratos idênticos, todos representados pela mesma `task`."""
+
+    task: TaskDTO
+    count: int = 1
+
+    def tasks(self) -> List[TaskDTO]:
+        return [self.task] * self.count
 
 
 @dataclass
@@ -30,6 +68,42 @@ class AssignmentDTO:
     end: float
 
 
+@dataclass
+class WorkOrderDTO:
+    """O que o sequenciamento usa de uma `WorkOrder` (sem o modelo, serializável)."""
+
+    id: int
+    priority: int
+    due_date: Optional[date]
+
+
+@dataclass
+class WorkOrderPlanDTO:
+    workorder_id: int
+    priority: int
+    due_date: Optional[date]
+    plates: int
+    completion: float
+    # minutos após o prazo (negativo = adiantada); None quando não há prazo
+    lateness: Optional[float]
+
+
+@dataclass
+class ConsolidationStats:
+    plates_before: int
+    plates_after: int
+    minutes_before: int
+    minutes_after: int
+
+    @property
+    def plates_saved(self) -> int:
+        return self.plates_before - self.plates_after
+
+    @property
+    def minutes_saved(self) -> int:
+        return self.minutes_before - self.minutes_after
+
+
 # ======== Helpers ========
 def parse_tags(value) -> Set[str]:
     if not value:
@@ -39,73 +113,684 @@ def parse_tags(value) -> Set[str]:
     return {t.strip() for t in str(value).split(',') if t.strip()}
 
 
+@lru_cache(maxsize=4096)
+def intern_tags(value: str) -> FrozenSet[str]:
+    """Tags de um componente como frozenset único por texto (compartilhado entre pratos)."""
+    return frozenset(parse_tags(value))
+
+
+def as_runs(tasks: Iterable[TaskDTO]) -> List[PlateRun]:
+    """Agrupa as repetições da mesma instância de tarefa, na ordem da primeira aparição."""
+    runs: Dict[int, PlateRun] = {}
+    for task in tasks:
+        run = runs.get(id(task))
+        if run is None:
+            runs[id(task)] = PlateRun(task)
+        else:
+            run.count += 1
+    return list(runs.values())
+
+
+def schedule_fingerprint(tasks: List[TaskDTO], printers: List[PrinterDTO], **params) -> str:
+    """Hash estável das entradas de um escalonamento (tarefas, impressoras e parâmetros)."""
+    payload = {
+        "tasks": [
+            [
+                t.component_id,
+                t.quantity,
+                t.time_min,
+                sorted(t.tags_required),
+                t.workorder_id,
+                list(t.merged_workorder_ids),
+                t.material,
+                t.size,
+            ]
+            for t in tasks
+        ],
+        "printers": [[p.id, p.speed_factor, sorted(p.tags), p.volume] for p in printers],
+        "params": params,
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def fits_volume(size, volume) -> bool:
+    """A peça cabe no volume, podendo girar no plano do prato (a altura não muda)."""
+    if size is None or volume is None:
+        return True
+    x, y, z = size
+    vx, vy, vz = (math.inf if v is None else v for v in volume)
+    if z > vz:
+        return False
+    return (x <= vx and y <= vy) or (y <= vx and x <= vy)
+
+
 def is_printer_compatible(printer: PrinterDTO, task: TaskDTO) -> bool:
-    return task.tags_required.issubset(printer.tags)
+    return task.tags_required.issubset(printer.tags) and fits_volume(task.size, printer.volume)
+
+
+def requirement_key(task: TaskDTO) -> tuple:
+    """O que decide a compatibilidade de uma tarefa: tags requeridas e dimensões."""
+    return frozenset(task.tags_required), task.size
+
+
+class CompatibilityMatrix:
+    """Impressoras (índices em `printers`) compatíveis com cada requisito.
+
+    Cada linha é calculada na primeira tarefa com aquele requisito (tags e
+    dimensões) e fica guardada; a matriz inteira é reaproveitada entre
+    escalonamentos com as mesmas impressoras (ver `compatibility_matrix`).
+    """
+
+    def __init__(self, printers: List[PrinterDTO]):
+        self.printers = list(printers)
+        self._rows: Dict[tuple, Tuple[int, ...]] = {}
+
+    def indexes(self, task: TaskDTO) -> Tuple[int, ...]:
+        key = requirement_key(task)
+        row = self._rows.get(key)
+        if row is None:
+            row = tuple(i for i, p in enumerate(self.printers) if is_printer_compatible(p, task))
+            self._rows[key] = row
+        return row
+
+
+# matrizes recentes por conjunto de impressoras (id, tags, volume)
+MATRIX_CACHE_SIZE = 8
+_matrices: "OrderedDict[tuple, CompatibilityMatrix]" = OrderedDict()
+_matrices_lock = threading.Lock()
+
+
+def compatibility_matrix(printers: List[PrinterDTO]) -> CompatibilityMatrix:
+    """Matriz de compatibilidade das impressoras, do cache quando elas não mudaram."""
+    key = tuple((p.id, frozenset(p.tags), p.volume) for p in printers)
+    with _matrices_lock:
+        matrix = _matrices.get(key)
+        if matrix is not None:
+            _matrices.move_to_end(key)
+            return matrix
+        matrix = CompatibilityMatrix(printers)
+        _matrices[key] = matrix
+        while len(_matrices) > MATRIX_CACHE_SIZE:
+            _matrices.popitem(last=False)
+    return matrix
+
+
+def _expand_bom_line_runs(comp, total_qty: int, workorder_id: Optional[int] = None) -> List[PlateRun]:
+    """Pratos de um componente: o primeiro (com o tempo base), os cheios e a sobra.
+
+    Os pratos do meio são idênticos e viram uma única corrida, de modo que
+    10.000 unidades custam no máximo três tarefas em memória.
+    """
+    batch = comp.batch_size if comp.batch_size > 0 else 1
+    plates = math.ceil(total_qty / batch)
+    if plates <= 0:
+        return []
+    tags = intern_tags(comp.tags_required)
+    size = comp.size
+
+    def plate(qty: int, duration: int) -> TaskDTO:
+        return TaskDTO(
+            component_id=comp.id,
+            component_name=comp.name,
+            quantity=qty,
+            time_min=duration,
+            tags_required=tags,
+            workorder_id=workorder_id,
+            material=comp.material,
+            size=size,
+        )
+
+    last_qty = total_qty - (plates - 1) * batch
+    if plates == 1:
+        return [PlateRun(plate(last_qty, comp.per_plate_time_min + comp.base_time_min))]
+    runs: List[PlateRun] = []
+    full = plates
+    if comp.base_time_min:
+        runs.append(PlateRun(plate(batch, comp.per_plate_time_min + comp.base_time_min)))
+        full -= 1
+    tail = None
+    if last_qty != batch:
+        tail = PlateRun(plate(last_qty, comp.per_plate_time_min))
+        full -= 1
+    if full > 0:
+        runs.append(PlateRun(plate(batch, comp.per_plate_time_min), full))
+    if tail is not None:
+        runs.append(tail)
+    return runs
+
+
+def _expand_bom_line(comp, total_qty: int, workorder_id: Optional[int] = None) -> List[TaskDTO]:
+    return [task for run in _expand_bom_line_runs(comp, total_qty, workorder_id) for task in run.tasks()]
 
 
 def expand_workorder_to_tasks(workorder: WorkOrder) -> List[TaskDTO]:
     tasks: List[TaskDTO] = []
-    for bom in workorder.product.bom_items.select_related('component'):
-        comp = bom.component
-        total_qty = bom.quantity * workorder.quantity
-        if comp.batch_size <= 0:
-            plates = total_qty
-            batch = 1
-        else:
-            plates = math.ceil(total_qty / comp.batch_size)
-            batch = comp.batch_size
-        remaining = total_qty
+    for bom in bom_lines([workorder.product])[workorder.product_id]:
+        tasks.extend(_expand_bom_line(bom.component, bom.quantity * workorder.quantity, workorder.id))
+    return tasks
+
+
+def load_open_workorders() -> List[WorkOrder]:
+    """Ordens de trabalho em aberto, já na ordem de prioridade/prazo."""
+    return list(WorkOrder.objects.select_related('product'))
+
+
+def _bom_by_product(workorders: List[WorkOrder]) -> Dict[int, List[BOMLine]]:
+    return bom_lines(products_of(workorders))
+
+
+def _demand_lines(workorders: List[WorkOrder], demand=None):
+    """(ordem, componente, quantidade) a imprimir de cada ordem.
+
+    Sem `demand`, usa a quantidade bruta do BOM explodido; com `demand`
+    ({ordem: [(componente, qtd)]}, ex.: necessidades líquidas do MRP), usa
+    as linhas informadas.
+    """
+    if demand is None:
+        bom_by_product = _bom_by_product(workorders)
+        for wo in workorders:
+            for bom in bom_by_product.get(wo.product_id, []):
+                yield wo, bom.component, bom.quantity * wo.quantity
+    else:
+        for wo in workorders:
+            for comp, qty in demand.get(wo.id, []):
+                yield wo, comp, qty
+
+
+def expand_workorders_to_tasks(
+    workorders: Iterable[WorkOrder], demand=None
+) -> Dict[int, List[TaskDTO]]:
+    """Expande várias ordens de uma vez, carregando o BOM explodido de todos os produtos junto."""
+    workorders = list(workorders)
+    result: Dict[int, List[TaskDTO]] = {wo.id: [] for wo in workorders}
+    for wo, comp, qty in _demand_lines(workorders, demand):
+        result[wo.id].extend(_expand_bom_line(comp, qty, wo.id))
+    return result
+
+
+def consolidate_workorders_to_tasks(
+    workorders: Iterable[WorkOrder], demand=None
+) -> Tuple[Dict[int, List[TaskDTO]], ConsolidationStats]:
+    """Expande as ordens compartilhando pratos entre elas.
+
+    A demanda de cada componente é somada na sequência das ordens e os pratos
+    são preenchidos até `batch_size`, de modo que sobras de uma ordem completam
+    o prato da seguinte; o tempo base entra uma vez por componente. Cada prato
+    pertence à primeira ordem que o ocupa e lista as demais em
+    `merged_workorder_ids`. Retorna também a economia em relação à expansão
+    ordem a ordem. `demand` tem o mesmo formato de `expand_workorders_to_tasks`.
+    """
+    workorders = list(workorders)
+    components = {}
+    by_component: Dict[int, List[Tuple[int, int]]] = {}
+    plates_before = minutes_before = 0
+    for wo, comp, qty in _demand_lines(workorders, demand):
+        if qty <= 0:
+            continue
+        batch = comp.batch_size if comp.batch_size > 0 else 1
+        plates = math.ceil(qty / batch)
+        plates_before += plates
+        minutes_before += plates * comp.per_plate_time_min + comp.base_time_min
+        components[comp.id] = comp
+        by_component.setdefault(comp.id, []).append((wo.id, qty))
+
+    result: Dict[int, List[TaskDTO]] = {wo.id: [] for wo in workorders}
+    plates_after = minutes_after = 0
+    for comp_id, lines in by_component.items():
+        comp = components[comp_id]
+        batch = comp.batch_size if comp.batch_size > 0 else 1
+        tags = intern_tags(comp.tags_required)
+        size = comp.size
+        plate_owners: List[int] = []
+        plate_qty = 0
         first = True
-        for _ in range(plates):
-            qty = min(batch, remaining)
+        previous: Optional[TaskDTO] = None
+
+        def close_plate():
+            nonlocal first, plates_after, minutes_after, previous
             duration = comp.per_plate_time_min
             if first:
                 duration += comp.base_time_min
                 first = False
-            task = TaskDTO(
-                component_id=comp.id,
-                component_name=comp.name,
-                quantity=qty,
-                time_min=duration,
-                tags_required=parse_tags(comp.tags_required),
-            )
-            tasks.append(task)
-            remaining -= qty
-    return tasks
+            owners = tuple(plate_owners)
+            # pratos cheios seguidos da mesma ordem reaproveitam a tarefa anterior
+            if (
+                previous is None
+                or previous.quantity != plate_qty
+                or previous.time_min != duration
+                or previous.workorder_ids != owners
+            ):
+                previous = TaskDTO(
+                    component_id=comp.id,
+                    component_name=comp.name,
+                    quantity=plate_qty,
+                    time_min=duration,
+                    tags_required=tags,
+                    workorder_id=owners[0],
+                    merged_workorder_ids=owners[1:],
+                    material=comp.material,
+                    size=size,
+                )
+            result[owners[0]].append(previous)
+            plates_after += 1
+            minutes_after += duration
+
+        for wo_id, qty in lines:
+            while qty > 0:
+                if plate_qty == 0 and not first and qty >= batch:
+                    # pratos cheios só desta ordem: um de cada vez é idêntico ao anterior
+                    repeat = qty // batch - 1
+                    plate_owners, plate_qty = [wo_id], batch
+                    close_plate()
+                    result[wo_id].extend([previous] * repeat)
+                    plates_after += repeat
+                    minutes_after += repeat * comp.per_plate_time_min
+                    qty -= (repeat + 1) * batch
+                    plate_owners, plate_qty = [], 0
+                    continue
+                take = min(qty, batch - plate_qty)
+                if wo_id not in plate_owners:
+                    plate_owners.append(wo_id)
+                plate_qty += take
+                qty -= take
+                if plate_qty == batch:
+                    close_plate()
+                    plate_owners, plate_qty = [], 0
+        if plate_qty:
+            close_plate()
+
+    stats = ConsolidationStats(
+        plates_before=plates_before,
+        plates_after=plates_after,
+        minutes_before=minutes_before,
+        minutes_after=minutes_after,
+    )
+    return result, stats
+
+
+def printer_to_dto(p: Printer) -> PrinterDTO:
+    return PrinterDTO(
+        id=p.id,
+        name=p.name,
+        speed_factor=p.speed_factor or 1.0,
+        tags=parse_tags(p.tags),
+        volume=p.volume,
+    )
+
+
+def workorder_to_dto(wo: WorkOrder) -> WorkOrderDTO:
+    return WorkOrderDTO(id=wo.id, priority=wo.priority, due_date=wo.due_date)
 
 
 def load_printers_active() -> List[PrinterDTO]:
-    printers = []
-    for p in Printer.objects.filter(is_active=True):
-        printers.append(
-            PrinterDTO(
-                id=p.id,
-                name=p.name,
-                speed_factor=p.speed_factor or 1.0,
-                tags=parse_tags(p.tags),
-            )
-        )
-    return printers
+    return [printer_to_dto(p) for p in Printer.objects.filter(is_active=True)]
+
+
+class PrinterPool:
+    """Impressoras agrupadas em classes por tags e volume de impressão.
+
+    Cada classe mantém um min-heap de (instante livre, índice da impressora);
+    as classes compatíveis com cada requisito (tags e dimensões da peça) são
+    resolvidas uma única vez a partir da `CompatibilityMatrix`. Assim cada
+    atribuição custa O(k log p), com k classes compatíveis, em vez de varrer
+    todas as impressoras.
 
+    Com `calendar` (bloqueios/turnos) ou `setups` (trocas de material), o
+    início real depende da impressora e do prato, então `place` avalia as
+    impressoras compatíveis e descarta as que já ficam livres depois do
+    melhor término encontrado. `printer_materials` é o último material de
+    cada impressora no início do plano.
+    """
 
-def schedule_tasks(tasks: List[TaskDTO], printers: List[PrinterDTO]) -> Tuple[List[AssignmentDTO], List[TaskDTO], float, Dict[int, float]]:
+    def __init__(
+        self,
+        printers: List[PrinterDTO],
+        printer_times: Optional[Dict[int, float]] = None,
+        calendar: Optional[Calendar] = None,
+        setups: Optional[SetupMatrix] = None,
+        printer_materials: Optional[Dict[int, str]] = None,
+    ):
+        base_times = printer_times or {}
+        self.printers = printers
+        self.calendar = calendar
+        self.setups = setups
+        base_materials = printer_materials or {}
+        self._materials: List[str] = [base_materials.get(p.id, "") for p in printers]
+        self.matrix = compatibility_matrix(printers)
+        heaps: Dict[tuple, List[Tuple[float, int]]] = {}
+        for idx, p in enumerate(printers):
+            heaps.setdefault((frozenset(p.tags), p.volume), []).append((base_times.get(p.id, 0.0), idx))
+        for heap in heaps.values():
+            heapq.heapify(heap)
+        self._heaps: List[List[Tuple[float, int]]] = list(heaps.values())
+        # uma impressora de cada classe: todas têm a mesma compatibilidade
+        self._class_rep: List[int] = [heap[0][1] for heap in self._heaps]
+        self._resolved: Dict[tuple, List[int]] = {}
+
+    def classes_for(self, task: TaskDTO) -> List[int]:
+        key = requirement_key(task)
+        classes = self._resolved.get(key)
+        if classes is None:
+            compatible = set(self.matrix.indexes(task))
+            classes = [c for c, rep in enumerate(self._class_rep) if rep in compatible]
+            self._resolved[key] = classes
+        return classes
+
+    def earliest(self, task: TaskDTO) -> Optional[Tuple[float, int, int]]:
+        """(instante livre, índice da impressora, classe) da primeira impressora compatível livre."""
+        best = None
+        for c in self.classes_for(task):
+            top = self._heaps[c][0]
+            if best is None or top < best[:2]:
+                best = (top[0], top[1], c)
+        return best
+
+    def occupy(self, cls: int, end: float) -> None:
+        """Atualiza o topo da classe `cls` (obtido via `earliest`) para terminar em `end`."""
+        heap = self._heaps[cls]
+        heapq.heapreplace(heap, (end, heap[0][1]))
+
+    def place(self, task: TaskDTO) -> Optional[Tuple[PrinterDTO, float, float]]:
+        """Reserva a impressora compatível que termina `task` mais cedo: (impressora, início, fim)."""
+        if self.calendar is None and self.setups is None:
+            slot = self.earliest(task)
+            if slot is None:
+                return None
+            start, idx, cls = slot
+            printer = self.printers[idx]
+            end = start + task.time_min / printer.speed_factor
+            self.occupy(cls, end)
+            return printer, start, end
+        best = None
+        for c in self.classes_for(task):
+            for pos, (free, idx) in enumerate(self._heaps[c]):
+                if best is not None and free >= best[0]:
+                    continue
+                printer = self.printers[idx]
+                duration = task.time_min / printer.speed_factor
+                start = free
+                if self.setups is not None:
+                    start += self.setups.minutes(printer.id, self._materials[idx], task.material)
+                if self.calendar is not None:
+                    start = self.calendar.earliest_start(printer.id, start, duration)
+                    if start is None:
+                        continue
+                candidate = (start + duration, start, idx, c, pos)
+                if best is None or candidate < best:
+                    best = candidate
+        if best is None:
+            return None
+        end, start, idx, c, pos = best
+        heap = self._heaps[c]
+        heap[pos] = (end, idx)
+        heapq.heapify(heap)
+        if task.material:
+            self._materials[idx] = task.material
+        return self.printers[idx], start, end
+
+    def place_run(self, task: TaskDTO, count: int) -> List[Tuple[PrinterDTO, float, float]]:
+        """`place` para `count` pratos iguais; para no primeiro que não cabe.
+
+        Sem calendário nem trocas, as classes compatíveis são resolvidas uma
+        vez e cada prato custa só a comparação dos topos e um `heapreplace`.
+        """
+        if self.calendar is not None or self.setups is not None:
+            slots = []
+            for _ in range(count):
+                slot = self.place(task)
+                if slot is None:
+                    break
+                slots.append(slot)
+            return slots
+        heaps = [self._heaps[c] for c in self.classes_for(task)]
+        if not heaps:
+            return []
+        slots = []
+        for _ in range(count):
+            heap = min(heaps, key=lambda h: h[0])
+            start, idx = heap[0]
+            printer = self.printers[idx]
+            end = start + task.time_min / printer.speed_factor
+            heapq.heapreplace(heap, (end, idx))
+            slots.append((printer, start, end))
+        return slots
+
+    def times(self) -> Dict[int, float]:
+        by_index: Dict[int, float] = {}
+        for heap in self._heaps:
+            for t, idx in heap:
+                by_index[idx] = t
+        return {p.id: by_index[idx] for idx, p in enumerate(self.printers)}
+
+
+def placement_order(runs: List[PlateRun], setups: Optional[SetupMatrix] = None) -> List[PlateRun]:
+    """LPT sobre as corridas; com tempos de troca, agrupadas por material.
+
+    Os grupos seguem o total de minutos (maior primeiro) e cada grupo é LPT,
+    de modo que pratos do mesmo material caem em sequência nas impressoras
+    que já estão com ele, em vez de alternar materiais a cada prato.
+    """
+    if setups is None:
+        return sorted(runs, key=lambda r: r.task.time_min, reverse=True)
+    load: Dict[str, int] = {}
+    for r in runs:
+        load[r.task.material] = load.get(r.task.material, 0) + r.task.time_min * r.count
+    return sorted(runs, key=lambda r: (-load[r.task.material], r.task.material, -r.task.time_min))
+
+
+def place_runs(
+    runs: List[PlateRun], pool: PrinterPool
+) -> Tuple[List[AssignmentDTO], List[TaskDTO]]:
+    """Encaixa as corridas no pool sem criar uma tarefa por prato.
+
+    Se um prato de uma corrida não cabe em nenhuma impressora, os seguintes
+    (idênticos e mais tarde) também não cabem e vão direto para a sobra.
+    """
     assignments: List[AssignmentDTO] = []
     unassigned: List[TaskDTO] = []
+    for run in placement_order(runs, pool.setups):
+        task = run.task
+        slots = pool.place_run(task, run.count)
+        assignments.extend(AssignmentDTO(printer.id, task, start, end) for printer, start, end in slots)
+        unassigned.extend([task] * (run.count - len(slots)))
+    return assignments, unassigned
+
+
+def _schedule_on_pool(tasks: List[TaskDTO], pool: PrinterPool) -> Tuple[List[AssignmentDTO], List[TaskDTO]]:
+    return place_runs(as_runs(tasks), pool)
+
+
+def schedule_tasks(
+    tasks: List[TaskDTO],
+    printers: List[PrinterDTO],
+    printer_times: Optional[Dict[int, float]] = None,
+    calendar: Optional[Calendar] = None,
+    setups: Optional[SetupMatrix] = None,
+) -> Tuple[List[AssignmentDTO], List[TaskDTO], float, Dict[int, float]]:
+    """LPT guloso. `printer_times` permite continuar a partir de um plano já ocupado.
+
+    Com `calendar`, os pratos respeitam bloqueios das impressoras e turnos de
+    operador; pratos sem janela dentro do horizonte ficam sem atribuição.
+    Com `setups`, os pratos são agrupados por material e o tempo de troca
+    entra antes do prato que muda o material da impressora.
+    """
     if not printers:
-        unassigned = list(tasks)
-        return assignments, unassigned, 0.0, {}
-    printer_times: Dict[int, float] = {p.id: 0.0 for p in printers}
-    # sort tasks by time descending
-    for task in sorted(tasks, key=lambda t: t.time_min, reverse=True):
-        compatible = [p for p in printers if is_printer_compatible(p, task)]
-        if not compatible:
-            unassigned.append(task)
-            continue
-        best = min(compatible, key=lambda p: printer_times[p.id])
-        start = printer_times[best.id]
-        duration = task.time_min / best.speed_factor
-        end = start + duration
-        printer_times[best.id] = end
-        assignments.append(AssignmentDTO(best.id, task, start, end))
+        return [], list(tasks), 0.0, {}
+    pool = PrinterPool(printers, printer_times, calendar, setups)
+    assignments, unassigned = _schedule_on_pool(tasks, pool)
+    printer_times = pool.times()
     makespan = max(printer_times.values()) if printer_times else 0.0
     return assignments, unassigned, makespan, printer_times
+
+
+def _deadline_offset_min(due: date, plan_start: datetime) -> float:
+    """Minutos entre o início do plano e o fim do dia do prazo."""
+    deadline = datetime.combine(due + timedelta(days=1), time.min)
+    if timezone.is_aware(plan_start):
+        deadline = timezone.make_aware(deadline, timezone.get_current_timezone())
+    return (deadline - plan_start).total_seconds() / 60.0
+
+
+def summarize_workorders(
+    workorders: List[WorkOrder],
+    assignments: List[AssignmentDTO],
+    unassigned: List[TaskDTO],
+    plan_start: datetime,
+) -> List[WorkOrderPlanDTO]:
+    """Conclusão e atraso de cada ordem a partir das atribuições do plano."""
+    completion: Dict[int, float] = {}
+    plates: Dict[int, int] = {}
+    for a in assignments:
+        for wo_id in a.task.workorder_ids:
+            completion[wo_id] = max(completion.get(wo_id, 0.0), a.end)
+            plates[wo_id] = plates.get(wo_id, 0) + 1
+    for t in unassigned:
+        for wo_id in t.workorder_ids:
+            plates[wo_id] = plates.get(wo_id, 0) + 1
+    plans: List[WorkOrderPlanDTO] = []
+    for wo in workorders:
+        done = completion.get(wo.id, 0.0)
+        lateness = None
+        if wo.due_date is not None:
+            lateness = done - _deadline_offset_min(wo.due_date, plan_start)
+        plans.append(
+            WorkOrderPlanDTO(
+                workorder_id=wo.id,
+                priority=wo.priority,
+                due_date=wo.due_date,
+                plates=plates.get(wo.id, 0),
+                completion=done,
+                lateness=lateness,
+            )
+        )
+    return plans
+
+
+# políticas de sequenciamento das ordens no modo em lote
+POLICY_MAKESPAN = "makespan"  # ordem recebida (prioridade/prazo), LPT dentro de cada ordem
+POLICY_EDD = "edd"  # prazo mais cedo primeiro
+POLICY_WSPT = "wspt"  # menor tempo de processamento ponderado pela prioridade
+POLICY_WT = "wt"  # heurística para atraso ponderado (ATC estático + trocas adjacentes)
+POLICIES = (POLICY_MAKESPAN, POLICY_EDD, POLICY_WSPT, POLICY_WT)
+# parâmetro de antecipação da regra ATC (valores usuais entre 1 e 3)
+ATC_K = 2.0
+
+
+def _order_weight(wo: WorkOrder) -> float:
+    return float(max(wo.priority, 1))
+
+
+def _order_minutes(
+    workorders: List[WorkOrder], tasks_by_order: Dict[int, List[TaskDTO]], printers: List[PrinterDTO]
+) -> Dict[int, float]:
+    """Duração de cada ordem vendo a fazenda como uma máquina de capacidade somada."""
+    capacity = sum(p.speed_factor for p in printers) or 1.0
+    return {
+        wo.id: sum(t.time_min for t in tasks_by_order.get(wo.id, [])) / capacity
+        for wo in workorders
+    }
+
+
+def sequence_workorders(
+    workorders: List[WorkOrder],
+    tasks_by_order: Dict[int, List[TaskDTO]],
+    printers: List[PrinterDTO],
+    policy: str = POLICY_MAKESPAN,
+    plan_start: Optional[datetime] = None,
+) -> List[WorkOrder]:
+    """Ordena as ordens de trabalho conforme a política; O(n log n).
+
+    As políticas por tempo usam a duração de cada ordem na fazenda vista como
+    uma única máquina (soma das velocidades). `POLICY_WT` ordena pelo índice
+    ATC estático (peso/duração, descontado pela folga até o prazo) e depois
+    faz uma passada de trocas entre vizinhos que reduzam o atraso ponderado.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Política desconhecida: {policy}")
+    if policy == POLICY_MAKESPAN or not workorders:
+        return list(workorders)
+    if policy == POLICY_EDD:
+        return sorted(
+            workorders,
+            key=lambda wo: (wo.due_date is None, wo.due_date or date.max, -wo.priority, wo.id),
+        )
+    minutes = _order_minutes(workorders, tasks_by_order, printers)
+    if policy == POLICY_WSPT:
+        return sorted(workorders, key=lambda wo: (minutes[wo.id] / _order_weight(wo), wo.id))
+
+    if plan_start is None:
+        plan_start = timezone.now()
+    deadlines = {
+        wo.id: _deadline_offset_min(wo.due_date, plan_start) if wo.due_date else math.inf
+        for wo in workorders
+    }
+    mean = (sum(minutes.values()) / len(minutes)) or 1.0
+
+    def atc(wo: WorkOrder) -> float:
+        p = minutes[wo.id] or 1e-9
+        slack = max(0.0, deadlines[wo.id] - p)
+        return (_order_weight(wo) / p) * math.exp(-slack / (ATC_K * mean))
+
+    def pair_cost(first: WorkOrder, second: WorkOrder, t: float) -> float:
+        c1 = t + minutes[first.id]
+        c2 = c1 + minutes[second.id]
+        return _order_weight(first) * max(0.0, c1 - deadlines[first.id]) + _order_weight(
+            second
+        ) * max(0.0, c2 - deadlines[second.id])
+
+    sequence = sorted(workorders, key=lambda wo: (-atc(wo), wo.id))
+    t = 0.0
+    for i in range(len(sequence) - 1):
+        a, b = sequence[i], sequence[i + 1]
+        if pair_cost(b, a, t) < pair_cost(a, b, t):
+            sequence[i], sequence[i + 1] = b, a
+        t += minutes[sequence[i].id]
+    return sequence
+
+
+def weighted_tardiness(workorders: List[WorkOrder], plans: List[WorkOrderPlanDTO]) -> float:
+    """Soma de prioridade x atraso (min) projetado das ordens com prazo."""
+    weights = {wo.id: _order_weight(wo) for wo in workorders}
+    return sum(
+        weights.get(wp.workorder_id, 1.0) * max(0.0, wp.lateness)
+        for wp in plans
+        if wp.lateness is not None
+    )
+
+
+def schedule_workorders(
+    workorders: List[WorkOrder],
+    printers: List[PrinterDTO],
+    plan_start: Optional[datetime] = None,
+    tasks_by_order: Optional[Dict[int, List[TaskDTO]]] = None,
+    policy: str = POLICY_MAKESPAN,
+    calendar: Optional[Calendar] = None,
+    setups: Optional[SetupMatrix] = None,
+) -> Tuple[List[AssignmentDTO], List[TaskDTO], float, Dict[int, float], List[WorkOrderPlanDTO]]:
+    """Empacota várias ordens nas mesmas impressoras.
+
+    As ordens são atendidas na sequência dada por `policy` (por padrão a
+    recebida, prioridade/prazo); cada uma usa LPT a partir da ocupação deixada
+    pelas anteriores, de modo que duas ordens nunca disputam a mesma
+    impressora no mesmo intervalo. `tasks_by_order` permite passar uma
+    expansão já feita (ex.: consolidada). Os planos por ordem voltam na
+    sequência usada. `calendar` e `setups` são repassados ao pool, como em
+    `schedule_tasks`; o agrupamento por material acontece dentro de cada ordem.
+    """
+    if plan_start is None:
+        plan_start = timezone.now()
+    if tasks_by_order is None:
+        tasks_by_order = expand_workorders_to_tasks(workorders)
+    workorders = sequence_workorders(workorders, tasks_by_order, printers, policy, plan_start)
+    assignments: List[AssignmentDTO] = []
+    unassigned: List[TaskDTO] = []
+    pool = PrinterPool(printers, calendar=calendar, setups=setups)
+    for wo in workorders:
+        wo_assignments, wo_unassigned = _schedule_on_pool(tasks_by_order.get(wo.id, []), pool)
+        assignments.extend(wo_assignments)
+        unassigned.extend(wo_unassigned)
+    printer_times = pool.times()
+    makespan = max(printer_times.values()) if printer_times else 0.0
+    plans = summarize_workorders(workorders, assignments, unassigned, plan_start)
+    return assignments, unassigned, makespan, printer_times, plans
@@ -0,0 +1,122 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import (
+    BOMItem,
+    Component,
+    MaterialChangeover,
+    OperatorShift,
+    Printer,
+    PrinterDowntime,
+    Product,
+    ProductionLog,
+    ProductionOrder,
+    SubAssemblyItem,
+    WorkOrder,
+)
+from . import bom, events, progress, rollups, schedule_cache, schedule_state
+from .scheduling import printer_to_dto
+
+
+@receiver(post_save, sender=ProductionLog)
+def production_log_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        progress.record_print(instance.order_id, instance.component_id, instance.quantity)
+    else:
+        progress.recompute_printed(instance.order_id, instance.component_id)
+    _publish_progress(instance)
+
+
+@receiver(post_delete, sender=ProductionLog)
+def production_log_deleted(sender, instance, **kwargs):
+    # não recria a linha: na exclusão em cascata da ordem ela também some
+    progress.recompute_printed(instance.order_id, instance.component_id, create=False)
+    _publish_progress(instance)
+
+
+def _publish_progress(log):
+    order_id, component_id = log.order_id, log.component_id
+    events.publish_on_commit("progress", lambda: progress.progress_delta(order_id, component_id))
+
+
+@receiver(post_save, sender=Printer)
+def printer_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        data = {"id": instance.id, "name": instance.name, "is_active": instance.is_active}
+        events.publish_on_commit("printer", lambda: data)
+
+
+@receiver(pre_delete, sender=Printer)
+def printer_deleting(sender, instance, **kwargs):
+    # pratos pendentes vão para as outras impressoras antes de a fila perder a referência
+    schedule_state.printer_toggled(printer_to_dto(instance), False)
+
+
+@receiver(post_delete, sender=Printer)
+@receiver(post_delete, sender=Component)
+def scheduled_reference_deleted(sender, instance, **kwargs):
+    schedule_state.reload_current()
+
+
+@receiver(post_save, sender=ProductionOrder)
+def production_order_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        progress.sync_required([instance])
+
+
+def _bom_changed(product):
+    """Atualiza totais e contadores do produto e de tudo que o usa como submontagem."""
+    product_id = product.pk if isinstance(product, Product) else product
+    affected = bom.ancestors([product_id])
+    # atualiza também o produto já carregado pelo chamador, se houver
+    rollups.refresh_products([product, *affected])
+    progress.sync_required(ProductionOrder.objects.filter(product_id__in=affected))
+
+
+@receiver(post_save, sender=BOMItem)
+@receiver(post_delete, sender=BOMItem)
+def bom_item_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _bom_changed(instance.product if BOMItem.product.is_cached(instance) else instance.product_id)
+
+
+@receiver(post_save, sender=SubAssemblyItem)
+@receiver(post_delete, sender=SubAssemblyItem)
+def subassembly_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _bom_changed(instance.parent if SubAssemblyItem.parent.is_cached(instance) else instance.parent_id)
+
+
+@receiver(post_save, sender=Component)
+def component_rollup(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # baixa de estoque e edições de nome/descrição não mudam os totais
+    if not raw and not created and instance.rollup_inputs_changed(update_fields):
+        rollups.refresh_products(rollups.products_using_component(instance.pk))
+
+
+# tudo que entra em /api/schedule/: qualquer gravação invalida os resultados em cache
+# (ordens de produção e registros entram pelo MRP dos planos com `net`)
+SCHEDULE_INPUTS = (
+    WorkOrder,
+    ProductionOrder,
+    ProductionLog,
+    Product,
+    BOMItem,
+    SubAssemblyItem,
+    Component,
+    Printer,
+    PrinterDowntime,
+    OperatorShift,
+    MaterialChangeover,
+)
+
+
+def schedule_inputs_changed(sender, **kwargs):
+    schedule_cache.bump()
+
+
+for _model in SCHEDULE_INPUTS:
+    post_save.connect(schedule_inputs_changed, sender=_model, dispatch_uid=f"schedule_cache_save_{_model.__name__}")
+    post_delete.connect(schedule_inputs_changed, sender=_model, dispatch_uid=f"schedule_cache_delete_{_model.__name__}")
@@ -0,0 +1,90 @@
+"""Parte puramente computacional de /api/schedule/.
+
+`solve` recebe só DTOs (`SolveRequest`) e não toca no banco, de modo que pode
+rodar tanto na própria requisição quanto em outro processo (`schedule_jobs`),
+para onde a entrada e o resultado vão por pickle.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .availability import Calendar
+from .changeover import ChangeoverStats, SetupMatrix, changeover_stats
+from .optimizer import OptimizationStats, optimize_schedule
+from .scheduling import (
+    POLICY_MAKESPAN,
+    AssignmentDTO,
+    PrinterDTO,
+    TaskDTO,
+    WorkOrderDTO,
+    WorkOrderPlanDTO,
+    schedule_tasks,
+    schedule_workorders,
+    summarize_workorders,
+)
+
+
+@dataclass
+class SolveRequest:
+    printers: List[PrinterDTO]
+    plan_start: datetime
+    workorders: List[WorkOrderDTO]
+    tasks_by_order: Dict[int, List[TaskDTO]]
+    # "single": uma ordem, LPT direto; "batch": ordens em sequência (`policy`)
+    mode: str = "single"
+    policy: str = POLICY_MAKESPAN
+    calendar: Optional[Calendar] = None
+    setups: Optional[SetupMatrix] = None
+    optimize_ms: float = 0.0
+    # reescalona ignorando materiais só para medir as trocas economizadas (dobra o custo)
+    changeover_baseline: bool = False
+
+
+@dataclass
+class SolveResult:
+    assignments: List[AssignmentDTO]
+    unassigned: List[TaskDTO]
+    makespan: float
+    printer_times: Dict[int, float]
+    # ids das ordens na sequência usada
+    workorder_ids: List[int] = field(default_factory=list)
+    plans: Optional[List[WorkOrderPlanDTO]] = None
+    optimization: Optional[OptimizationStats] = None
+    changeover: Optional[ChangeoverStats] = None
+
+
+def _schedule(req: SolveRequest, setups: Optional[SetupMatrix]):
+    if req.mode == "batch":
+        return schedule_workorders(
+            req.workorders, req.printers, req.plan_start, req.tasks_by_order, req.policy, req.calendar, setups
+        )
+    (wo,) = req.workorders
+    assignments, unassigned, makespan, printer_times = schedule_tasks(
+        req.tasks_by_order[wo.id], req.printers, calendar=req.calendar, setups=setups
+    )
+    return assignments, unassigned, makespan, printer_times, None
+
+
+def solve(req: SolveRequest) -> SolveResult:
+    """Escalona, mede as trocas de material e, com orçamento, otimiza."""
+    assignments, unassigned, makespan, printer_times, plans = _schedule(req, req.setups)
+    result = SolveResult(assignments, unassigned, makespan, printer_times, [wo.id for wo in req.workorders], plans)
+    if plans is not None:
+        result.workorder_ids = [wp.workorder_id for wp in plans]
+    if req.setups is not None:
+        baseline = None
+        if req.changeover_baseline:
+            # o mesmo plano ignorando materiais, só para medir o ganho do agrupamento
+            baseline, *_ = _schedule(req, None)
+        result.changeover = changeover_stats(baseline, assignments, req.setups)
+    if req.optimize_ms:
+        result.assignments, result.printer_times, result.optimization = optimize_schedule(
+            assignments, req.printers, req.optimize_ms
+        )
+        result.makespan = result.optimization.makespan_after
+        if plans is not None:
+            by_id = {wo.id: wo for wo in req.workorders}
+            result.plans = summarize_workorders(
+                [by_id[i] for i in result.workorder_ids], result.assignments, unassigned, req.plan_start
+            )
+    return result
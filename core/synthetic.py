@@ -0,0 +1,221 @@
+"""Geração de dados sintéticos de uma fazenda de impressão (benchmarks/carga)."""
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+import random
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    BOMItem,
+    Component,
+    OrderComponentProgress,
+    Printer,
+    Product,
+    ProductionLog,
+    ProductionOrder,
+    SubAssemblyItem,
+    WorkOrder,
+)
+from .rollups import refresh_products
+
+# distribuições aproximadas de uma fazenda típica
+MATERIALS = [("PLA", 0.6), ("PETG", 0.25), ("ABS", 0.15)]
+PLATFORMS = [("bambu", 0.5), ("klipper", 0.35), ("prusa", 0.15)]
+# tags exigidas por material (ABS precisa de câmara fechada)
+MATERIAL_TAGS = {"PLA": "pla", "PETG": "petg", "ABS": "abs,enclosed"}
+CHUNK_SIZE = 5000
+# submontagens (produtos do nível de baixo) por produto nos níveis acima do primeiro
+SUBASSEMBLIES = 2
+
+
+def _weighted(rng: random.Random, table):
+    values, weights = zip(*table)
+    return rng.choices(values, weights)[0]
+
+
+def _printer_tags(rng: random.Random) -> str:
+    tags = [_weighted(rng, PLATFORMS), "pla", "petg"]
+    if rng.random() < 0.3:
+        tags += ["abs", "enclosed"]
+    return ",".join(tags)
+
+
+def _component_tags(rng: random.Random, material: str) -> str:
+    tags = MATERIAL_TAGS[material]
+    if rng.random() < 0.1:
+        tags += "," + _weighted(rng, PLATFORMS)
+    return tags
+
+
+@dataclass
+class FarmScale:
+    printers: int = 20
+    components: int = 200
+    products: int = 100
+    bom_lines: int = 5
+    # níveis do BOM: 1 = só componentes; acima disso cada nível usa o de baixo como submontagem
+    bom_depth: int = 1
+    orders: int = 500
+    workorders: int = 50
+    logs: int = 2000
+    seed: int = 0
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def _insert_rows(model, columns, rows) -> None:
+    """INSERT em lote sem instanciar modelos (colunas pelo nome de atributo)."""
+    qn = connection.ops.quote_name
+    fields = [model._meta.get_field(c.removesuffix("_id")) for c in columns]
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        qn(model._meta.db_table),
+        ", ".join(qn(f.column) for f in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def generate_farm(scale: FarmScale, prefix: str = "SYN", chunk_size: int = CHUNK_SIZE) -> dict:
+    """Cria impressoras, componentes, produtos, ordens e registros com `bulk_create`.
+
+    Com `bom_depth` > 1 os produtos são divididos em níveis ligados por
+    `SubAssemblyItem`, para exercitar a explosão do BOM (rollups, MRP).
+
+    Tudo roda em uma transação; os registros de impressão são gerados e
+    gravados em blocos de `chunk_size`, sem manter todos em memória. Como a
+    carga em massa não dispara sinais, os contadores de progresso são
+    calculados durante a geração e gravados no final. Retorna a contagem
+    criada por modelo.
+    """
+    rng = random.Random(scale.seed)
+    with transaction.atomic():
+        printers = Printer.objects.bulk_create(
+            [
+                Printer(
+                    name=f"{prefix}-PR{i:04d}",
+                    speed_factor=rng.choice([0.8, 1.0, 1.0, 1.2, 1.5]),
+                    tags=_printer_tags(rng),
+                )
+                for i in range(scale.printers)
+            ]
+        )
+        components = []
+        for i in range(scale.components):
+            material = _weighted(rng, MATERIALS)
+            print_time = max(5, int(rng.lognormvariate(3.5, 0.6)))
+            batch = rng.choice([1, 1, 2, 4, 6, 8, 12])
+            components.append(
+                Component(
+                    code=f"{prefix}-C{i:06d}",
+                    name=f"Componente {i}",
+                    material=material,
+                    unit_cost=round(rng.uniform(0.5, 40), 2),
+                    print_time_min=print_time,
+                    base_time_min=rng.choice([0, 5, 10, 15]),
+                    per_plate_time_min=print_time * batch,
+                    batch_size=batch,
+                    tags_required=_component_tags(rng, material),
+                )
+            )
+        components = Component.objects.bulk_create(components, batch_size=1000)
+        products = Product.objects.bulk_create(
+            [Product(code=f"{prefix}-P{i:06d}", name=f"Produto {i}") for i in range(scale.products)],
+            batch_size=1000,
+        )
+        bom = []
+        for product in products:
+            for comp in rng.sample(components, min(scale.bom_lines, len(components))):
+                bom.append(BOMItem(product=product, component=comp, quantity=rng.randint(1, 6)))
+        BOMItem.objects.bulk_create(bom, batch_size=1000)
+        # níveis em faixas contíguas; cada produto só usa submontagens do nível
+        # imediatamente abaixo, então não há ciclos
+        depth = max(1, min(scale.bom_depth, len(products)))
+        levels = [[] for _ in range(depth)]
+        for i, product in enumerate(products):
+            levels[i * depth // len(products)].append(product)
+        subassemblies = [
+            SubAssemblyItem(parent=product, child=child, quantity=rng.randint(1, 3))
+            for below, level in zip(levels, levels[1:])
+            for product in level
+            for child in rng.sample(below, min(SUBASSEMBLIES, len(below)))
+        ]
+        SubAssemblyItem.objects.bulk_create(subassemblies, batch_size=1000)
+        refresh_products(products)
+        # BOM explodido: [(componente, qtd por unidade), ...] com as submontagens incluídas
+        bom_by_product = {product.id: product.rollup_bom for product in products}
+
+        today = timezone.localdate()
+
+        def due_date():
+            return today + timedelta(days=rng.randint(0, 21)) if rng.random() < 0.8 else None
+
+        orders = ProductionOrder.objects.bulk_create(
+            [
+                ProductionOrder(
+                    product=rng.choice(products),
+                    quantity=rng.randint(1, 20),
+                    due_date=due_date(),
+                )
+                for _ in range(scale.orders)
+            ],
+            batch_size=1000,
+        )
+        WorkOrder.objects.bulk_create(
+            [
+                WorkOrder(
+                    product=rng.choice(products),
+                    quantity=rng.randint(1, 20),
+                    priority=rng.randint(1, 5),
+                    due_date=due_date(),
+                )
+                for _ in range(scale.workorders)
+            ],
+            batch_size=1000,
+        )
+        # registros e contadores vão direto por executemany: com milhões de
+        # linhas, instanciar modelos domina o tempo de carga
+        required = {
+            (order.id, component_id): qty * order.quantity
+            for order in orders
+            for component_id, qty in bom_by_product.get(order.product_id, [])
+        }
+        printed = dict.fromkeys(required, 0)
+        loggable = [o for o in orders if bom_by_product.get(o.product_id)]
+        created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        logged = 0
+        remaining = scale.logs if loggable else 0
+        while remaining > 0:
+            chunk = []
+            for _ in range(min(chunk_size, remaining)):
+                order = rng.choice(loggable)
+                component_id = rng.choice(bom_by_product[order.product_id])[0]
+                qty = rng.randint(1, 4)
+                printed[(order.id, component_id)] += qty
+                chunk.append((order.id, component_id, qty, created_at))
+            _insert_rows(ProductionLog, ["order_id", "component_id", "quantity", "created_at"], chunk)
+            logged += len(chunk)
+            remaining -= len(chunk)
+        counters = [
+            (order_id, component_id, req, printed[(order_id, component_id)])
+            for (order_id, component_id), req in required.items()
+        ]
+        OrderComponentProgress.objects.filter(order_id__in=[o.id for o in orders]).delete()
+        for start in range(0, len(counters), chunk_size):
+            _insert_rows(
+                OrderComponentProgress,
+                ["order_id", "component_id", "required", "printed"],
+                counters[start:start + chunk_size],
+            )
+    return {
+        "printers": len(printers),
+        "components": len(components),
+        "products": len(products),
+        "bom_items": len(bom),
+        "subassemblies": len(subassemblies),
+        "orders": len(orders),
+        "workorders": scale.workorders,
+        "logs": logged,
+    }
@@ -1,6 +1,10 @@
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
 from django.urls import reverse
 from .models import Component, Product, BOMItem, ProductionOrder
+from .views import _search
 
 
 class SmokeTests(TestCase):
@@ -114,3 +118,58 @@ class ProductionOrderTests(TestCase):
         response = self.client.post(url)
         self.assertRedirects(response, reverse("producao"))
         self.assertFalse(ProductionOrder.objects.filter(pk=order.pk).exists())
+
+
+class InventoryListTests(TestCase):
+    def setUp(self):
+        self.pla = Component.objects.create(code="C1", name="Base", material="PLA", unit_cost=5, print_time_min=10)
+        self.petg = Component.objects.create(code="C2", name="Tampa", material="PETG", unit_cost=4, print_time_min=20)
+        for i in range(5):
+            prod = Product.objects.create(code=f"P{i}", name=f"Prod {i}")
+            BOMItem.objects.create(product=prod, component=self.pla, quantity=2)
+            if i % 2 == 0:
+                BOMItem.objects.create(product=prod, component=self.petg, quantity=3)
+
+    def test_keyset_pages_cover_all_products(self):
+        url = reverse("estoque-produtos")
+        with mock.patch("core.views.PAGE_SIZE", 2):
+            seen = []
+            response = self.client.get(url)
+            while True:
+                seen += [row["obj"].code for row in response.context["products"]]
+                cursor = response.context["next_cursor"]
+                if cursor is None:
+                    break
+                response = self.client.get(url, {"after": cursor})
+            back = self.client.get(url, {"before": "P4"})
+        self.assertEqual(seen, ["P0", "P1", "P2", "P3", "P4"])
+        self.assertEqual([row["obj"].code for row in back.context["products"]], ["P2", "P3"])
+        self.assertEqual(back.context["prev_cursor"], "P2")
+
+    def test_product_aggregates_with_constant_queries(self):
+        url = reverse("estoque-produtos")
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        rows = {row["obj"].code: row for row in response.context["products"]}
+        self.assertEqual(rows["P0"]["total_time_min"], 2 * 10 + 3 * 20)
+        self.assertEqual(rows["P0"]["total_cost"], 2 * 5 + 3 * 4)
+        self.assertEqual(rows["P0"]["materials"], "PETG, PLA")
+        self.assertEqual(rows["P1"]["materials"], "PLA")
+        self.assertEqual(rows["P1"]["total_cost"], Product.objects.get(code="P1").total_cost)
+
+    def test_prefix_search(self):
+        response = self.client.get(reverse("estoque-componentes"), {"q": "tam"})
+        self.assertEqual([c.code for c in response.context["components"]], ["C2"])
+        response = self.client.get(reverse("estoque-componentes"), {"q": "amp"})
+        self.assertEqual(list(response.context["components"]), [])
+        response = self.client.get(reverse("estoque-componentes"), {"q": "c2"})
+        self.assertEqual([c.code for c in response.context["components"]], ["C2"])
+
+    def test_prefix_search_uses_lower_indexes(self):
+        qs = _search(Component.objects.all(), "tam")
+        sql, params = qs.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("USING INDEX component_code_lower", plan)
+        self.assertIn("USING INDEX component_name_lower", plan)
@@ -0,0 +1,93 @@
+from datetime import datetime, time, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.availability import Calendar, IntervalSet, load_calendar
+from core.models import BOMItem, Component, OperatorShift, Printer, PrinterDowntime, Product, WorkOrder
+from core.scheduling import PrinterDTO, TaskDTO, schedule_tasks
+
+
+def _task(minutes, component_id=1):
+    return TaskDTO(component_id, "Comp", 1, minutes, set())
+
+
+class IntervalSetTests(TestCase):
+    def test_merges_and_skips_blocks(self):
+        blocks = IntervalSet([(100, 200), (150, 250), (300, 400)])
+        self.assertEqual(list(blocks), [(100, 250), (300, 400)])
+        self.assertEqual(blocks.next_gap(0, 100), 0)
+        self.assertEqual(blocks.next_gap(120, 50), 250)
+        # não cabe entre 250 e 300: vai para depois do segundo bloqueio
+        self.assertEqual(blocks.next_gap(0, 120), 400)
+        self.assertEqual(blocks.next_inside(260), 300)
+        self.assertIsNone(blocks.next_inside(400))
+
+
+class CalendarSchedulingTests(TestCase):
+    def test_plates_skip_downtime_and_wait_for_operator(self):
+        # turnos: [0, 480) e [1440, 1920) — operador só nessas janelas
+        calendar = Calendar({1: IntervalSet([(100, 300)])}, IntervalSet([(0, 480), (1440, 1920)]))
+        printers = [PrinterDTO(1, "P1", 1.0, set())]
+        tasks = [_task(90), _task(120), _task(240)]
+        assignments, unassigned, makespan, _ = schedule_tasks(tasks, printers, calendar=calendar)
+        spans = [(a.start, a.end) for a in assignments]
+        # 240 começa em 300 (após manutenção); 120 às 540 cairia fora do turno -> 1440
+        self.assertEqual(spans[0], (300, 540))
+        self.assertEqual(spans[1], (1440, 1560))
+        self.assertEqual(spans[2], (1560, 1650))
+        self.assertEqual(unassigned, [])
+        self.assertEqual(makespan, 1650)
+
+    def test_printer_with_downtime_is_avoided(self):
+        calendar = Calendar({1: IntervalSet([(0, 600)])})
+        printers = [PrinterDTO(1, "P1", 1.0, set()), PrinterDTO(2, "P2", 0.5, set())]
+        assignments, *_ = schedule_tasks([_task(60)], printers, calendar=calendar)
+        # P2 é mais lenta, mas termina em 120, antes de P1 ficar livre
+        self.assertEqual((assignments[0].printer_id, assignments[0].end), (2, 120))
+
+    def test_no_shift_in_horizon_leaves_task_unassigned(self):
+        calendar = Calendar({}, IntervalSet([(0, 10)]))
+        printers = [PrinterDTO(1, "P1", 1.0, set())]
+        assignments, unassigned, *_ = schedule_tasks([_task(30), _task(30)], printers, calendar=calendar)
+        self.assertEqual(len(assignments), 1)
+        self.assertEqual(len(unassigned), 1)
+
+
+class CalendarLoadingTests(TestCase):
+    def setUp(self):
+        self.start = timezone.make_aware(datetime(2030, 1, 7, 8, 0))  # segunda-feira
+        self.printer = Printer.objects.create(name="P1")
+
+    def test_empty_calendar_is_none(self):
+        self.assertIsNone(load_calendar(self.start))
+
+    def test_loads_downtime_and_weekly_shifts(self):
+        PrinterDowntime.objects.create(
+            printer=self.printer, starts_at=self.start + timedelta(hours=1), ends_at=self.start + timedelta(hours=2)
+        )
+        OperatorShift.objects.create(weekday=0, start_time=time(6), end_time=time(14))
+        OperatorShift.objects.create(weekday=1, start_time=time(22), end_time=time(2))
+        calendar = load_calendar(self.start, horizon_days=7)
+        self.assertEqual(list(calendar.downtime[self.printer.id]), [(60, 120)])
+        windows = list(calendar.shifts)
+        self.assertIn((-120, 360), windows)
+        # terça 22h -> quarta 2h
+        self.assertIn((38 * 60, 42 * 60), windows)
+
+    def test_api_reports_datetimes(self):
+        comp = Component.objects.create(code="C1", name="Comp", per_plate_time_min=60, batch_size=1)
+        product = Product.objects.create(code="P1", name="Prod")
+        BOMItem.objects.create(product=product, component=comp, quantity=1)
+        wo = WorkOrder.objects.create(product=product, quantity=1)
+        now = timezone.now()
+        PrinterDowntime.objects.create(printer=self.printer, starts_at=now - timedelta(hours=1), ends_at=now + timedelta(hours=1))
+        data = self.client.post(
+            "/api/schedule/", {"workorder_id": wo.id}, content_type="application/json"
+        ).json()
+        row = data["assignments"][0]
+        self.assertGreaterEqual(row["start"], 59)
+        starts_at = datetime.fromisoformat(row["starts_at"])
+        self.assertAlmostEqual(
+            (starts_at - datetime.fromisoformat(data["plan_start"])).total_seconds() / 60, row["start"], places=3
+        )
@@ -0,0 +1,66 @@
+from django.test import TestCase
+from django.urls import reverse
+from core import schedule_cache
+from core.benchmarks import compare, over_budget, parse_budgets, run_benchmarks
+from core.models import OrderComponentProgress, Product, ProductionLog, ScheduledAssignment, SubAssemblyItem
+from core.progress import rebuild_counters
+from core.rollups import rebuild_rollups
+from core.synthetic import FarmScale, generate_farm
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_generate_and_run_small_farm(self):
+        created = generate_farm(
+            FarmScale(printers=3, components=8, products=4, bom_lines=2, orders=6, workorders=2, logs=10)
+        )
+        self.assertEqual(created["orders"], 6)
+        self.assertEqual(ProductionLog.objects.count(), created["logs"])
+        self.assertTrue(OrderComponentProgress.objects.exists())
+        self.assertEqual(rebuild_counters(fix=False), [])
+        self.assertEqual(rebuild_rollups(fix=False), [])
+        results = run_benchmarks(repeat=2)
+        self.assertIn("dashboard", results)
+        self.assertIn("api_schedule_batch", results)
+        # simulação fria consulta o banco; a repetição sai do cache
+        self.assertGreater(results["api_schedule_batch"]["queries"], 0)
+        self.assertEqual(results["api_schedule_batch_warm"]["queries"], 0)
+        self.assertGreater(results["dashboard"]["queries"], 0)
+        lines = compare(results, {"dashboard": results["dashboard"]})
+        self.assertTrue(any(line.startswith("dashboard:") for line in lines))
+
+    def test_generate_multi_level_bom(self):
+        created = generate_farm(
+            FarmScale(printers=2, components=12, products=9, bom_lines=2, bom_depth=3, orders=6, workorders=2, logs=20)
+        )
+        # três níveis de três produtos; os dois de cima usam duas submontagens cada
+        self.assertEqual(created["subassemblies"], 12)
+        self.assertEqual(SubAssemblyItem.objects.count(), 12)
+        top = Product.objects.order_by("-code").first()
+        self.assertGreater(len(top.rollup_bom), 2)
+        self.assertEqual(rebuild_counters(fix=False), [])
+        self.assertEqual(rebuild_rollups(fix=False), [])
+
+
+class ScheduleEndpointTests(TestCase):
+    def test_batch_simulation_on_realistic_farm(self):
+        # 60 impressoras e 500 ordens (cerca de 9 mil pratos); o tempo fica em
+        # `bench_hot_paths --budget api_schedule_batch=1000`
+        generate_farm(
+            FarmScale(printers=60, components=200, products=100, bom_lines=1, orders=0, workorders=500, logs=0)
+        )
+        schedule_cache.bump()
+        resp = self.client.post(reverse("api-schedule"), data={"mode": "batch"}, content_type="application/json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertGreater(len(resp.json()["assignments"]), 4000)
+        self.assertFalse(ScheduledAssignment.objects.exists())
+
+    def test_budgets(self):
+        results = {"api_schedule_batch": {"median_ms": 1200.0}, "dashboard": {"median_ms": 10.0}}
+        budgets = parse_budgets(["api_schedule_batch=1000", "dashboard=50"])
+        self.assertEqual(budgets, {"api_schedule_batch": 1000.0, "dashboard": 50.0})
+        lines = over_budget(results, {"api_schedule_batch": 1000.0, "dashboard": 50.0, "missing": 1.0})
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("api_schedule_batch:"))
+        self.assertEqual(lines[1], "missing: not measured")
+        with self.assertRaises(ValueError):
+            parse_budgets(["dashboard"])
@@ -0,0 +1,71 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from core.bom import BOMCycleError, explode
+from core.models import (
+    BOMItem,
+    Component,
+    OrderComponentProgress,
+    Product,
+    ProductionOrder,
+    SubAssemblyItem,
+    WorkOrder,
+)
+from core.scheduling import expand_workorder_to_tasks
+
+
+class MultiLevelBOMTests(TestCase):
+    def setUp(self):
+        self.screw = Component.objects.create(code="C1", name="Parafuso", unit_cost=1, print_time_min=5, batch_size=10)
+        self.shell = Component.objects.create(code="C2", name="Casca", unit_cost=10, print_time_min=60, batch_size=1)
+        # módulo = 1 casca + 4 parafusos; kit = 2 módulos + 2 parafusos
+        self.module = Product.objects.create(code="MOD", name="Módulo")
+        BOMItem.objects.create(product=self.module, component=self.shell, quantity=1)
+        BOMItem.objects.create(product=self.module, component=self.screw, quantity=4)
+        self.kit = Product.objects.create(code="KIT", name="Kit")
+        BOMItem.objects.create(product=self.kit, component=self.screw, quantity=2)
+        SubAssemblyItem.objects.create(parent=self.kit, child=self.module, quantity=2)
+
+    def test_explosion_and_rollups(self):
+        self.assertEqual(dict(explode([self.kit.id])[self.kit.id]), {self.screw.id: 10, self.shell.id: 2})
+        self.kit.refresh_from_db()
+        self.assertEqual(self.kit.total_cost, 2 * 10 + 10 * 1)
+        self.assertEqual(self.kit.bom_required_minutes(1), 2 * 60 + 10 * 5)
+
+    def test_child_edit_propagates_to_parents_and_orders(self):
+        order = ProductionOrder.objects.create(product=self.kit, quantity=3)
+        BOMItem.objects.filter(product=self.module, component=self.screw).update(quantity=5)
+        # update() não dispara sinais: salva a linha para simular a edição
+        BOMItem.objects.get(product=self.module, component=self.screw).save()
+        self.kit.refresh_from_db()
+        self.assertEqual(dict(self.kit.rollup_bom)[self.screw.id], 12)
+        counter = OrderComponentProgress.objects.get(order=order, component=self.screw)
+        self.assertEqual(counter.required, 36)
+        self.assertEqual(order.required_for_component(self.shell), 6)
+
+    def test_workorder_expands_nested_components(self):
+        wo = WorkOrder.objects.create(product=self.kit, quantity=1)
+        tasks = expand_workorder_to_tasks(wo)
+        plates = {}
+        for t in tasks:
+            plates.setdefault(t.component_id, []).append(t.quantity)
+        self.assertEqual(plates[self.shell.id], [1, 1])
+        self.assertEqual(plates[self.screw.id], [10])
+
+    def test_cycles_are_rejected(self):
+        with self.assertRaises(BOMCycleError):
+            SubAssemblyItem.objects.create(parent=self.module, child=self.kit, quantity=1)
+        with self.assertRaises(ValidationError):
+            SubAssemblyItem(parent=self.module, child=self.module, quantity=1).full_clean()
+
+    def test_deep_tree_is_explored_once_per_level(self):
+        parent = self.kit
+        for depth in range(6):
+            child = Product.objects.create(code=f"L{depth}", name=f"Nível {depth}")
+            BOMItem.objects.create(product=child, component=self.screw, quantity=1)
+            SubAssemblyItem.objects.create(parent=parent, child=child, quantity=2)
+            parent = child
+        # duas consultas por nível (componentes e submontagens): kit + 6 níveis
+        with self.assertNumQueries(2 * 7):
+            vector = dict(explode([self.kit.id])[self.kit.id])
+        self.assertEqual(vector[self.screw.id], 10 + sum(2 ** (d + 1) for d in range(6)))
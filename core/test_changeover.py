@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.changeover import SetupMatrix, changeover_stats, count_changeovers, load_setup_matrix
+from core.models import BOMItem, Component, MaterialChangeover, Printer, Product, WorkOrder
+from core.schedule_state import ScheduleState
+from core.scheduling import AssignmentDTO, PrinterDTO, TaskDTO, schedule_tasks
+
+
+def _task(minutes, material, component_id=1):
+    return TaskDTO(component_id, "Comp", 1, minutes, set(), material=material)
+
+
+class SetupMatrixTests(TestCase):
+    def test_lookup_precedence(self):
+        setups = SetupMatrix({1: 10.0}, {(1, "PLA", "ABS"): 30.0, (None, "PLA", "ABS"): 20.0, (None, "ABS", "PLA"): 5.0})
+        self.assertEqual(setups.minutes(1, "PLA", "ABS"), 30.0)
+        self.assertEqual(setups.minutes(2, "PLA", "ABS"), 20.0)
+        self.assertEqual(setups.minutes(1, "ABS", "PLA"), 5.0)
+        self.assertEqual(setups.minutes(1, "PLA", "PETG"), 10.0)
+        self.assertEqual(setups.minutes(1, "PLA", "PLA"), 0.0)
+        # prato sem material (ou impressora sem histórico) não conta troca
+        self.assertEqual(setups.minutes(1, "", "ABS"), 0.0)
+
+    def test_load_from_database(self):
+        self.assertIsNone(load_setup_matrix())
+        p1 = Printer.objects.create(name="P1", material_change_min=15)
+        p2 = Printer.objects.create(name="P2")
+        MaterialChangeover.objects.create(printer=p2, from_material="PLA", to_material="ABS", minutes=40)
+        MaterialChangeover.objects.create(from_material="ABS", to_material="PLA", minutes=25)
+        setups = load_setup_matrix([p1.id])
+        self.assertEqual(setups.defaults, {p1.id: 15.0})
+        self.assertEqual(setups.pairs, {(None, "ABS", "PLA"): 25.0})
+        self.assertEqual(load_setup_matrix().minutes(p2.id, "PLA", "ABS"), 40.0)
+
+
+class ChangeoverSchedulingTests(TestCase):
+    def setUp(self):
+        self.printers = [PrinterDTO(1, "P1", 1.0, set()), PrinterDTO(2, "P2", 1.0, set())]
+        self.tasks = [_task(60 + i, "PLA" if i % 2 else "ABS") for i in range(8)]
+
+    def test_setup_time_precedes_material_change(self):
+        setups = SetupMatrix({1: 30.0})
+        printers = self.printers[:1]
+        assignments, *_ = schedule_tasks([_task(60, "PLA"), _task(50, "ABS")], printers, setups=setups)
+        self.assertEqual([(a.start, a.end) for a in assignments], [(0, 60), (90, 140)])
+
+    def test_grouping_saves_changeovers(self):
+        setups = SetupMatrix({1: 30.0, 2: 30.0})
+        blind, *_ = schedule_tasks(self.tasks, self.printers)
+        grouped, unassigned, makespan, _ = schedule_tasks(self.tasks, self.printers, setups=setups)
+        self.assertEqual(unassigned, [])
+        stats = changeover_stats(blind, grouped, setups)
+        self.assertGreater(stats.changes_before, stats.changes_after)
+        self.assertEqual(stats.minutes_saved, 30.0 * stats.changes_saved)
+        # cada impressora troca no máximo uma vez entre os dois materiais
+        self.assertLessEqual(stats.changes_after, 2)
+        for printer_id in (1, 2):
+            queue = sorted((a for a in grouped if a.printer_id == printer_id), key=lambda a: a.start)
+            for prev, cur in zip(queue, queue[1:]):
+                gap = setups.minutes(printer_id, prev.task.material, cur.task.material)
+                self.assertAlmostEqual(cur.start, prev.end + gap)
+        self.assertEqual(count_changeovers(grouped, setups)[0], stats.changes_after)
+
+    def test_incremental_placement_continues_loaded_material(self):
+        setups = SetupMatrix({1: 30.0, 2: 30.0})
+        start = timezone.now() - timedelta(minutes=1)
+        assignments = [
+            AssignmentDTO(1, _task(60, "PLA"), 0, 60),
+            AssignmentDTO(2, _task(60, "ABS"), 0, 60),
+        ]
+        state = ScheduleState(self.printers, assignments, [], start, setups=setups)
+        state.unassigned = [_task(40, "ABS")]
+        state.activate_printer(PrinterDTO(3, "P3", 0.1, set()))
+        placed = state.queues[2][-1]
+        self.assertEqual((placed.task.material, placed.start), ("ABS", 60))
+
+
+class ChangeoverAPITests(TestCase):
+    def test_batch_reports_changeovers(self):
+        Printer.objects.create(name="P1", material_change_min=20)
+        Printer.objects.create(name="P2", material_change_min=20)
+        pla = Component.objects.create(code="PLA1", name="Suporte", material="PLA", per_plate_time_min=60, batch_size=1)
+        abs_ = Component.objects.create(code="ABS1", name="Tampa", material="ABS", per_plate_time_min=55, batch_size=1)
+        for i in range(3):
+            product = Product.objects.create(code=f"P{i}", name=f"Prod {i}")
+            BOMItem.objects.create(product=product, component=pla, quantity=2)
+            BOMItem.objects.create(product=product, component=abs_, quantity=2)
+            WorkOrder.objects.create(product=product, quantity=1)
+        data = self.client.post(
+            "/api/schedule/", {"mode": "batch", "optimize_ms": 50}, content_type="application/json"
+        ).json()
+        # sem pedir a comparação, o lote é escalonado uma vez só
+        self.assertIsNone(data["changeover"]["changes_before"])
+        self.assertIsNone(data["changeover"]["minutes_saved"])
+        data = self.client.post(
+            "/api/schedule/",
+            {"mode": "batch", "optimize_ms": 50, "changeover_baseline": True},
+            content_type="application/json",
+        ).json()
+        changeover = data["changeover"]
+        self.assertLessEqual(changeover["changes_after"], changeover["changes_before"])
+        self.assertEqual(changeover["minutes_after"], 20 * changeover["changes_after"])
+        self.assertEqual({a["material"] for a in data["assignments"]}, {"PLA", "ABS"})
+        self.assertNotIn("optimization", data)
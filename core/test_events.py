@@ -0,0 +1,123 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from core import events
+from core.events import Broker
+from core.models import BOMItem, Component, Printer, Product, ProductionOrder
+
+
+def _parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+class BrokerTests(TestCase):
+    def test_publish_reaches_subscribers(self):
+        broker = Broker()
+        subscriber, backlog = broker.subscribe()
+        self.assertEqual(backlog, [])
+        event = broker.publish("printer", {"id": 1})
+        self.assertIs(subscriber.queue.get_nowait(), event)
+        broker.unsubscribe(subscriber)
+        self.assertFalse(broker.has_subscribers())
+
+    def test_backlog_since_last_id(self):
+        broker = Broker()
+        first = broker.publish("printer", {"id": 1})
+        second = broker.publish("printer", {"id": 2})
+        _, backlog = broker.subscribe(last_id=first.id)
+        self.assertEqual(backlog, [second])
+        _, backlog = broker.subscribe(last_id=second.id)
+        self.assertEqual(backlog, [])
+
+    def test_resync_when_history_lost(self):
+        with mock.patch.object(events, "HISTORY_SIZE", 2):
+            broker = Broker()
+        for i in range(4):
+            broker.publish("printer", {"id": i})
+        _, backlog = broker.subscribe(last_id=1)
+        self.assertEqual([e.kind for e in backlog], ["resync"])
+        # id de outro processo (reinício do servidor)
+        _, backlog = broker.subscribe(last_id=99)
+        self.assertEqual([e.kind for e in backlog], ["resync"])
+
+    def test_slow_client_is_told_to_resync(self):
+        with mock.patch.object(events, "QUEUE_SIZE", 1):
+            subscriber, _ = events.broker.subscribe()
+        try:
+            events.broker.publish("printer", {"id": 1})
+            events.broker.publish("printer", {"id": 2})
+            self.assertTrue(subscriber.lagged)
+        finally:
+            events.broker.unsubscribe(subscriber)
+
+    def test_async_subscriber(self):
+        async def run():
+            broker = Broker()
+            subscriber, _ = broker.subscribe(loop=asyncio.get_running_loop())
+            broker.publish("printer", {"id": 1})
+            return await asyncio.wait_for(subscriber.queue.get(), 1)
+
+        self.assertEqual(asyncio.run(run()).data, {"id": 1})
+
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.comp = Component.objects.create(code="C1", name="Comp", print_time_min=10, qty_on_hand=10)
+        self.product = Product.objects.create(code="P1", name="Prod")
+        BOMItem.objects.create(product=self.product, component=self.comp, quantity=3)
+        self.order = ProductionOrder.objects.create(product=self.product, quantity=2)
+        self.subscriber, _ = events.broker.subscribe()
+
+    def tearDown(self):
+        events.broker.unsubscribe(self.subscriber)
+
+    def _next(self):
+        return self.subscriber.queue.get_nowait()
+
+    def test_log_print_publishes_progress_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(
+                reverse("api-log-print"),
+                data={"order_id": self.order.id, "component_id": self.comp.id, "quantity": 2},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(callbacks)
+        event = self._next()
+        self.assertEqual(event.kind, "progress")
+        self.assertEqual(event.data["order_id"], self.order.id)
+        self.assertEqual(event.data["total_printed"], 2)
+        self.assertEqual(event.data["total_required"], 6)
+        self.assertEqual(event.data["component"]["remaining"], 4)
+        self.assertEqual(event.data["component"]["time_remaining_hhmm"], "0h40")
+
+    def test_nothing_published_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            Printer.objects.create(name="P1")
+        self.assertTrue(self.subscriber.queue.empty())
+
+    def test_printer_toggle_publishes_printer(self):
+        printer = Printer.objects.create(name="P1")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse("api-printer-toggle", args=[printer.id]))
+        kinds = {}
+        while not self.subscriber.queue.empty():
+            event = self._next()
+            kinds[event.kind] = event.data
+        self.assertEqual(kinds["printer"], {"id": printer.id, "name": "P1", "is_active": False})
+
+    def test_endpoint_streams_backlog(self):
+        first = events.broker.publish("printer", {"id": 1})
+        events.broker.publish("printer", {"id": 2})
+        response = self.client.get(reverse("api-events"), HTTP_LAST_EVENT_ID=str(first.id))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        chunks = iter(response.streaming_content)
+        self.assertTrue(next(chunks).startswith(b"retry:"))
+        self.assertEqual(_parse(next(chunks).decode()), ("printer", {"id": 2}))
+        response.close()
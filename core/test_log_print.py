@@ -18,3 +18,44 @@ class LogPrintAPITests(TestCase):
         comp.refresh_from_db()
         self.assertEqual(comp.qty_on_hand, 7)
         self.assertEqual(ProductionLog.objects.filter(order=order, component=comp, quantity=3).count(), 1)
+
+
+class AsyncReadAPITests(TestCase):
+    """Views assíncronas usadas pelo modal de impressão e pelo polling."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.comp = Component.objects.create(code="C1", name="Comp", qty_on_hand=10, print_time_min=5)
+        cls.prod = Product.objects.create(code="P1", name="Prod")
+        BOMItem.objects.create(product=cls.prod, component=cls.comp, quantity=4)
+        cls.order = ProductionOrder.objects.create(product=cls.prod, quantity=1)
+
+    async def test_product_components(self):
+        response = await self.async_client.get(reverse('api-product-components', args=[self.prod.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {"id": self.comp.id, "code": "C1", "name": "Comp", "print_time_min": 5, "total_required": 4},
+        ])
+        response = await self.async_client.get(reverse('api-product-components', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_print_time(self):
+        response = await self.async_client.post(
+            reverse('api-print-time'),
+            data={'component_id': self.comp.id, 'quantity': 30},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), {"time_min": 150, "time_hhmm": "2h30"})
+
+    async def test_printers_and_progress(self):
+        response = await self.async_client.get(reverse('api-printers'))
+        self.assertEqual(response.json(), [])
+        response = await self.async_client.get(reverse('api-orders-progress'))
+        self.assertEqual([o["order_id"] for o in response.json()], [self.order.id])
+        response = await self.async_client.get(reverse('api-orders-progress') + "?ids=x")
+        self.assertEqual(response.status_code, 400)
+
+    def test_sync_client_still_works(self):
+        # sob WSGI o Django executa a view assíncrona com async_to_sync
+        response = self.client.get(reverse('api-product-components', args=[self.prod.id]))
+        self.assertEqual(response.json()[0]["total_required"], 4)
@@ -0,0 +1,70 @@
+from datetime import date
+
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import BOMItem, Component, Printer, Product, ProductionLog, ProductionOrder, WorkOrder
+from core.mrp import PRODUCTION, WORK, net_requirements
+
+
+class NetRequirementsTests(TestCase):
+    def setUp(self):
+        self.comp = Component.objects.create(
+            code="C1", name="Peça", qty_on_hand=10, print_time_min=30, per_plate_time_min=30, batch_size=2
+        )
+        self.product = Product.objects.create(code="P1", name="Prod")
+        BOMItem.objects.create(product=self.product, component=self.comp, quantity=2)
+        Printer.objects.create(name="P", speed_factor=1.0)
+
+    def test_stock_goes_to_priority_then_due_date(self):
+        late = WorkOrder.objects.create(product=self.product, quantity=3, priority=1, due_date=date(2030, 1, 2))
+        soon = WorkOrder.objects.create(product=self.product, quantity=3, priority=1, due_date=date(2030, 1, 1))
+        urgent = WorkOrder.objects.create(product=self.product, quantity=1, priority=5)
+        result = net_requirements(production_orders=[])
+        net = {line.order_id: (line.allocated, line.net) for line in result.lines}
+        # 10 em estoque: urgente (2), depois o prazo mais cedo (6), sobra 2 para o último
+        self.assertEqual(net[urgent.id], (2, 0))
+        self.assertEqual(net[soon.id], (6, 0))
+        self.assertEqual(net[late.id], (2, 4))
+        self.assertEqual(result.left[self.comp.id], 0)
+        self.assertEqual(list(result.for_workorders()), [late.id])
+
+    def test_production_orders_use_remaining_quantity(self):
+        order = ProductionOrder.objects.create(product=self.product, quantity=10)
+        ProductionLog.objects.create(order=order, component=self.comp, quantity=5)
+        wo = WorkOrder.objects.create(product=self.product, quantity=1)
+        with self.assertNumQueries(4):
+            result = net_requirements()
+        lines = {(line.kind, line.order_id): line for line in result.lines}
+        self.assertEqual(lines[(PRODUCTION, order.id)].gross, 15)
+        self.assertEqual(lines[(PRODUCTION, order.id)].net, 5)
+        self.assertEqual(lines[(WORK, wo.id)].net, 2)
+        self.assertEqual(result.by_component()[self.comp.id]["net"], 7)
+
+    def test_batch_schedule_prints_only_net_plates(self):
+        WorkOrder.objects.create(product=self.product, quantity=6)
+        url = reverse("api-schedule")
+        gross = self.client.post(url, {"mode": "batch"}, content_type="application/json").json()
+        net = self.client.post(url, {"mode": "batch", "net": True}, content_type="application/json").json()
+        self.assertEqual(len(gross["assignments"]), 6)
+        self.assertEqual(len(net["assignments"]), 1)
+        self.assertTrue(net["net"])
+        data = self.client.get(reverse("api-mrp")).json()
+        self.assertEqual(data["components"][0]["net"], 2)
+
+    def test_net_plan_cache_follows_production_orders(self):
+        WorkOrder.objects.create(product=self.product, quantity=5, due_date=date(2030, 1, 10))
+        url = reverse("api-schedule")
+        body = {"mode": "batch", "net": True}
+        first = self.client.post(url, body, content_type="application/json").json()
+        self.assertEqual(first["assignments"], [])
+        # ordem de produção com prazo anterior fica com o estoque
+        order = ProductionOrder.objects.create(product=self.product, quantity=5, due_date=date(2030, 1, 1))
+        data = self.client.post(url, body, content_type="application/json").json()
+        self.assertFalse(data["cached"])
+        self.assertEqual(len(data["assignments"]), 5)
+        # peças impressas da ordem devolvem o estoque ao plano
+        ProductionLog.objects.create(order=order, component=self.comp, quantity=10)
+        data = self.client.post(url, body, content_type="application/json").json()
+        self.assertFalse(data["cached"])
+        self.assertEqual(data["assignments"], [])
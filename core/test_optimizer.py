@@ -0,0 +1,86 @@
+import random
+
+from django.test import TestCase
+from core.models import Component, Product, BOMItem, WorkOrder, Printer
+from core.optimizer import makespan_lower_bound, optimize_schedule
+from core.scheduling import PrinterDTO, TaskDTO, schedule_tasks
+
+
+class OptimizerTests(TestCase):
+    def test_moves_work_to_faster_printer(self):
+        printers = [PrinterDTO(1, 'Lenta', 1.0, set()), PrinterDTO(2, 'Rápida', 3.0, set())]
+        tasks = [TaskDTO(1, 'A', 1, 60, set()), TaskDTO(2, 'B', 1, 60, set())]
+        assignments, _, makespan, _ = schedule_tasks(tasks, printers)
+        self.assertAlmostEqual(makespan, 60)
+        new_assignments, times, stats = optimize_schedule(assignments, printers, 100)
+        self.assertAlmostEqual(stats.makespan_before, 60)
+        self.assertAlmostEqual(stats.makespan_after, 40)
+        self.assertAlmostEqual(stats.lower_bound, 30)
+        self.assertEqual(stats.moves, 1)
+        self.assertEqual({a.printer_id for a in new_assignments}, {2})
+        self.assertAlmostEqual(times[2], 40)
+
+    def test_respects_tags_and_bound(self):
+        rng = random.Random(3)
+        tags = ['pla', 'abs', 'bambu']
+        printers = [
+            PrinterDTO(i, f'P{i}', rng.choice([0.5, 1.0, 1.5, 2.0]), set(rng.sample(tags, 2)))
+            for i in range(8)
+        ]
+        tasks = [
+            TaskDTO(i, f'T{i}', 1, rng.randint(10, 200), set(rng.sample(tags, rng.randint(0, 1))))
+            for i in range(120)
+        ]
+        assignments, _, makespan, _ = schedule_tasks(tasks, printers)
+        new_assignments, _, stats = optimize_schedule(assignments, printers, 200)
+        self.assertLessEqual(stats.makespan_after, makespan + 1e-9)
+        self.assertLessEqual(stats.lower_bound, stats.makespan_after + 1e-9)
+        self.assertEqual(len(new_assignments), len(assignments))
+        by_id = {p.id: p for p in printers}
+        for a in new_assignments:
+            self.assertTrue(a.task.tags_required <= by_id[a.printer_id].tags)
+
+    def test_lower_bound_respects_tag_groups(self):
+        printers = [PrinterDTO(1, 'A', 1.0, {'abs'}), PrinterDTO(2, 'B', 1.0, set())]
+        tasks = [TaskDTO(1, 'X', 1, 50, {'abs'}), TaskDTO(2, 'Y', 1, 50, {'abs'})]
+        self.assertAlmostEqual(makespan_lower_bound(tasks, printers), 100)
+
+
+class OptimizerAPITests(TestCase):
+    def test_schedule_endpoint_reports_optimization(self):
+        Printer.objects.create(name='Lenta', speed_factor=1.0)
+        Printer.objects.create(name='Rápida', speed_factor=3.0)
+        comp = Component.objects.create(code='C1', name='Comp', per_plate_time_min=60, batch_size=1)
+        product = Product.objects.create(code='PR1', name='Prod')
+        BOMItem.objects.create(product=product, component=comp, quantity=2)
+        wo = WorkOrder.objects.create(product=product, quantity=1)
+        resp = self.client.post(
+            '/api/schedule/',
+            data={'workorder_id': wo.id, 'optimize_ms': 100},
+            content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertAlmostEqual(data['optimization']['makespan_before_min'], 60)
+        self.assertAlmostEqual(data['optimization']['makespan_after_min'], 40)
+        self.assertAlmostEqual(data['makespan_min'], 40)
+
+    def test_optimization_skipped_with_material_changeovers(self):
+        Printer.objects.create(name='P1', material_change_min=20)
+        comp = Component.objects.create(code='C1', name='Comp', material='PLA', per_plate_time_min=60, batch_size=1)
+        product = Product.objects.create(code='PR1', name='Prod')
+        BOMItem.objects.create(product=product, component=comp, quantity=2)
+        wo = WorkOrder.objects.create(product=product, quantity=1)
+        data = self.client.post(
+            '/api/schedule/',
+            data={'workorder_id': wo.id, 'optimize_ms': 100},
+            content_type='application/json',
+        ).json()
+        self.assertNotIn('optimization', data)
+        self.assertEqual(data['optimize_skipped']['requested_ms'], 100)
+        self.assertIn('trocas de material', data['optimize_skipped']['reason'])
+        # sem orçamento pedido, nada a informar
+        data = self.client.post(
+            '/api/schedule/', data={'workorder_id': wo.id}, content_type='application/json'
+        ).json()
+        self.assertNotIn('optimize_skipped', data)
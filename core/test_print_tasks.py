@@ -1,14 +1,17 @@
 from django.test import TestCase
+from django.urls import reverse
 from django.core.exceptions import ValidationError
 from core.models import (
     Component,
     Product,
     BOMItem,
     ProductionOrder,
+    OrderComponentProgress,
     Printer,
     PrintTask,
+    ProductionLog,
 )
-from core.print_tasks import calculate_order_times
+from core.print_tasks import calculate_order_times, calculate_orders_times
 
 
 class PrintTaskCalculationTests(TestCase):
@@ -102,3 +105,53 @@ class PrintTaskCalculationTests(TestCase):
         printer = Printer.objects.create(name="PX", is_active=False, speed_factor=1.0)
         with self.assertRaises(ValidationError):
             PrintTask.objects.create(order=order, component=comp_a, printer=printer, quantity=5)
+
+
+class BulkOrderTimesTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(code="P1", name="Prod")
+        self.comp = Component.objects.create(code="A", name="CompA", print_time_min=60)
+        BOMItem.objects.create(product=self.product, component=self.comp, quantity=4)
+        self.printer = Printer.objects.create(name="P1", is_active=True, speed_factor=2.0)
+
+    def _order(self):
+        order = ProductionOrder.objects.create(product=self.product, quantity=1)
+        PrintTask.objects.create(order=order, component=self.comp, printer=self.printer, quantity=4)
+        return order
+
+    def test_matches_single_order_calculation(self):
+        orders = [self._order() for _ in range(3)]
+        for result in calculate_orders_times(orders):
+            stats, total = calculate_order_times(result.order)
+            self.assertAlmostEqual(result.total_h, total)
+            self.assertEqual(result.components[0].remaining_qty, stats[0].remaining_qty)
+            self.assertAlmostEqual(result.total_h, 2.0)
+
+    def test_fixed_number_of_queries(self):
+        for _ in range(10):
+            self._order()
+        orders = list(ProductionOrder.objects.all())
+        with self.assertNumQueries(4):
+            results = calculate_orders_times(orders)
+        self.assertEqual(len(results), 10)
+
+    def test_missing_counter_falls_back_to_logs(self):
+        order = self._order()
+        # carga em massa: registro sem contador
+        OrderComponentProgress.objects.filter(order=order).delete()
+        ProductionLog.objects.bulk_create([ProductionLog(order=order, component=self.comp, quantity=3)])
+        (result,) = calculate_orders_times([order])
+        self.assertEqual(result.components[0].done_qty, order.printed_for_component(self.comp))
+        self.assertEqual(result.components[0].done_qty, 3)
+        self.assertEqual(result.components[0].remaining_qty, 1)
+        data = self.client.get(reverse("api-orders-progress") + f"?ids={order.id}").json()
+        self.assertEqual(data[0]["components"][0]["done"], 3)
+
+    def test_progress_endpoint(self):
+        orders = [self._order() for _ in range(2)]
+        url = reverse("api-orders-progress") + f"?ids={orders[0].id}"
+        data = self.client.get(url).json()
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]["order_id"], orders[0].id)
+        self.assertAlmostEqual(data[0]["remaining_time_h"], 2.0)
+        self.assertEqual(len(self.client.get(reverse("api-orders-progress")).json()), 2)
@@ -0,0 +1,131 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.models import (
+    Component,
+    Product,
+    BOMItem,
+    ProductionOrder,
+    ProductionLog,
+    OrderComponentProgress,
+)
+from core.progress import progress_for_orders
+
+
+class ProgressEngineTests(TestCase):
+    def setUp(self):
+        self.comp_a = Component.objects.create(code="C1", name="CompA", print_time_min=60)
+        self.comp_b = Component.objects.create(code="C2", name="CompB", print_time_min=30)
+        self.product = Product.objects.create(code="P1", name="Prod")
+        BOMItem.objects.create(product=self.product, component=self.comp_a, quantity=2)
+        BOMItem.objects.create(product=self.product, component=self.comp_b, quantity=1)
+
+    def _create_orders(self, n):
+        for _ in range(n):
+            order = ProductionOrder.objects.create(product=self.product, quantity=2)
+            ProductionLog.objects.create(order=order, component=self.comp_a, quantity=1)
+
+    def test_matches_per_component_methods(self):
+        self._create_orders(2)
+        orders = list(ProductionOrder.objects.all())
+        for op in progress_for_orders(orders):
+            for row in op.rows:
+                self.assertEqual(row.required, op.order.required_for_component(row.component))
+                self.assertEqual(row.printed, op.order.printed_for_component(row.component))
+                self.assertEqual(row.progress, op.order.progress_for_component(row.component))
+                self.assertEqual(
+                    row.time_remaining_min,
+                    op.order.time_remaining_minutes_for_component(row.component),
+                )
+            self.assertAlmostEqual(op.progress_percent, 100.0 * 1 / 6)
+            self.assertEqual(op.time_remaining_min, 180)
+
+    def test_orders_without_counters_fall_back_to_logs(self):
+        self._create_orders(2)
+        # carga antiga/em massa: registros sem contador
+        OrderComponentProgress.objects.all().delete()
+        orders = list(ProductionOrder.objects.all())
+        for op in progress_for_orders(orders):
+            for row in op.rows:
+                self.assertEqual(row.printed, op.order.printed_for_component(row.component))
+            self.assertEqual(op.total_printed, 1)
+            self.assertAlmostEqual(op.progress_percent, 100.0 * 1 / 6)
+
+    def test_dashboard_query_count_is_constant(self):
+        self._create_orders(1)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse("dashboard"))
+        self._create_orders(30)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["progress_items"]), 31)
+        self.assertEqual(len(many), len(few))
+
+
+class OrderComponentProgressTests(TestCase):
+    def setUp(self):
+        self.comp = Component.objects.create(code="C1", name="Comp", print_time_min=10)
+        self.product = Product.objects.create(code="P1", name="Prod")
+        BOMItem.objects.create(product=self.product, component=self.comp, quantity=3)
+        self.order = ProductionOrder.objects.create(product=self.product, quantity=2)
+
+    def _counter(self):
+        return OrderComponentProgress.objects.get(order=self.order, component=self.comp)
+
+    def test_counters_follow_logs_and_order_changes(self):
+        self.assertEqual((self._counter().required, self._counter().printed), (6, 0))
+        log = ProductionLog.objects.create(order=self.order, component=self.comp, quantity=2)
+        self.assertEqual(self._counter().printed, 2)
+        log.quantity = 4
+        log.save()
+        self.assertEqual(self._counter().printed, 4)
+        log.delete()
+        self.assertEqual(self._counter().printed, 0)
+        self.order.quantity = 5
+        self.order.save()
+        self.assertEqual(self._counter().required, 15)
+        BOMItem.objects.filter(product=self.product).update(quantity=1)
+        BOMItem.objects.get(product=self.product).save()
+        self.assertEqual(self._counter().required, 5)
+
+    def test_progress_reads_are_single_query(self):
+        ProductionLog.objects.create(order=self.order, component=self.comp, quantity=2)
+        with self.assertNumQueries(1):
+            self.assertAlmostEqual(self.order.progress_for_component(self.comp), 100.0 * 2 / 6)
+
+    def test_log_print_api_updates_counter(self):
+        response = self.client.post(
+            reverse("api-log-print"),
+            data={"order_id": self.order.id, "component_id": self.comp.id, "quantity": 5},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._counter().printed, 5)
+        response = self.client.post(
+            reverse("api-log-print"),
+            data={"order_id": self.order.id, "component_id": self.comp.id, "quantity": 2},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_delete_order_with_logs(self):
+        ProductionLog.objects.create(order=self.order, component=self.comp, quantity=1)
+        self.order.delete()
+        self.assertFalse(OrderComponentProgress.objects.exists())
+
+    def test_rebuild_command_detects_and_fixes_drift(self):
+        ProductionLog.objects.create(order=self.order, component=self.comp, quantity=2)
+        OrderComponentProgress.objects.update(printed=0)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_order_progress", "--check", stdout=StringIO())
+        out = StringIO()
+        call_command("rebuild_order_progress", stdout=out)
+        self.assertIn("1 counter(s) fixed", out.getvalue())
+        self.assertEqual(self._counter().printed, 2)
+        call_command("rebuild_order_progress", "--check", stdout=StringIO())
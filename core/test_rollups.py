@@ -0,0 +1,86 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import BOMItem, Component, Product, ProductionOrder
+from core.rollups import rebuild_rollups
+
+
+class ProductRollupTests(TestCase):
+    def setUp(self):
+        self.base = Component.objects.create(
+            code="C1", name="Base", material="PLA", unit_cost=5, print_time_min=10, batch_size=4
+        )
+        self.lid = Component.objects.create(
+            code="C2", name="Tampa", material="PETG", unit_cost=Decimal("2.50"), print_time_min=20, batch_size=1
+        )
+        self.product = Product.objects.create(code="P1", name="Prod")
+        BOMItem.objects.create(product=self.product, component=self.base, quantity=2)
+        BOMItem.objects.create(product=self.product, component=self.lid, quantity=3)
+
+    def test_rollups_follow_bom_changes(self):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_cost, 17.5)
+        self.assertEqual(self.product.bom_required_minutes(2), 2 * (2 * 10 + 3 * 20))
+        self.assertEqual(self.product.materials, ["PETG", "PLA"])
+        # 5 unidades: 10 bases em pratos de 4 (3) + 15 tampas (15)
+        self.assertEqual(self.product.plates_for(5), 18)
+
+        BOMItem.objects.get(component=self.lid).delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_cost, 10)
+        self.assertEqual(self.product.materials, ["PLA"])
+        self.assertEqual(self.product.plates_for(5), 3)
+
+    def test_component_edit_refreshes_products(self):
+        self.base.unit_cost = 7
+        self.base.print_time_min = 15
+        self.base.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_cost, 2 * 7 + 7.5)
+        self.assertEqual(self.product.rollup_print_min, 2 * 15 + 3 * 20)
+
+    def test_stock_and_name_changes_skip_refresh(self):
+        with mock.patch("core.signals.rollups.refresh_products") as refresh:
+            self.base.qty_on_hand = 3
+            self.base.save(update_fields=["qty_on_hand"])
+            component = Component.objects.get(pk=self.lid.pk)
+            component.name = "Tampa nova"
+            component.qty_on_hand = 8
+            component.save()
+            refresh.assert_not_called()
+            component.batch_size = 2
+            component.save()
+            refresh.assert_called_once()
+
+    def test_log_print_does_not_touch_products(self):
+        order = ProductionOrder.objects.create(product=self.product, quantity=1)
+        self.base.qty_on_hand = 5
+        self.base.save()
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(
+                reverse("api-log-print"),
+                {"order_id": order.id, "component_id": self.base.id, "quantity": 1},
+                content_type="application/json",
+            )
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'UPDATE "core_product"' in q["sql"]])
+        self.base.refresh_from_db()
+        self.assertEqual(self.base.qty_on_hand, 4)
+
+    def test_rebuild_reports_and_fixes_drift(self):
+        self.assertEqual(rebuild_rollups(fix=False), [])
+        Product.objects.filter(pk=self.product.pk).update(rollup_cost=0, rollup_materials="")
+        with self.assertRaises(CommandError):
+            call_command("rebuild_product_rollups", "--check", stdout=StringIO())
+        drift = rebuild_rollups()
+        self.assertEqual([row[0] for row in drift], [self.product.pk])
+        self.assertEqual(rebuild_rollups(fix=False), [])
@@ -1,12 +1,23 @@
+import json
+
 from django.test import TestCase
 from django.urls import reverse
+from core.optimizer import optimize_schedule
 from core.scheduling import (
     PrinterDTO,
     TaskDTO,
+    as_runs,
+    compatibility_matrix,
+    intern_tags,
+    fits_volume,
+    printer_to_dto,
     schedule_tasks,
+    schedule_workorders,
+    consolidate_workorders_to_tasks,
     expand_workorder_to_tasks,
+    load_open_workorders,
 )
-from core.models import Component, Product, BOMItem, WorkOrder, Printer
+from core.models import Component, Product, BOMItem, WorkOrder, Printer, Schedule
 
 
 class SchedulingServiceTests(TestCase):
@@ -45,6 +56,35 @@ class SchedulingServiceTests(TestCase):
         assignments, unassigned, makespan, times = schedule_tasks(tasks, printers)
         self.assertEqual(len(unassigned), 1)
 
+    def test_heap_engine_matches_linear_scan(self):
+        import random
+
+        rng = random.Random(7)
+        tags = ['pla', 'abs', 'bambu', 'klipper']
+        printers = [
+            PrinterDTO(i, f'P{i}', rng.choice([0.8, 1.0, 1.2]), set(rng.sample(tags, 2)))
+            for i in range(12)
+        ]
+        tasks = [
+            TaskDTO(i, f'T{i}', 1, rng.randint(10, 300), set(rng.sample(tags, rng.randint(0, 2))))
+            for i in range(300)
+        ]
+        # referência: varredura linear de todas as impressoras compatíveis
+        times = {p.id: 0.0 for p in printers}
+        expected = []
+        for task in sorted(tasks, key=lambda t: t.time_min, reverse=True):
+            compatible = [p for p in printers if task.tags_required <= p.tags]
+            if not compatible:
+                continue
+            best = min(compatible, key=lambda p: times[p.id])
+            start = times[best.id]
+            times[best.id] = start + task.time_min / best.speed_factor
+            expected.append((best.id, task.component_id, start))
+        assignments, unassigned, makespan, printer_times = schedule_tasks(tasks, printers)
+        self.assertEqual([(a.printer_id, a.task.component_id, a.start) for a in assignments], expected)
+        self.assertEqual(printer_times, times)
+        self.assertEqual(len(assignments) + len(unassigned), len(tasks))
+
     def test_expand_workorder_batch(self):
         comp = Component.objects.create(
             code='C1',
@@ -62,6 +102,218 @@ class SchedulingServiceTests(TestCase):
         self.assertEqual(tasks[1].time_min, 60)
 
 
+class PlateRunTests(TestCase):
+    def setUp(self):
+        self.component = Component.objects.create(
+            code='CR', name='Rodízio', base_time_min=15, per_plate_time_min=40, batch_size=4, tags_required='pla, bico-06'
+        )
+        self.product = Product.objects.create(code='PR', name='Carrinho')
+        BOMItem.objects.create(product=self.product, component=self.component, quantity=1)
+
+    def test_large_order_is_three_runs(self):
+        wo = WorkOrder.objects.create(product=self.product, quantity=10001)
+        tasks = expand_workorder_to_tasks(wo)
+        self.assertEqual(len(tasks), 2501)
+        self.assertEqual(sum(t.quantity for t in tasks), 10001)
+        runs = as_runs(tasks)
+        self.assertEqual(
+            [(r.count, r.task.quantity, r.task.time_min) for r in runs],
+            [(1, 4, 55), (2499, 4, 40), (1, 1, 40)],
+        )
+        self.assertIs(runs[0].task.tags_required, intern_tags('pla, bico-06'))
+        self.assertFalse(hasattr(tasks[0], '__dict__'))
+
+    def test_runs_schedule_like_separate_plates(self):
+        wo = WorkOrder.objects.create(product=self.product, quantity=90)
+        shared = expand_workorder_to_tasks(wo)
+        separate = [TaskDTO(t.component_id, t.component_name, t.quantity, t.time_min, set(t.tags_required)) for t in shared]
+        printers = [PrinterDTO(i, f'P{i}', 1.0 + i / 10, {'pla', 'bico-06'}) for i in range(3)]
+        a, _, makespan_a, times_a = schedule_tasks(shared, printers)
+        b, _, makespan_b, times_b = schedule_tasks(separate, printers)
+        self.assertAlmostEqual(makespan_a, makespan_b)
+        self.assertEqual(times_a, times_b)
+        self.assertEqual(len(a), len(b))
+
+    def test_run_without_printer_goes_unassigned(self):
+        wo = WorkOrder.objects.create(product=self.product, quantity=40)
+        assignments, unassigned, *_ = schedule_tasks(
+            expand_workorder_to_tasks(wo), [PrinterDTO(1, 'P1', 1.0, {'abs'})]
+        )
+        self.assertEqual((len(assignments), len(unassigned)), (0, 10))
+
+
+class BuildVolumeTests(TestCase):
+    def setUp(self):
+        self.small = PrinterDTO(1, 'Mini', 2.0, set(), (180, 180, 180))
+        self.large = PrinterDTO(2, 'Grande', 1.0, set(), (350, 250, 400))
+
+    def test_fits_with_rotation_in_plate(self):
+        self.assertTrue(fits_volume((240, 340, 100), (350, 250, 400)))
+        self.assertFalse(fits_volume((100, 100, 300), (350, 250, 299)))
+        self.assertTrue(fits_volume((500, 500, 500), None))
+        self.assertTrue(fits_volume(None, (10, 10, 10)))
+        # eixo sem medida na impressora não limita
+        self.assertTrue(fits_volume((900, 10, 10), (None, 20, 20)))
+
+    def test_large_parts_skip_small_printers(self):
+        tasks = [
+            TaskDTO(1, 'Chassi', 1, 120, set(), size=(300, 200, 50)),
+            TaskDTO(2, 'Presilha', 1, 60, set(), size=(20, 20, 10)),
+            TaskDTO(3, 'Painel', 1, 30, set(), size=(500, 500, 5)),
+        ]
+        assignments, unassigned, *_ = schedule_tasks(tasks, [self.small, self.large])
+        placed = {a.task.component_id: a.printer_id for a in assignments}
+        self.assertEqual(placed, {1: 2, 2: 1})
+        self.assertEqual([t.component_id for t in unassigned], [3])
+
+    def test_optimizer_keeps_parts_on_printers_that_fit(self):
+        tasks = [TaskDTO(i, f'T{i}', 1, 60, set(), size=(300, 200, 50)) for i in range(4)]
+        assignments, *_ = schedule_tasks(tasks, [self.small, self.large])
+        new_assignments, _, stats = optimize_schedule(assignments, [self.small, self.large], 100)
+        self.assertEqual({a.printer_id for a in new_assignments}, {2})
+        self.assertAlmostEqual(stats.lower_bound, 240)
+
+    def test_matrix_is_reused_until_printers_change(self):
+        matrix = compatibility_matrix([self.small, self.large])
+        self.assertIs(compatibility_matrix([self.small, self.large]), matrix)
+        bigger = PrinterDTO(1, 'Mini', 2.0, set(), (400, 400, 400))
+        self.assertIsNot(compatibility_matrix([bigger, self.large]), matrix)
+
+    def test_component_size_reaches_tasks(self):
+        comp = Component.objects.create(
+            code='C9', name='Base', per_plate_time_min=30, batch_size=1, size_x=300, size_y=200
+        )
+        product = Product.objects.create(code='P9', name='Produto')
+        BOMItem.objects.create(product=product, component=comp, quantity=1)
+        wo = WorkOrder.objects.create(product=product, quantity=1)
+        self.assertEqual(expand_workorder_to_tasks(wo)[0].size, (300, 200, 0))
+        printer = Printer.objects.create(name='Mini', volume_x=180, volume_y=180)
+        self.assertEqual(printer_to_dto(printer).volume, (180, 180, None))
+
+
+class BatchSchedulingTests(TestCase):
+    def setUp(self):
+        comp = Component.objects.create(
+            code='C1', name='Comp1', per_plate_time_min=60, batch_size=1,
+        )
+        self.product = Product.objects.create(code='P1', name='Prod1')
+        BOMItem.objects.create(product=self.product, component=comp, quantity=1)
+
+    def test_orders_share_printers(self):
+        low = WorkOrder.objects.create(product=self.product, quantity=2, priority=1)
+        high = WorkOrder.objects.create(product=self.product, quantity=2, priority=5)
+        printers = [PrinterDTO(1, 'P1', 1.0, set()), PrinterDTO(2, 'P2', 1.0, set())]
+        assignments, unassigned, makespan, times, plans = schedule_workorders(
+            load_open_workorders(), printers
+        )
+        self.assertEqual([p.workorder_id for p in plans], [high.id, low.id])
+        self.assertEqual(len(assignments), 4)
+        self.assertEqual(round(makespan), 120)
+        self.assertEqual(round(plans[0].completion), 60)
+        self.assertEqual(round(plans[1].completion), 120)
+        low_starts = [a.start for a in assignments if a.task.workorder_id == low.id]
+        self.assertTrue(all(s >= 60 for s in low_starts))
+
+    def test_lateness_against_due_date(self):
+        from datetime import date, datetime
+        from django.utils import timezone
+
+        wo = WorkOrder.objects.create(
+            product=self.product, quantity=1, due_date=date(2030, 1, 1)
+        )
+        start = timezone.make_aware(datetime(2030, 1, 1, 23, 30))
+        printers = [PrinterDTO(1, 'P1', 1.0, set())]
+        *_, plans = schedule_workorders([wo], printers, start)
+        self.assertAlmostEqual(plans[0].lateness, 30)
+
+    def test_sequencing_policies(self):
+        from datetime import date, datetime
+        from django.utils import timezone
+
+        start = timezone.make_aware(datetime(2030, 1, 1))
+        printers = [PrinterDTO(1, 'P1', 1.0, set())]
+        big = WorkOrder.objects.create(product=self.product, quantity=10, priority=2, due_date=date(2030, 1, 3))
+        urgent = WorkOrder.objects.create(product=self.product, quantity=4, priority=1, due_date=date(2030, 1, 1))
+        small = WorkOrder.objects.create(product=self.product, quantity=1, priority=1)
+        orders = load_open_workorders()
+
+        def sequence(policy):
+            *_, plans = schedule_workorders(orders, printers, start, policy=policy)
+            return [p.workorder_id for p in plans]
+
+        # ordenação do modelo (-priority, due_date): no SQLite, sem prazo vem antes
+        self.assertEqual(sequence('makespan'), [big.id, small.id, urgent.id])
+        self.assertEqual(sequence('edd'), [urgent.id, big.id, small.id])
+        # 60 min/1 < 240/1 < 600/2
+        self.assertEqual(sequence('wspt'), [small.id, urgent.id, big.id])
+        self.assertEqual(sequence('wt')[0], urgent.id)
+        with self.assertRaises(ValueError):
+            sequence('fifo')
+
+    def test_weighted_tardiness_heuristic(self):
+        import random
+        from datetime import date, datetime, timedelta
+        from django.utils import timezone
+        from core.scheduling import weighted_tardiness
+
+        rng = random.Random(7)
+        for _ in range(60):
+            WorkOrder.objects.create(
+                product=self.product,
+                quantity=rng.randint(1, 12),
+                priority=rng.randint(1, 5),
+                due_date=date(2030, 1, 1) + timedelta(days=rng.randint(0, 4)),
+            )
+        start = timezone.make_aware(datetime(2030, 1, 1))
+        printers = [PrinterDTO(1, 'P1', 1.0, set()), PrinterDTO(2, 'P2', 1.0, set())]
+        orders = load_open_workorders()
+        totals = {}
+        for policy in ('makespan', 'edd', 'wspt', 'wt'):
+            *_, plans = schedule_workorders(orders, printers, start, policy=policy)
+            totals[policy] = weighted_tardiness(orders, plans)
+        self.assertLess(totals['wt'], totals['makespan'])
+        self.assertLessEqual(totals['wt'], min(totals['edd'], totals['wspt']))
+
+
+class PlateConsolidationTests(TestCase):
+    def setUp(self):
+        self.comp = Component.objects.create(
+            code='C1', name='Comp1', base_time_min=10, per_plate_time_min=60, batch_size=4,
+        )
+        self.product = Product.objects.create(code='P1', name='Prod1')
+        BOMItem.objects.create(product=self.product, component=self.comp, quantity=1)
+
+    def test_partial_plates_are_shared_across_orders(self):
+        first = WorkOrder.objects.create(product=self.product, quantity=2, priority=5)
+        second = WorkOrder.objects.create(product=self.product, quantity=3, priority=1)
+        tasks_by_order, stats = consolidate_workorders_to_tasks(load_open_workorders())
+        self.assertEqual(stats.plates_before, 2)
+        self.assertEqual(stats.plates_after, 2)
+        self.assertEqual(stats.minutes_before, 140)
+        self.assertEqual(stats.minutes_after, 130)
+        self.assertEqual(stats.minutes_saved, 10)
+        shared = tasks_by_order[first.id][0]
+        self.assertEqual(shared.quantity, 4)
+        self.assertEqual(shared.merged_workorder_ids, (second.id,))
+        self.assertEqual([t.quantity for t in tasks_by_order[second.id]], [1])
+
+    def test_consolidated_plate_completes_every_order(self):
+        first = WorkOrder.objects.create(product=self.product, quantity=2, priority=5)
+        second = WorkOrder.objects.create(product=self.product, quantity=2, priority=1)
+        workorders = load_open_workorders()
+        tasks_by_order, stats = consolidate_workorders_to_tasks(workorders)
+        self.assertEqual(stats.plates_saved, 1)
+        self.assertEqual(stats.minutes_saved, 70)
+        printers = [PrinterDTO(1, 'P1', 1.0, set())]
+        assignments, _, makespan, _, plans = schedule_workorders(
+            workorders, printers, tasks_by_order=tasks_by_order
+        )
+        self.assertEqual(len(assignments), 1)
+        self.assertEqual(round(makespan), 70)
+        self.assertEqual({p.workorder_id: round(p.completion) for p in plans}, {first.id: 70, second.id: 70})
+        self.assertEqual([p.plates for p in plans], [1, 1])
+
+
 class SchedulingAPITests(TestCase):
     def setUp(self):
         self.printer = Printer.objects.create(name='P1', is_active=True, speed_factor=1.0)
@@ -86,6 +338,126 @@ class SchedulingAPITests(TestCase):
         data = resp.json()
         self.assertEqual(len(data['assignments']), 1)
 
+    def test_schedule_endpoint_batch(self):
+        WorkOrder.objects.create(product=self.product, quantity=2, priority=3)
+        resp = self.client.post(
+            '/api/schedule/',
+            data={'mode': 'batch'},
+            content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(len(data['assignments']), 3)
+        self.assertEqual(len(data['workorders']), 2)
+        self.assertEqual(round(data['makespan_min']), 180)
+
+    def test_schedule_endpoint_batch_policy(self):
+        resp = self.client.post(
+            '/api/schedule/',
+            data={'mode': 'batch', 'policy': 'edd'},
+            content_type='application/json',
+        )
+        data = resp.json()
+        self.assertEqual(data['policy'], 'edd')
+        self.assertIn('weighted_tardiness_min', data)
+        resp = self.client.post(
+            '/api/schedule/',
+            data={'mode': 'batch', 'policy': 'random'},
+            content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 400)
+
+    def _simulate(self, **params):
+        return self.client.post(
+            '/api/schedule/', data={'workorder_id': self.workorder.id, **params}, content_type='application/json'
+        ).json()
+
+    def test_repeat_simulation_is_cached(self):
+        first = self._simulate()
+        self.assertFalse(first['cached'])
+        # simulação: nada gravado, nada a conferir no banco
+        with self.assertNumQueries(0):
+            second = self._simulate()
+        self.assertTrue(second['cached'])
+        self.assertIsNone(second['schedule_id'])
+        self.assertFalse(self._simulate(optimize_ms=5)['cached'])
+        committed = self._simulate(persist=True)
+        self.assertFalse(committed['cached'])
+        # plano confirmado: só confere se ele ainda é o corrente
+        with self.assertNumQueries(1):
+            again = self._simulate(persist=True)
+        self.assertTrue(again['cached'])
+        self.assertEqual(again['schedule_id'], committed['schedule_id'])
+
+    def test_model_save_invalidates_cache(self):
+        self._simulate()
+        self.component.per_plate_time_min = 90
+        self.component.save()
+        data = self._simulate()
+        self.assertFalse(data['cached'])
+        self.assertEqual(round(data['makespan_min']), 90)
+
+    def test_newer_plan_invalidates_cache(self):
+        self._simulate(persist=True)
+        self.client.post('/api/schedule/', data={'mode': 'batch', 'persist': True}, content_type='application/json')
+        self.assertFalse(self._simulate(persist=True)['cached'])
+
+    def test_simulation_is_not_stored(self):
+        data = self._simulate()
+        self.assertIsNone(data['schedule_id'])
+        self.assertFalse(data['persisted'])
+        self.assertFalse(Schedule.objects.exists())
+
+    def _stream(self, **params):
+        resp = self.client.post(
+            '/api/schedule/',
+            data={'mode': 'batch', **params},
+            content_type='application/json',
+            HTTP_ACCEPT='application/x-ndjson',
+        )
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        body = b''.join(resp.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_schedule_endpoint_streams_ndjson(self):
+        WorkOrder.objects.create(product=self.product, quantity=3)
+        lines = self._stream()
+        head, rows, end = lines[0], lines[1:-1], lines[-1]
+        self.assertEqual(head['type'], 'plan')
+        self.assertNotIn('assignments', head)
+        self.assertEqual(round(head['makespan_min']), 240)
+        self.assertEqual(len(head['workorders']), 2)
+        self.assertEqual([r['type'] for r in rows], ['assignment'] * 4)
+        self.assertEqual(rows[0]['printer_name'], 'P1')
+        self.assertEqual(end, {'type': 'end'})
+        self.assertFalse(head['cached'])
+        # repetição sai do cache já serializada
+        again = self._stream()
+        self.assertTrue(again[0]['cached'])
+        self.assertEqual(again[1:], lines[1:])
+
+    async def test_stream_is_async_under_asgi(self):
+        resp = await self.async_client.post(
+            '/api/schedule/',
+            data={'mode': 'batch'},
+            content_type='application/json',
+            headers={'Accept': 'application/x-ndjson'},
+        )
+        # iterador assíncrono: o servidor ASGI envia cada pedaço quando fica pronto
+        self.assertTrue(resp.is_async)
+        lines = [json.loads(line) async for chunk in resp.streaming_content for line in chunk.decode().splitlines()]
+        self.assertEqual(lines[0]['type'], 'plan')
+        self.assertEqual(lines[-1], {'type': 'end'})
+        self.assertEqual([r['type'] for r in lines[1:-1]], ['assignment'])
+
+    def test_stream_flag_in_body(self):
+        resp = self.client.post(
+            '/api/schedule/',
+            data={'workorder_id': self.workorder.id, 'stream': True},
+            content_type='application/json',
+        )
+        self.assertTrue(resp.streaming)
+
     def test_toggle_printer(self):
         resp = self.client.patch(f'/api/printers/{self.printer.id}/toggle/')
         self.assertEqual(resp.status_code, 200)
@@ -0,0 +1,116 @@
+import pickle
+import time
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import schedule_jobs
+from core.models import BOMItem, Component, Printer, Product, ScheduleJob, WorkOrder
+from core.scheduling import (
+    expand_workorders_to_tasks,
+    load_printers_active,
+    workorder_to_dto,
+)
+from core.solver import SolveRequest, solve
+
+
+def _farm(printers=2, orders=2):
+    for i in range(printers):
+        Printer.objects.create(name=f'P{i + 1}')
+    component = Component.objects.create(code='C1', name='Comp', per_plate_time_min=60, batch_size=1)
+    product = Product.objects.create(code='PR1', name='Prod')
+    BOMItem.objects.create(product=product, component=component, quantity=2)
+    return [WorkOrder.objects.create(product=product, quantity=1, priority=i + 1) for i in range(orders)]
+
+
+class SolverTests(TestCase):
+    def test_request_survives_pickle(self):
+        workorders = _farm()
+        request = SolveRequest(
+            load_printers_active(),
+            timezone.now(),
+            [workorder_to_dto(wo) for wo in workorders],
+            expand_workorders_to_tasks(workorders),
+            mode='batch',
+        )
+        copy = pickle.loads(pickle.dumps(request))
+        # pratos iguais continuam compartilhando a tarefa (expansão run-length)
+        plates = copy.tasks_by_order[workorders[0].id]
+        self.assertIs(plates[0], plates[1])
+        local, remote = solve(request), pickle.loads(pickle.dumps(solve(copy)))
+        self.assertEqual(remote.makespan, local.makespan)
+        self.assertEqual(remote.workorder_ids, local.workorder_ids)
+        self.assertEqual([(a.printer_id, a.start) for a in remote.assignments], [(a.printer_id, a.start) for a in local.assignments])
+
+
+@override_settings(SCHEDULE_JOB_WORKERS=0)
+class ScheduleJobAPITests(TestCase):
+    def setUp(self):
+        self.workorders = _farm()
+
+    def _submit(self, **data):
+        return self.client.post(reverse('api-schedule-jobs'), data=data, content_type='application/json')
+
+    def test_job_result_matches_schedule_endpoint(self):
+        resp = self._submit(mode='batch', policy='edd', persist=True)
+        self.assertEqual(resp.status_code, 202)
+        job = resp.json()
+        self.assertEqual(job['status'], 'done')
+        status = self.client.get(job['status_url']).json()
+        self.assertEqual(status['schedule_id'], ScheduleJob.objects.get().schedule_id)
+        result = self.client.get(job['result_url']).json()
+        self.assertEqual(result['schedule_id'], status['schedule_id'])
+        self.assertEqual(len(result['assignments']), 4)
+        self.assertEqual(result['makespan_min'], 120)
+        # o resultado do job já fica no cache de /api/schedule/
+        with self.assertNumQueries(1):
+            again = self.client.post(
+                reverse('api-schedule'),
+                data={'mode': 'batch', 'policy': 'edd', 'persist': True},
+                content_type='application/json',
+            ).json()
+        self.assertTrue(again['cached'])
+        self.assertEqual(again['schedule_id'], result['schedule_id'])
+
+    def test_invalid_request_is_rejected_before_queueing(self):
+        self.assertEqual(self._submit(mode='batch', policy='random').status_code, 400)
+        self.assertEqual(self._submit(workorder_id=0).status_code, 404)
+        self.assertFalse(ScheduleJob.objects.exists())
+
+    def test_failed_job(self):
+        with mock.patch.object(schedule_jobs, 'solve', side_effect=RuntimeError('sem memória')):
+            job = self._submit(workorder_id=self.workorders[0].id).json()
+        self.assertEqual(job['status'], 'failed')
+        resp = self.client.get(job['result_url'])
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json()['error'], 'RuntimeError: sem memória')
+
+    def test_queued_result_is_pending(self):
+        job = ScheduleJob.objects.create(params={'mode': 'batch'})
+        resp = self.client.get(reverse('api-schedule-job-result', args=[job.id]))
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.json()['status'], 'queued')
+
+
+@override_settings(SCHEDULE_JOB_WORKERS=1)
+class ProcessPoolTests(TransactionTestCase):
+    def tearDown(self):
+        schedule_jobs.shutdown()
+
+    def test_solver_runs_in_worker_process(self):
+        workorders = _farm(orders=3)
+        job = self.client.post(
+            reverse('api-schedule-jobs'), data={'mode': 'batch'}, content_type='application/json'
+        ).json()
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            status = self.client.get(job['status_url']).json()['status']
+            if status != 'queued':
+                break
+            time.sleep(0.05)
+        self.assertEqual(status, 'done')
+        result = self.client.get(job['result_url']).json()
+        self.assertEqual([w['workorder_id'] for w in result['workorders']], [wo.id for wo in reversed(workorders)])
+        self.assertEqual(len(result['assignments']), 6)
@@ -0,0 +1,251 @@
+from datetime import datetime, timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from core import schedule_cache, schedule_state
+from core.models import (
+    Component,
+    Product,
+    BOMItem,
+    ProductionOrder,
+    WorkOrder,
+    Printer,
+    Schedule,
+    ScheduledAssignment,
+)
+from core.scheduling import PrinterDTO, TaskDTO, schedule_tasks
+from core.schedule_state import ScheduleState
+
+
+class ScheduleStateTests(TestCase):
+    def setUp(self):
+        self.start = timezone.make_aware(datetime(2030, 1, 1, 8, 0))
+        self.printers = [
+            PrinterDTO(1, 'P1', 1.0, set()),
+            PrinterDTO(2, 'P2', 1.0, set()),
+            PrinterDTO(3, 'P3', 1.0, {'abs'}),
+        ]
+
+    def _state(self, tasks):
+        assignments, unassigned, _, _ = schedule_tasks(tasks, self.printers)
+        return ScheduleState(self.printers, assignments, unassigned, self.start)
+
+    def test_deactivate_moves_only_pending_tasks_of_printer(self):
+        tasks = [TaskDTO(i, f'T{i}', 1, 60, set()) for i in range(6)]
+        state = self._state(tasks)
+        before = {pid: list(q) for pid, q in state.queues.items()}
+        moved = state.deactivate_printer(2, now=self.start + timedelta(minutes=30))
+        # P2 estava imprimindo o primeiro prato; só os dois seguintes mudam
+        self.assertEqual(moved, 1)
+        self.assertEqual(len(state.queues[2]), 1)
+        self.assertEqual(state.queues[1][:2], before[1])
+        self.assertEqual(state.queues[3][:2], before[3])
+        self.assertEqual(len(state.assignments), 6)
+        self.assertEqual(state.version, 2)
+        self.assertNotIn(2, state.active)
+
+    def test_deactivate_without_compatible_printer_leaves_unassigned(self):
+        state = self._state([TaskDTO(1, 'A', 1, 60, {'abs'})])
+        state.deactivate_printer(3, now=self.start)
+        self.assertEqual(len(state.unassigned), 1)
+        placed = state.activate_printer(self.printers[2], now=self.start)
+        self.assertEqual(placed, 1)
+        self.assertEqual(state.unassigned, [])
+
+    def test_consume_removes_tail_plates_and_compacts(self):
+        tasks = [TaskDTO(1, 'A', 2, 60, set()) for _ in range(3)] + [TaskDTO(2, 'B', 1, 30, set())]
+        printers = [PrinterDTO(1, 'P1', 1.0, set())]
+        assignments, unassigned, makespan, _ = schedule_tasks(tasks, printers)
+        state = ScheduleState(printers, assignments, unassigned, self.start)
+        self.assertEqual(makespan, 210)
+        removed = state.consume(1, 3, now=self.start)
+        self.assertEqual(removed, 1)
+        quantities = sorted(a.task.quantity for a in state.assignments if a.task.component_id == 1)
+        self.assertEqual(quantities, [1, 2])
+        self.assertEqual(state.makespan, 150)
+        self.assertEqual([a.task.component_id for a in state.assignments if a.task.component_id == 2], [2])
+
+    def test_consume_ignores_workorder_and_reaches_unassigned(self):
+        printers = [PrinterDTO(1, 'P1', 1.0, set())]
+        tasks = [TaskDTO(1, 'A', 1, 60, set(), workorder_id=wo) for wo in (10, 10, 20, 20)]
+        assignments, unassigned, _, _ = schedule_tasks(tasks, printers)
+        waiting = [TaskDTO(1, 'A', 2, 60, {'abs'}, workorder_id=30)]
+        state = ScheduleState(printers, assignments, waiting, self.start)
+        removed = state.consume(1, 5, now=self.start)
+        # os quatro pratos do plano saem, das duas ordens; o sem impressora fica com 1
+        self.assertEqual(removed, 4)
+        self.assertEqual(state.assignments, [])
+        self.assertEqual([t.quantity for t in state.unassigned], [1])
+        self.assertEqual(state.version, 2)
+
+
+class ScheduleStateAPITests(TestCase):
+    def setUp(self):
+        schedule_state.clear()
+        self.addCleanup(schedule_state.clear)
+        self.p1 = Printer.objects.create(name='P1')
+        self.p2 = Printer.objects.create(name='P2')
+        self.comp = Component.objects.create(code='C1', name='Comp', per_plate_time_min=60, batch_size=1)
+        product = Product.objects.create(code='PR1', name='Prod')
+        BOMItem.objects.create(product=product, component=self.comp, quantity=4)
+        self.workorder = WorkOrder.objects.create(product=product, quantity=1)
+        self.order = ProductionOrder.objects.create(product=product, quantity=1)
+
+    def test_current_schedule_requires_a_run(self):
+        resp = self.client.get('/api/schedule/current/')
+        self.assertEqual(resp.status_code, 404)
+
+    def test_toggle_and_log_update_current_schedule(self):
+        self.client.post(
+            '/api/schedule/',
+            data={'workorder_id': self.workorder.id, 'persist': True},
+            content_type='application/json',
+        )
+        data = self.client.get('/api/schedule/current/').json()
+        self.assertEqual(round(data['makespan_min']), 120)
+
+        # o prato em andamento fica na impressora; o pendente vai para P1
+        self.client.patch(f'/api/printers/{self.p2.id}/toggle/')
+        data = self.client.get('/api/schedule/current/').json()
+        on_p2 = [a for a in data['assignments'] if a['printer_id'] == self.p2.id]
+        self.assertEqual(len(on_p2), 1)
+        self.assertEqual(round(data['makespan_min']), 180)
+
+        self.client.post(
+            '/api/log-print/',
+            data={'order_id': self.order.id, 'component_id': self.comp.id, 'quantity': 2},
+            content_type='application/json',
+        )
+        data = self.client.get('/api/schedule/current/').json()
+        self.assertEqual(len(data['assignments']), 2)
+        self.assertEqual(round(data['makespan_min']), 60)
+        self.assertEqual(data['version'], 3)
+
+
+class SchedulePersistenceTests(TestCase):
+    def setUp(self):
+        schedule_state.clear()
+        self.addCleanup(schedule_state.clear)
+        self.p1 = Printer.objects.create(name='P1')
+        self.p2 = Printer.objects.create(name='P2')
+        comp = Component.objects.create(code='C1', name='Comp', per_plate_time_min=60, batch_size=1)
+        product = Product.objects.create(code='PR1', name='Prod')
+        BOMItem.objects.create(product=product, component=comp, quantity=4)
+        self.workorder = WorkOrder.objects.create(product=product, quantity=1)
+
+    def _run(self):
+        return self.client.post(
+            '/api/schedule/',
+            data={'workorder_id': self.workorder.id, 'persist': True},
+            content_type='application/json',
+        ).json()
+
+    def test_run_is_stored_with_assignments(self):
+        data = self._run()
+        schedule = Schedule.objects.get(pk=data['schedule_id'])
+        self.assertEqual(schedule.assignments.count(), 4)
+        self.assertEqual(len(schedule.input_hash), 64)
+        self.assertEqual(list(schedule.workorders.all()), [self.workorder])
+        self.assertAlmostEqual(schedule.makespan_min, 120)
+        first = schedule.assignments.filter(printer=self.p1).first()
+        self.assertEqual(first.starts_at, schedule.plan_start)
+        # mesmas entradas, mesmo hash
+        again = Schedule.objects.get(pk=self._run()['schedule_id'])
+        self.assertEqual(again.input_hash, schedule.input_hash)
+
+    def test_state_reloads_from_database(self):
+        data = self._run()
+        schedule_state.clear()
+        state = schedule_state.current()
+        self.assertEqual(state.schedule_id, data['schedule_id'])
+        self.assertEqual(len(state.assignments), 4)
+        self.assertAlmostEqual(state.makespan, 120)
+
+    def test_toggle_rewrites_affected_queues(self):
+        data = self._run()
+        self.client.patch(f'/api/printers/{self.p2.id}/toggle/')
+        schedule = Schedule.objects.get(pk=data['schedule_id'])
+        self.assertEqual(schedule.version, 2)
+        self.assertAlmostEqual(schedule.makespan_min, 180)
+        rows = ScheduledAssignment.objects.filter(schedule=schedule)
+        self.assertEqual(rows.count(), 4)
+        self.assertEqual(rows.filter(printer=self.p1).count(), 3)
+
+    def test_next_assignments_for_printer(self):
+        self._run()
+        resp = self.client.get(f'/api/printers/{self.p1.id}/next/?limit=1')
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(len(data['next']), 1)
+        self.assertEqual(data['next'][0]['component_name'], 'Comp')
+
+    def test_unassigned_plates_survive_reload(self):
+        abs_printer = Printer.objects.create(name='ABS', tags='abs', is_active=False)
+        comp = Component.objects.create(
+            code='C2', name='Tampa', per_plate_time_min=30, batch_size=1, tags_required='abs'
+        )
+        product = Product.objects.create(code='PR2', name='Prod ABS')
+        BOMItem.objects.create(product=product, component=comp, quantity=3)
+        workorder = WorkOrder.objects.create(product=product, quantity=1)
+        data = self.client.post(
+            '/api/schedule/',
+            data={'workorder_id': workorder.id, 'persist': True},
+            content_type='application/json',
+        ).json()
+        self.assertEqual(len(data['unassigned']), 3)
+        self.assertEqual(len(Schedule.objects.get(pk=data['schedule_id']).unassigned), 3)
+
+        # processo reiniciado: o plano volta do banco antes de ligar a impressora
+        schedule_state.clear()
+        self.assertEqual(len(schedule_state.current().unassigned), 3)
+        schedule_state.clear()
+        self.client.patch(f'/api/printers/{abs_printer.id}/toggle/')
+        schedule = Schedule.objects.get(pk=data['schedule_id'])
+        self.assertEqual(schedule.unassigned_count, 0)
+        self.assertEqual(schedule.unassigned, [])
+        self.assertEqual(schedule.assignments.filter(printer=abs_printer).count(), 3)
+        current = self.client.get('/api/schedule/current/').json()
+        self.assertEqual(current['unassigned'], [])
+
+    def test_simulation_keeps_current_plan(self):
+        committed = self.client.post(
+            '/api/schedule/', data={'mode': 'batch', 'persist': True}, content_type='application/json'
+        ).json()
+        other = WorkOrder.objects.create(product=self.workorder.product, quantity=2)
+        preview = self.client.post(
+            '/api/schedule/', data={'workorder_id': other.id}, content_type='application/json'
+        ).json()
+        self.assertIsNone(preview['schedule_id'])
+        current = self.client.get('/api/schedule/current/').json()
+        self.assertEqual(current['mode'], 'batch')
+        self.assertEqual(current['schedule_id'], committed['schedule_id'])
+        nxt = self.client.get(f'/api/printers/{self.p1.id}/next/').json()
+        self.assertEqual(nxt['schedule_id'], committed['schedule_id'])
+        self.assertEqual({row['workorder_id'] for row in nxt['next']}, {self.workorder.id})
+
+    @override_settings(SCHEDULE_HISTORY=2)
+    def test_old_plans_are_pruned(self):
+        ids = []
+        for _ in range(4):
+            schedule_cache.bump()
+            ids.append(self._run()['schedule_id'])
+        self.assertEqual(list(Schedule.objects.values_list('id', flat=True)), ids[:-3:-1])
+        self.assertEqual(ScheduledAssignment.objects.exclude(schedule_id__in=ids[-2:]).count(), 0)
+
+    def test_deleting_planned_printer_and_component(self):
+        data = self._run()
+        self.p2.delete()
+        current = self.client.get('/api/schedule/current/').json()
+        # o prato em andamento em P2 sai; o pendente vai para P1
+        self.assertEqual({a['printer_id'] for a in current['assignments']}, {self.p1.id})
+        self.assertEqual(len(current['assignments']), 3)
+        row = ScheduledAssignment.objects.filter(schedule_id=data['schedule_id']).first()
+        self.assertEqual(row.component_name, 'Comp')
+
+        component = Component.objects.get(code='C1')
+        BOMItem.objects.filter(component=component).delete()
+        component.delete()
+        current = self.client.get('/api/schedule/current/').json()
+        self.assertEqual(current['assignments'], [])
+        nxt = self.client.get(f'/api/printers/{self.p1.id}/next/').json()
+        self.assertEqual(nxt['next'], [])
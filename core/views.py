@@ -1,10 +1,13 @@
-from django.db.models import Q
+from django.db.models import Q, Value
+from django.db.models.functions import Concat, Lower
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.contrib import messages
 
-from .models import Component, Product, BOMItem, ProductionOrder, minutes_to_hhmm
+from .models import Component, Product, ProductionOrder, minutes_to_hhmm
 from .forms import ComponentForm, ProductForm, BOMFormSet, ProductionOrderForm
+from .bom import bom_lines, products_of
+from .progress import progress_for_orders
 
 # ----------------------
 # Helpers tolerantes a diferenças nos modelos
@@ -74,25 +77,61 @@ def _cost_for_component(c):
     except Exception:
         return 0.0
 
-def _time_min_for_component(c):
-    """Tempo de impressão (min) por unidade (nomes comuns)."""
-    val = _get_any_attr(
-        c,
-        ["print_time_min", "print_time_minutes", "tempo_min", "tempo_minutos", "time_per_unit_min"],
-        default=0,
-    )
-    try:
-        return float(val)
-    except Exception:
-        return 0.0
 
-def _quantity_for_bom_item(item):
-    """Quantidade do item no BOM (nomes comuns)."""
-    val = _get_any_attr(item, ["quantity", "qty", "qtd"], default=0)
-    try:
-        return float(val)
-    except Exception:
-        return 0.0
+# ----------------------
+# Listas paginadas (keyset por código)
+# ----------------------
+PAGE_SIZE = 50
+
+
+# maior ponto de código: prefixo + PREFIX_END fica depois de qualquer texto com o prefixo
+PREFIX_END = "\U0010ffff"
+
+
+def _prefix_range(field, q):
+    """`field` (já em minúsculas) começando por `q`, como intervalo [q, q + PREFIX_END)."""
+    low = Lower(Value(q))
+    return Q(**{f"{field}__gte": low, f"{field}__lt": Concat(low, Value(PREFIX_END))})
+
+
+def _search(qs, q):
+    """Busca por prefixo de código ou nome, sem diferenciar maiúsculas.
+
+    `istartswith` vira `LIKE ... ESCAPE`, que o SQLite não atende por índice;
+    a comparação por intervalo sobre `LOWER(coluna)` usa os índices
+    funcionais `Lower("code")` e `Lower("name")` dos modelos.
+    """
+    if not q:
+        return qs
+    qs = qs.annotate(code_lower=Lower("code"), name_lower=Lower("name"))
+    return qs.filter(_prefix_range("code_lower", q) | _prefix_range("name_lower", q))
+
+
+def _keyset_page(qs, request, page_size=None):
+    """Página de `qs` ordenada por `code`, a partir de ?after= ou ?before=.
+
+    Em vez de OFFSET, filtra pelo último código visto, então o custo de cada
+    página não cresce com a posição na lista. Retorna (itens, after, before)
+    com os cursores da próxima e da página anterior (None se não houver).
+    """
+    page_size = page_size or PAGE_SIZE
+    after = request.GET.get("after", "")
+    before = request.GET.get("before", "")
+    if before:
+        items = list(qs.filter(code__lt=before).order_by("-code")[: page_size + 1])
+        has_more = len(items) > page_size
+        items = items[:page_size][::-1]
+        prev_cursor = items[0].code if has_more and items else None
+        next_cursor = items[-1].code if items else None
+    else:
+        if after:
+            qs = qs.filter(code__gt=after)
+        items = list(qs.order_by("code")[: page_size + 1])
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        next_cursor = items[-1].code if has_more else None
+        prev_cursor = items[0].code if after and items else None
+    return items, next_cursor, prev_cursor
 
 
 # ----------------------
@@ -104,16 +143,14 @@ def dashboard(request):
     total_produtos = Product.objects.count()
 
     # Valor total em estoque (qtd * custo) sem depender de 'inventory'
+    # e estoque baixo (exemplo: <= 3 unidades), na mesma leitura
     valor_total_estoque = 0.0
+    low_components = []
     for c in Component.objects.all():
         qty = _qty_on_hand_for(c)
         cost = _cost_for_component(c)
         valor_total_estoque += qty * cost
-
-    # Estoque baixo (exemplo: <= 3 unidades)
-    low_components = []
-    for c in Component.objects.all():
-        if _qty_on_hand_for(c) <= 3:
+        if qty <= 3:
             low_components.append(c)
 
     low_products = []
@@ -121,41 +158,29 @@ def dashboard(request):
         if _qty_on_hand_for(p) <= 3:
             low_products.append(p)
 
-    # Progresso de impressão das ordens em andamento
+    # Progresso de impressão das ordens em andamento (consultas agregadas)
     progress_items = []
-    for op in ProductionOrder.objects.filter(status="open").select_related("product"):
-        rows = []
-        total_required = 0
-        total_printed = 0
-        total_remaining_min = 0
-        for item in op.product.bom_items.select_related("component"):
-            comp = item.component
-            req = op.required_for_component(comp)
-            printed = op.printed_for_component(comp)
-            progress = op.progress_for_component(comp)
-            rem_min = op.time_remaining_minutes_for_component(comp)
-            rows.append(
-                {
-                    "component": comp,
-                    "required": req,
-                    "printed": printed,
-                    "remaining": max(0, req - printed),
-                    "progress": progress,
-                    "time_remaining_hhmm": minutes_to_hhmm(rem_min),
-                }
-            )
-            total_required += req
-            total_printed += printed
-            if rem_min > total_remaining_min:
-                total_remaining_min = rem_min
+    open_orders = ProductionOrder.objects.filter(status="open").select_related("product")
+    for op in progress_for_orders(open_orders):
+        rows = [
+            {
+                "component": r.component,
+                "required": r.required,
+                "printed": r.printed,
+                "remaining": r.remaining,
+                "progress": r.progress,
+                "time_remaining_hhmm": minutes_to_hhmm(r.time_remaining_min),
+            }
+            for r in op.rows
+        ]
         progress_items.append(
             {
-                "order_id": op.id,
-                "product": op.product,
-                "total_required": total_required,
-                "total_printed": total_printed,
+                "order_id": op.order.id,
+                "product": op.order.product,
+                "total_required": op.total_required,
+                "total_printed": op.total_printed,
                 "progress_percent": op.progress_percent,
-                "time_remaining_hhmm": minutes_to_hhmm(total_remaining_min),
+                "time_remaining_hhmm": minutes_to_hhmm(op.time_remaining_min),
                 "rows": rows,
             }
         )
@@ -180,14 +205,11 @@ def dashboard(request):
 # ----------------------
 def estoque_componentes_list(request):
     q = request.GET.get("q", "").strip()
-    qs = Component.objects.all()
-    if q:
-        qs = qs.filter(Q(code__icontains=q) | Q(name__icontains=q))
-    components = list(qs.order_by("code", "name"))
+    components, next_cursor, prev_cursor = _keyset_page(_search(Component.objects.all(), q), request)
     return render(
         request,
         "estoque/componentes_list.html",
-        {"components": components, "q": q},
+        {"components": components, "q": q, "next_cursor": next_cursor, "prev_cursor": prev_cursor},
     )
 
 
@@ -231,39 +253,23 @@ def componentes_delete(request, pk):
 # ----------------------
 def estoque_produtos_list(request):
     q = request.GET.get("q", "").strip()
-    qs = Product.objects.all()
-    if q:
-        qs = qs.filter(Q(code__icontains=q) | Q(name__icontains=q))
-    products = list(qs.order_by("code", "name"))
-
-    # Calcula tempo total (min), custo total e materiais a partir do BOM
-    rows = []
-    for p in products:
-        qty_on_hand = _qty_on_hand_for(p)
-
-        total_time_min = 0.0
-        materials = set()
-
-        for item in BOMItem.objects.filter(product=p).select_related("component"):
-            comp = item.component
-            qty = _quantity_for_bom_item(item)
-            total_time_min += _time_min_for_component(comp) * qty
-            if comp.material:
-                materials.add(comp.material)
-
-        rows.append(
-            {
-                "obj": p,
-                "qty_on_hand": qty_on_hand,
-                "total_cost": p.total_cost,
-                "total_time_min": total_time_min,
-                "materials": ", ".join(sorted(materials)),
-            }
-        )
+    products, next_cursor, prev_cursor = _keyset_page(_search(Product.objects.all(), q), request)
+
+    # Tempo total (min), custo total e materiais vêm dos totais materializados
+    rows = [
+        {
+            "obj": p,
+            "qty_on_hand": _qty_on_hand_for(p),
+            "total_cost": p.total_cost,
+            "total_time_min": p.bom_required_minutes(1),
+            "materials": p.rollup_materials,
+        }
+        for p in products
+    ]
     return render(
         request,
         "estoque/produtos_list.html",
-        {"products": rows, "q": q},
+        {"products": rows, "q": q, "next_cursor": next_cursor, "prev_cursor": prev_cursor},
     )
 
 
@@ -321,11 +327,12 @@ def producao(request):
         return redirect("producao")
 
     orders = []
-    qs = ProductionOrder.objects.filter(status="open").select_related("product")
+    qs = list(ProductionOrder.objects.filter(status="open").select_related("product"))
+    lines = bom_lines(products_of(qs))
     for op in qs:
         total_min = op.product.bom_required_minutes(op.quantity)
         comps = []
-        for item in op.product.bom_items.select_related("component"):
+        for item in lines.get(op.product_id, []):
             req_qty = item.quantity * op.quantity
             time_total = item.component.print_time_min * req_qty
             cost_total = float(item.component.unit_cost) * req_qty
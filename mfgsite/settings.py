@@ -53,6 +53,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'mfgsite.wsgi.application'
+# Sob ASGI (ex.: `uvicorn mfgsite.asgi:application`) as conexões do feed SSE e
+# as views assíncronas de leitura (impressoras, progresso, tempos) são só
+# corrotinas; as views síncronas, como /api/schedule/, rodam no pool de threads
+# do asgiref, dimensionado pela variável de ambiente ASGI_THREADS
+ASGI_APPLICATION = 'mfgsite.asgi.application'
 
 DATABASES = {
     'default': {
@@ -71,3 +76,14 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATICFILES_DIRS = []
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# respostas de /api/schedule/ guardadas no cache padrão (core.schedule_cache), em segundos;
+# com vários processos, configure em CACHES um backend compartilhado (Redis/Memcached)
+SCHEDULE_CACHE_TTL = 300
+
+# planos confirmados (/api/schedule/ com persist) mantidos no banco; os mais antigos são excluídos
+SCHEDULE_HISTORY = 3
+
+# processos que executam /api/schedule/jobs/ (core.schedule_jobs);
+# None = um por núcleo menos um, 0 = o solver roda na própria requisição
+SCHEDULE_JOB_WORKERS = None
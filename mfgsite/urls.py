@@ -38,9 +38,17 @@ urlpatterns = [
     # API
     path("api/printers/", api.PrinterListAPIView.as_view(), name="api-printers"),
     path("api/printers/<int:pk>/toggle/", api.PrinterToggleAPIView.as_view(), name="api-printer-toggle"),
+    path("api/printers/<int:pk>/next/", api.PrinterNextAssignmentsAPIView.as_view(), name="api-printer-next"),
     path("api/schedule/", api.ScheduleAPIView.as_view(), name="api-schedule"),
+    path("api/schedule/current/", api.CurrentScheduleAPIView.as_view(), name="api-schedule-current"),
+    path("api/schedule/jobs/", api.ScheduleJobListAPIView.as_view(), name="api-schedule-jobs"),
+    path("api/schedule/jobs/<int:pk>/", api.ScheduleJobAPIView.as_view(), name="api-schedule-job"),
+    path("api/schedule/jobs/<int:pk>/result/", api.ScheduleJobResultAPIView.as_view(), name="api-schedule-job-result"),
     path("api/workorders/<int:pk>/tasks/preview/", api.WorkOrderTasksPreviewAPIView.as_view(), name="api-workorder-preview"),
     path("api/products/<int:pk>/components/", api.ProductComponentsAPIView.as_view(), name="api-product-components"),
     path("api/print-time/", api.PrintTimeAPIView.as_view(), name="api-print-time"),
     path("api/log-print/", api.LogPrintAPIView.as_view(), name="api-log-print"),
+    path("api/orders/progress/", api.OrdersProgressAPIView.as_view(), name="api-orders-progress"),
+    path("api/mrp/", api.NetRequirementsAPIView.as_view(), name="api-mrp"),
+    path("api/events/", api.EventsAPIView.as_view(), name="api-events"),
 ]